@@ -23,11 +23,10 @@ _context = dict(
 @click.version_option(stems.__version__)
 @options.opt_verbose
 @options.opt_quiet
-@options.opt_scheduler
-@options.opt_nprocs
-@options.opt_nthreads
+@options.opt_executor
+@options.opt_performance_report
 @click.pass_context
-def main(ctx, verbose, quiet, scheduler, nprocs, nthreads):
+def main(ctx, verbose, quiet, executor, performance_report):
     """ Spatio-temporal Tools for Earth Monitoring Science
 
     Home: https://github.com/ceholden/stems
@@ -38,12 +37,12 @@ def main(ctx, verbose, quiet, scheduler, nprocs, nthreads):
     logger = setup_logger('stems', level=log_level)
 
     # check debug level since could be expensive to get info
-    if scheduler is not None and log_level == logging.DEBUG:
+    if executor is not None and log_level == logging.DEBUG:
         from stems.executor import executor_info
-        info = executor_info(scheduler)
+        info = executor_info(executor)
         for i in info:
             logger.debug(i)
 
     ctx.obj = {}
     ctx.obj['logger'] = logger
-    ctx.obj['client'] = scheduler
+    ctx.obj['client'] = executor
@@ -6,7 +6,8 @@ import re
 
 import click
 
-from stems.executor import setup_backend, setup_executor
+from stems.executor import (AUTO, CLUSTER_PROFILES, ExecutorMetrics,
+                            setup_backend, setup_executor)
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,7 @@ _RE_NUMBER = re.compile(r'[-+]?\d*\.\d+|\d+')
 _TYPE_FILE = click.Path(exists=True, readable=True,
                         dir_okay=False, resolve_path=True)
 _KEY_DATE_FORMAT = 'date_format'
+_KEY_PERFORMANCE_REPORT = 'performance_report'
 
 
 # ============================================================================
@@ -164,17 +166,23 @@ def cb_executor(ctx, param, value):
     if executor in ('threads', 'processes', 'sync', ):
         setup_backend(executor, workers_or_ip)
     elif executor == 'distributed':
-        try:
-            workers = int(workers_or_ip)
-        except ValueError:
-            address = workers_or_ip
-            workers = None
-        else:
-            address = None
-        client = setup_executor(address=address, n_workers=workers)
+        client = setup_executor(**_parse_distributed(workers_or_ip))
 
     if client:
+        report = ctx.params.get(_KEY_PERFORMANCE_REPORT, None)
+        if report:
+            metrics = ExecutorMetrics(client, report=report).start()
+        else:
+            metrics = None
+
         def close_scheduler():
+            if metrics is not None:
+                try:
+                    metrics.stop()
+                except Exception as e:
+                    logger.debug(f'Exception saving executor metrics: {e}')
+                else:
+                    logger.debug(f'Saved executor metrics to "{report}"')
             if client is not None:
                 try:
                     client.close(timeout=10)
@@ -189,6 +197,45 @@ def cb_executor(ctx, param, value):
     return client
 
 
+def _parse_distributed(value):
+    """ Parse "distributed" executor options
+
+    Accepts a scheduler address, number of workers, "auto", or a cluster
+    profile name optionally followed by the number of workers or the
+    range of workers to adaptively scale between (e.g., "io-heavy",
+    "cpu-heavy:8", or "cpu-heavy:2-16")
+    """
+    kwds = {'address': None, 'n_workers': None}
+    if value is None:
+        raise click.BadParameter('Must provide number of workers, "auto", '
+                                 'cluster profile, or scheduler address')
+
+    profile, _, workers = value.partition(':')
+    if profile in CLUSTER_PROFILES:
+        kwds['profile'] = profile
+    else:
+        workers = value
+
+    if workers == AUTO or (not workers and 'profile' in kwds):
+        kwds['n_workers'] = AUTO
+    elif re.match(r'^\d+-\d+$', workers):
+        minimum, maximum = map(int, workers.split('-'))
+        if minimum > maximum:
+            raise click.BadParameter(f'Minimum number of workers is larger '
+                                     f'than maximum ("{workers}")')
+        kwds['adapt'] = (minimum, maximum)
+    elif workers.isdigit():
+        kwds['n_workers'] = int(workers)
+    elif 'profile' in kwds:
+        raise click.BadParameter(f'Cannot parse number of workers for '
+                                 f'cluster profile "{profile}" from '
+                                 f'"{workers}"')
+    else:
+        kwds['address'] = value
+
+    return kwds
+
+
 opt_executor = click.option(
     '--executor', type=(click.Choice(EXECUTORS), str),
     default=('sync', None), show_default=True,
@@ -196,6 +243,22 @@ opt_executor = click.option(
     help=(
         'Configure parallel processing options for Dask locally ("sync", '
         '"threads", or "processes") or using Distributed ("distributed"). '
-        'Must provide either worker count or scheduler address (ip:port).'
+        'Must provide either worker count, "auto" to size workers using the '
+        'CPU and memory available (including container limits), or '
+        'scheduler address (ip:port). For "distributed", you may also give '
+        f'a cluster profile ({", ".join(CLUSTER_PROFILES)}) optionally '
+        'followed by a worker count or range of workers to adaptively '
+        'scale between (e.g., "cpu-heavy:2-16").'
+    )
+)
+
+opt_performance_report = click.option(
+    '--%s' % _KEY_PERFORMANCE_REPORT, default=None, is_eager=True,
+    type=click.Path(dir_okay=False, writable=True, resolve_path=True),
+    help=(
+        'Save a report of task durations, data transfers, memory spilled, '
+        'and worker memory use when using the "distributed" executor. '
+        'Saves as JSON, or as a Dask performance report if the filename '
+        'ends with ".html"'
     )
 )
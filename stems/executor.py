@@ -1,16 +1,83 @@
 """ Dask/Distributed related helpers
 """
+from collections import defaultdict
+import contextlib
+import json
 import logging
+import math
+import os
+from pathlib import Path
 import socket
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+#: str: Value for number of workers that sizes workers using resource limits
+AUTO = 'auto'
+
+#: dict: Worker memory fractions used when sizing ``LocalCluster`` workers
+#: automatically
+AUTO_MEMORY_FRACTIONS = {
+    'target': 0.6,
+    'spill': 0.7,
+    'pause': 0.8,
+    'terminate': 0.95
+}
+
+#: tuple: Environment variables controlling BLAS/OpenMP thread pools
+THREAD_LIMIT_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+)
+
+#: dict: Named ``LocalCluster`` layouts suited for different kinds of work
+CLUSTER_PROFILES = {
+    # Many threads per worker for work that waits on GDAL/NetCDF reads
+    'io-heavy': {
+        'threads_per_worker': 4,
+        'processes': True,
+    },
+    # Many single threaded workers for GIL-bound or NumPy model fitting work
+    'cpu-heavy': {
+        'threads_per_worker': 1,
+        'processes': True,
+    },
+}
+
+_CGROUP_ROOT = Path('/sys/fs/cgroup')
+
 
 def setup_backend(scheduler, workers=None):
     """ Setup Dask to use threads or processes
+
+    Parameters
+    ----------
+    scheduler : str
+        Dask scheduler ("sync", "threads", or "processes")
+    workers : int or str, optional
+        Number of threads or processes. If "auto", determines the number
+        of workers from the CPUs available to this process (including any
+        container/cgroup quota) and limits BLAS/OpenMP threads so workers
+        don't oversubscribe the CPUs
+
+    Raises
+    ------
+    KeyError
+        Raised if ``scheduler`` isn't supported
     """
     import dask
 
+    if workers == AUTO and scheduler in ('threads', 'processes', ):
+        resources = available_resources()
+        workers = resources['cpu']
+        logger.debug(f'Automatically determined {workers} workers from '
+                     f'available resources ({resources})')
+        limit_threads(1)
+
     if scheduler in ('sync', 'single-threaded', 'synchronous', ):
         logger.debug('Using the synchronous/single-threaded backend')
         dask.config.set(scheduler='synchronous')
@@ -34,7 +101,8 @@ def setup_backend(scheduler, workers=None):
         raise KeyError(f'Unsupported scheduler "{scheduler}"')
 
 
-def setup_executor(address=None, n_workers=None, threads_per_worker=1, **kwds):
+def setup_executor(address=None, n_workers=None, threads_per_worker=None,
+                   profile=None, adapt=None, **kwds):
     """ Setup a Dask distributed cluster scheduler client
 
     Parameters
@@ -42,10 +110,24 @@ def setup_executor(address=None, n_workers=None, threads_per_worker=1, **kwds):
     address : str, optional
         This can be the address of a ``Scheduler`` server, like a string
         ``'127.0.0.1:8786'``. If ``None``, sets up a ``LocalCluster``
-    n_workers : int, optional
-        Number of workers. Only used if setting up a ``LocalCluster``
+    n_workers : int or str, optional
+        Number of workers. Only used if setting up a ``LocalCluster``. If
+        "auto", the number of workers and their memory limit are determined
+        from the CPUs and memory available to this process (including any
+        container/cgroup limits). When creating a ``LocalCluster``, its
+        workers also use the memory fractions in
+        :py:data:`AUTO_MEMORY_FRACTIONS` and BLAS/OpenMP threads are limited
+        to ``threads_per_worker``
     threads_per_worker : int, optional
-        Number of threads per worker
+        Number of threads per worker. Defaults to 1, or the number given by
+        the ``profile``
+    profile : str, optional
+        Name of a ``LocalCluster`` layout (:py:data:`CLUSTER_PROFILES`),
+        like "io-heavy" or "cpu-heavy". If ``n_workers`` is not given, the
+        number of workers is determined automatically
+    adapt : tuple[int, int], optional
+        Minimum and maximum number of workers used to adaptively scale
+        a ``LocalCluster``
     kwds
         Additional options passed to :py:func:`distributed.Client`
 
@@ -53,18 +135,94 @@ def setup_executor(address=None, n_workers=None, threads_per_worker=1, **kwds):
     -------
     distributed.Client
         Distributed compute client
+
+    Raises
+    ------
+    KeyError
+        Raised if ``profile`` is not a known cluster profile
+    ValueError
+        Raised if asking to adaptively scale a remote cluster
     """
+    import dask
     import distributed
+
+    if profile is not None:
+        layout = cluster_profile(profile)
+        profile_threads = layout.pop('threads_per_worker', None)
+        threads_per_worker = threads_per_worker or profile_threads
+        for key, value in layout.items():
+            kwds.setdefault(key, value)
+        if n_workers is None and adapt is None:
+            n_workers = AUTO
+    threads_per_worker = threads_per_worker or 1
+
+    if adapt is not None:
+        if address is not None:
+            raise ValueError('Can only adaptively scale a `LocalCluster` '
+                             '(``address=None``)')
+        minimum, maximum = adapt
+        if n_workers is None:
+            n_workers = minimum
+
+    config = {}
+    if n_workers == AUTO:
+        resources = available_resources()
+        n_workers = max(1, resources['cpu'] // threads_per_worker)
+        if resources['memory'] and address is None:
+            n_max = max(n_workers, adapt[1]) if adapt else n_workers
+            kwds.setdefault('memory_limit', resources['memory'] // n_max)
+        logger.debug(f'Automatically determined {n_workers} workers from '
+                     f'available resources ({resources})')
+        if address is None:
+            config = _memory_fraction_config()
+            if kwds.get('processes', True):
+                # Passed to each worker's ``Nanny``, so workers started
+                # later (e.g., when adaptively scaling) use them too
+                kwds.setdefault('config', config)
+            limit_threads(threads_per_worker)
+
     try:
-        client = distributed.Client(address=address,
-                                    n_workers=n_workers,
-                                    threads_per_worker=threads_per_worker,
-                                    **kwds)
+        # Only affects workers of the ``LocalCluster`` created here
+        with dask.config.set(config):
+            if address is None:
+                kwds.update(n_workers=n_workers,
+                            threads_per_worker=threads_per_worker)
+            client = distributed.Client(address=address, **kwds)
     except Exception as e:
         logger.exception('Could not start `distributed` cluster')
         raise
-    else:
-        return client
+
+    if adapt is not None:
+        logger.debug(f'Adaptively scaling cluster between {minimum} and '
+                     f'{maximum} workers')
+        client.cluster.adapt(minimum=minimum, maximum=maximum)
+
+    return client
+
+
+def cluster_profile(name):
+    """ Return ``LocalCluster`` options for a named cluster profile
+
+    Parameters
+    ----------
+    name : str
+        Name of profile (see :py:data:`CLUSTER_PROFILES`)
+
+    Returns
+    -------
+    dict
+        Options for ``LocalCluster`` (e.g., ``threads_per_worker``)
+
+    Raises
+    ------
+    KeyError
+        Raised if ``name`` is not a known cluster profile
+    """
+    try:
+        return CLUSTER_PROFILES[name].copy()
+    except KeyError:
+        raise KeyError(f'Unknown cluster profile "{name}" (options: '
+                       f'{", ".join(CLUSTER_PROFILES)})')
 
 
 def executor_info(client, ip=True, bokeh=True, stats=True):
@@ -126,3 +284,410 @@ def executor_info(client, ip=True, bokeh=True, stats=True):
         infos.append('Memory: {0}'.format(memory))
 
     return infos
+
+
+# =============================================================================
+# Metrics
+class ExecutorMetrics(object):
+    """ Record performance metrics of a Dask distributed cluster
+
+    Records the task stream (task durations and data transfers), worker
+    memory spilled to disk, and samples the memory use of each worker in a
+    background thread to track memory high-water marks. Use as a context
+    manager, or call :py:meth:`start` and :py:meth:`stop` yourself.
+
+    Parameters
+    ----------
+    client : distributed.Client
+        Distributed client
+    interval : float, optional
+        Seconds between samples of worker memory use
+    report : str or Path, optional
+        Save a performance report when stopped. If the filename ends with
+        ".html", saves the HTML performance report from
+        :py:func:`distributed.performance_report`. Otherwise saves
+        :py:meth:`snapshot` as JSON
+    n_slowest : int, optional
+        Number of slowest ("straggler") tasks to record
+
+    Examples
+    --------
+    >>> with ExecutorMetrics(client, report='metrics.json') as metrics:
+    ...     ds.mean('time').compute()
+    >>> metrics.snapshot()['workers']
+    """
+
+    def __init__(self, client, interval=1.0, report=None, n_slowest=10):
+        self.client = client
+        self.interval = interval
+        self.report = Path(report) if report else None
+        self.n_slowest = n_slowest
+
+        self._start = None
+        self._stop = None
+        self._tasks = []
+        self._transfers = {}
+        self._memory = defaultdict(dict)
+        # Guards ``_memory``, which is updated by the sampler thread
+        self._memory_lock = threading.Lock()
+        self._sampler = None
+        self._stop_sampling = threading.Event()
+        self._exit_stack = None
+        self._task_stream = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def running(self):
+        """ bool: True if currently recording metrics
+        """
+        return self._exit_stack is not None
+
+    def start(self):
+        """ Start recording metrics
+
+        Returns
+        -------
+        ExecutorMetrics
+            This metrics recorder
+        """
+        import distributed
+
+        if self.running:
+            raise RuntimeError('Already recording metrics')
+
+        self._start, self._stop = time.time(), None
+        self._tasks, self._transfers = [], {}
+        with self._memory_lock:
+            self._memory = defaultdict(dict)
+
+        self._exit_stack = contextlib.ExitStack()
+        if self.report and self.report.suffix == '.html':
+            with self.client.as_current():
+                self._exit_stack.enter_context(
+                    distributed.performance_report(filename=str(self.report))
+                )
+        self._task_stream = self._exit_stack.enter_context(
+            distributed.get_task_stream(client=self.client)
+        )
+
+        self._stop_sampling.clear()
+        self._sample_memory()
+        self._sampler = threading.Thread(target=self._sample_loop,
+                                         name='stems-metrics', daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        """ Stop recording metrics, and save the report if requested
+
+        Returns
+        -------
+        dict
+            Metrics (see :py:meth:`snapshot`)
+        """
+        if not self.running:
+            raise RuntimeError('Not recording metrics')
+
+        self._stop_sampling.set()
+        self._sampler.join()
+        self._sample_memory()
+        self._transfers = self._collect_transfers()
+
+        try:
+            with self.client.as_current():
+                self._exit_stack.close()
+        except Exception:
+            # e.g., HTML performance reports need `bokeh`
+            logger.exception('Could not save performance report')
+        self._tasks = list(self._task_stream.data)
+        self._exit_stack, self._stop = None, time.time()
+
+        metrics = self.snapshot()
+        if self.report and self.report.suffix != '.html':
+            self.to_json(self.report, metrics=metrics)
+        return metrics
+
+    def snapshot(self):
+        """ Return metrics recorded so far
+
+        Returns
+        -------
+        dict
+            Metrics, including:
+
+            * "duration": seconds spent recording
+            * "tasks": count and compute duration statistics for each kind
+              of task (grouped by key prefix)
+            * "slowest": the ``n_slowest`` longest running tasks
+            * "transfer": count, bytes, and duration of data transfers
+              between workers
+            * "spill": count and bytes written to or read from disk
+            * "workers": per-worker task counts, compute time, memory
+              high-water mark, and memory limit
+        """
+        from distributed.utils import key_split
+
+        if self.running:
+            tasks = self.client.get_task_stream(start=self._start)
+            transfers = self._collect_transfers()
+        else:
+            tasks, transfers = self._tasks, self._transfers
+        stop = self._stop or time.time()
+
+        task_stats = defaultdict(lambda: {'count': 0, 'total': 0., 'max': 0.})
+        workers = defaultdict(lambda: {'tasks': 0, 'compute': 0.})
+        spill = {'count': 0, 'duration': 0.}
+        durations = []
+        for task in tasks:
+            for ss in task.get('startstops', ()):
+                duration = ss['stop'] - ss['start']
+                if ss['action'] == 'compute':
+                    stats = task_stats[key_split(task['key'])]
+                    stats['count'] += 1
+                    stats['total'] += duration
+                    stats['max'] = max(stats['max'], duration)
+                    workers[task['worker']]['tasks'] += 1
+                    workers[task['worker']]['compute'] += duration
+                    durations.append((duration, str(task['key']),
+                                      task['worker']))
+                elif ss['action'] in ('disk-read', 'disk-write', ):
+                    spill['count'] += 1
+                    spill['duration'] += duration
+        for stats in task_stats.values():
+            stats['mean'] = stats['total'] / stats['count']
+
+        transfer = {'count': 0, 'nbytes': 0, 'duration': 0.}
+        for log in transfers.values():
+            for entry in log:
+                transfer['count'] += 1
+                transfer['nbytes'] += entry.get('total', 0)
+                transfer['duration'] += entry.get('duration', 0.)
+
+        with self._memory_lock:
+            memories = {k: dict(v) for k, v in self._memory.items()}
+        spill['nbytes'] = sum(m.get('spilled', 0) for m in memories.values())
+        for worker, memory in memories.items():
+            workers[worker].update({
+                'memory_max': memory.get('max', 0),
+                'memory_limit': memory.get('limit', None),
+                'spilled': memory.get('spilled', 0)
+            })
+
+        return {
+            'duration': stop - self._start if self._start else 0.,
+            'tasks': dict(task_stats),
+            'slowest': [
+                {'key': key, 'worker': worker, 'duration': duration}
+                for duration, key, worker in
+                sorted(durations, reverse=True)[:self.n_slowest]
+            ],
+            'transfer': transfer,
+            'spill': spill,
+            'workers': {k: dict(v) for k, v in workers.items()}
+        }
+
+    def to_json(self, path, metrics=None):
+        """ Save metrics to a JSON file
+
+        Parameters
+        ----------
+        path : str or Path
+            Save to this file
+        metrics : dict, optional
+            Metrics to save. Defaults to :py:meth:`snapshot`
+
+        Returns
+        -------
+        Path
+            Saved file path
+        """
+        metrics = metrics or self.snapshot()
+        with open(str(path), 'w') as dst:
+            json.dump(metrics, dst, indent=2, default=str)
+        logger.debug(f'Saved executor metrics to "{path}"')
+        return Path(path)
+
+    def _sample_loop(self):
+        while not self._stop_sampling.wait(self.interval):
+            self._sample_memory()
+
+    def _sample_memory(self):
+        try:
+            info = self.client.scheduler_info()
+        except Exception:
+            logger.debug('Could not retrieve scheduler info', exc_info=True)
+            return
+
+        for worker, winfo in info.get('workers', {}).items():
+            metrics = winfo.get('metrics', {})
+            memory = metrics.get('memory', winfo.get('memory', 0)) or 0
+            spilled = metrics.get('spilled_bytes', {}).get('disk', 0)
+            with self._memory_lock:
+                record = self._memory[worker]
+                record['max'] = max(record.get('max', 0), memory)
+                record['spilled'] = max(record.get('spilled', 0), spilled)
+                record['limit'] = winfo.get('memory_limit', None)
+
+    def _collect_transfers(self):
+        start = self._start
+
+        def _transfers(dask_worker):
+            log = (getattr(dask_worker, 'transfer_incoming_log', None) or
+                   getattr(dask_worker, 'incoming_transfer_log', None) or ())
+            return [{'total': entry.get('total', 0),
+                     'duration': entry.get('duration', 0.)}
+                    for entry in log if entry.get('start', 0) >= start]
+
+        try:
+            return self.client.run(_transfers)
+        except Exception:
+            logger.debug('Could not retrieve worker transfer logs',
+                         exc_info=True)
+            return {}
+
+
+# =============================================================================
+# Resources
+def available_resources():
+    """ Return the number of CPUs and memory available to this process
+
+    Considers CPU affinity and container (cgroup v1 or v2) CPU quota and
+    memory limits, which are not reflected in :py:func:`os.cpu_count`.
+
+    Returns
+    -------
+    dict
+        Number of CPUs ("cpu") and memory in bytes ("memory"). Memory is
+        ``None`` if it cannot be determined
+    """
+    try:
+        ncpu = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on all platforms
+        ncpu = os.cpu_count() or 1
+
+    quota = cgroup_cpu_limit()
+    if quota is not None:
+        ncpu = min(ncpu, max(1, int(math.floor(quota))))
+
+    memory = _total_memory()
+    limit = cgroup_memory_limit()
+    if limit is not None:
+        memory = min(memory, limit) if memory else limit
+
+    return {'cpu': ncpu, 'memory': memory}
+
+
+def cgroup_cpu_limit(root=None):
+    """ Return the CPU quota (as a number of CPUs) set by cgroups, if any
+
+    Parameters
+    ----------
+    root : str or Path, optional
+        cgroup filesystem mount point (default: "/sys/fs/cgroup")
+
+    Returns
+    -------
+    float or None
+        Number of CPUs allowed, or ``None`` if not limited
+    """
+    root = Path(root or _CGROUP_ROOT)
+    # cgroup v2 -- "$MAX $PERIOD"
+    text = _read_cgroup_file(root.joinpath('cpu.max'))
+    if text:
+        quota, period = (text.split() + ['100000'])[:2]
+        if quota == 'max':
+            return None
+        return int(quota) / int(period)
+
+    # cgroup v1
+    for subdir in ('cpu', 'cpu,cpuacct', ):
+        quota = _read_cgroup_file(root.joinpath(subdir, 'cpu.cfs_quota_us'))
+        period = _read_cgroup_file(root.joinpath(subdir, 'cpu.cfs_period_us'))
+        if quota and period:
+            if int(quota) <= 0:
+                return None
+            return int(quota) / int(period)
+
+    return None
+
+
+def cgroup_memory_limit(root=None):
+    """ Return the memory limit (in bytes) set by cgroups, if any
+
+    Parameters
+    ----------
+    root : str or Path, optional
+        cgroup filesystem mount point (default: "/sys/fs/cgroup")
+
+    Returns
+    -------
+    int or None
+        Memory limit in bytes, or ``None`` if not limited
+    """
+    root = Path(root or _CGROUP_ROOT)
+    for path in (root.joinpath('memory.max'),
+                 root.joinpath('memory', 'memory.limit_in_bytes')):
+        text = _read_cgroup_file(path)
+        if text:
+            if text == 'max':
+                return None
+            limit = int(text)
+            # cgroup v1 reports a huge number (page counter max) if unlimited
+            if limit >= 2 ** 60:
+                return None
+            return limit
+    return None
+
+
+def limit_threads(n=1):
+    """ Limit the number of threads used by BLAS/OpenMP libraries
+
+    Sets environment variables (:py:data:`THREAD_LIMIT_ENV_VARS`) inherited
+    by worker processes and libraries not yet loaded. If ``threadpoolctl``
+    is installed, also limits thread pools of libraries already loaded.
+
+    Parameters
+    ----------
+    n : int, optional
+        Maximum number of threads each library thread pool should use
+    """
+    n = max(1, int(n))
+    for var in THREAD_LIMIT_ENV_VARS:
+        os.environ[var] = str(n)
+
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        logger.debug('Cannot limit threads of loaded libraries without '
+                     '`threadpoolctl`')
+    else:
+        threadpool_limits(limits=n)
+    logger.debug(f'Limited BLAS/OpenMP thread pools to {n} thread(s)')
+
+
+def _memory_fraction_config(fractions=None):
+    fractions = fractions or AUTO_MEMORY_FRACTIONS
+    return {
+        f'distributed.worker.memory.{key}': value
+        for key, value in fractions.items()
+    }
+
+
+def _read_cgroup_file(path):
+    try:
+        with open(str(path)) as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def _total_memory():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
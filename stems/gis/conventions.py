@@ -13,7 +13,7 @@ from rasterio.coords import BoundingBox
 import xarray as xr
 
 from . import projections, utils
-from .coords import coords_to_transform
+from .coords import coords_to_transform, transform_to_coords
 
 
 logger = logging.getLogger(__name__)
@@ -64,9 +64,16 @@ CF_NC_ATTRS = OrderedDict((
 # ============================================================================
 # Georeferencing
 def georeference(xarr, crs, transform=None,
-                 grid_mapping='crs', inplace=False):
+                 grid_mapping='crs', inplace=False, lightweight=False):
     """ Georeference XArray data with the CRS and Affine transform
 
+    The default behavior copies ``xarr`` and recreates the y/x coordinates.
+    Use ``lightweight=True`` to only attach attributes and the grid mapping
+    variable to a shallow copy of ``xarr`` that shares its data and
+    coordinates, which is much faster for Datasets with many (Dask-backed)
+    variables. In this mode, missing y/x coordinates are created from the
+    ``transform`` and the size of the y/x dimensions.
+
     Parameters
     ----------
     xarr : xarray.DataArray or xarray.Dataset
@@ -80,6 +87,9 @@ def georeference(xarr, crs, transform=None,
         Name to use for grid mapping variable
     inplace : bool, optional
         If ``False``, returns a modified shallow copy of ``xarr``
+    lightweight : bool, optional
+        Only attach georeferencing metadata, sharing existing data and
+        coordinates
 
     Returns
     -------
@@ -91,6 +101,11 @@ def georeference(xarr, crs, transform=None,
     assert transform is None or isinstance(transform, Affine)
     assert isinstance(grid_mapping, str)
 
+    if lightweight:
+        return _georeference_lightweight(xarr, crs, transform,
+                                         grid_mapping=grid_mapping,
+                                         inplace=inplace)
+
     # Copy as needed
     xarr = xarr if inplace else xarr.copy()
 
@@ -124,6 +139,51 @@ def georeference(xarr, crs, transform=None,
     return xarr
 
 
+def _georeference_lightweight(xarr, crs, transform=None,
+                              grid_mapping='crs', inplace=False):
+    # Shallow copy shares data, but not attributes
+    xarr = xarr if inplace else xarr.copy(deep=False)
+    dim_x, dim_y = projections.cf_xy_coord_names(crs)
+    attrs_y, attrs_x = _coordinate_attrs(crs)
+
+    if dim_y in xarr.coords and dim_x in xarr.coords:
+        xarr.coords.variables[dim_y].attrs.update(attrs_y)
+        xarr.coords.variables[dim_x].attrs.update(attrs_x)
+    elif transform is not None:
+        y, x = transform_to_coords(transform,
+                                   height=xarr.sizes[dim_y],
+                                   width=xarr.sizes[dim_x])
+        xarr.coords[dim_y] = xr.Variable((dim_y, ), y, attrs=attrs_y)
+        xarr.coords[dim_x] = xr.Variable((dim_x, ), x, attrs=attrs_x)
+    else:
+        raise ValueError('Must provide `transform` if data does not have '
+                         f'"{dim_y}" and "{dim_x}" coordinates')
+
+    if transform is None:
+        transform = coords_to_transform(xarr.coords[dim_y],
+                                        xarr.coords[dim_x],
+                                        center=True, assume_unique=False)
+
+    xarr.coords[grid_mapping] = create_grid_mapping(crs, transform,
+                                                    grid_mapping=grid_mapping)
+
+    # Modify attributes of the variables, not the variables in the Dataset
+    if isinstance(xarr, xr.DataArray):
+        variables = {xarr.name: xarr.variable}
+    else:
+        variables = {name: xarr.variables[name] for name in xarr.data_vars}
+    for name, var in variables.items():
+        if dim_x in var.dims and dim_y in var.dims:
+            var.attrs['grid_mapping'] = grid_mapping
+        else:
+            logger.debug(f'Not georeferencing "{name}" because it lacks x/y '
+                         f'dimensions ("{dim_x}" and "{dim_y}")')
+
+    xarr.attrs.update(CF_NC_ATTRS)
+
+    return xarr
+
+
 def is_georeferenced(xarr, grid_mapping='crs', required_gdal=False):
     """ Determine if XArray data is georeferenced
 
@@ -337,14 +397,7 @@ def create_coordinates(y, x, crs):
         coords_x = {dim_x: x.coords[dim_x]}
 
     # 5. Get copies of attributes
-    attrs_y = COORD_DEFS[var_y].copy()
-    attrs_x = COORD_DEFS[var_x].copy()
-
-    # If projected we add a few extra definitions
-    if crs.is_projected:
-        crs_osr = utils.crs2osr(crs)
-        units = crs_osr.GetLinearUnitsName().lower()
-        attrs_y['units'], attrs_x['units'] = units, units
+    attrs_y, attrs_x = _coordinate_attrs(crs)
 
     # Lastly, create DataArrays
     dims_y = (dim_y, ) if data_y.shape else ()
@@ -356,3 +409,18 @@ def create_coordinates(y, x, crs):
                      name=var_x, attrs=attrs_x)
 
     return y, x
+
+
+def _coordinate_attrs(crs):
+    # Return copies of y/x coordinate attributes for a CRS
+    var_x, var_y = projections.cf_xy_coord_names(crs)
+    attrs_y = COORD_DEFS[var_y].copy()
+    attrs_x = COORD_DEFS[var_x].copy()
+
+    # If projected we add a few extra definitions
+    if crs.is_projected:
+        crs_osr = utils._crs2osr(crs)
+        units = crs_osr.GetLinearUnitsName().lower()
+        attrs_y['units'], attrs_x['units'] = units, units
+
+    return attrs_y, attrs_x
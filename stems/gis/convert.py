@@ -15,7 +15,7 @@ representations:
     * :py:class:`shapely.geom.Polygon`
 
 """
-from functools import singledispatch
+from functools import lru_cache, singledispatch
 import logging
 
 from affine import Affine
@@ -28,8 +28,9 @@ import shapely.geometry
 
 from ..utils import (find_subclasses,
                      register_multi_singledispatch)
+from .utils import CRS_CACHE_SIZE
 
-logger = logging.getLogger()
+logger = logging.getLogger(__name__)
 
 LIST_TYPE = (tuple, list, np.ndarray, )
 # XARRAY_TYPE = (xr.Dataset, xr.DataArray)
@@ -93,6 +94,11 @@ def to_crs(value):
     -------
     rasterio.crs.CRS
         CRS
+
+    Notes
+    -----
+    CRS parsed from strings are cached (see
+    :py:data:`stems.gis.utils.CRS_CACHE_SIZE`)
     """
     raise _CANT_CONVERT(value)
 
@@ -103,18 +109,19 @@ def _to_crs_crs(value):
 
 
 @to_crs.register(str)
+@lru_cache(maxsize=CRS_CACHE_SIZE)
 def _to_crs_str(value):
     # After rasterio=1.0.14 WKT is backbone so try it first
     try:
         crs_ = CRS.from_wkt(value)
         crs_.is_valid
     except CRSError as err:
-        logger.debug('Could not parse CRS as WKT', err)
+        logger.debug(f'Could not parse CRS as WKT: {err}')
         try:
             crs_ = CRS.from_string(value)
             crs_.is_valid
         except CRSError as err:
-            logger.debug('Could not parse CRS as Proj4', err)
+            logger.debug(f'Could not parse CRS as Proj4: {err}')
             raise CRSError('Could not interpret CRS input as '
                            'either WKT or Proj4')
     return crs_
@@ -16,7 +16,7 @@ logger = logging.getLogger(__name__)
 def transform_to_coords(transform,
                         bbox=None,
                         width=None, height=None,
-                        center=True):
+                        center=True, virtual=False):
     """ Return the coordinates for a given transform
 
     This function needs to know how many pixels are in the raster,
@@ -38,6 +38,9 @@ def transform_to_coords(transform,
         Number of pixels wide
     center : bool, optional
         Return coordinates for the center of each pixel
+    virtual : bool, optional
+        Return :py:class:`AffineCoordinate` that compute coordinate values
+        only when needed
 
     Returns
     -------
@@ -69,6 +72,10 @@ def transform_to_coords(transform,
                          "or the dimensions (`height` and `width`) "
                          "of the raster grid.")
 
+    if virtual:
+        return (AffineCoordinate(transform, height, 'y', center=center),
+                AffineCoordinate(transform, width, 'x', center=center))
+
     offset = 0.5 if center else 0.0
 
     x, _ = (np.arange(width) + offset, np.zeros(width) + offset) * transform
@@ -121,6 +128,30 @@ def transform_to_bounds(transform, height, width):
         raise ValueError("Not implemented for rotated transformations (TODO)")
 
 
+def coords_to_indices(transform, y, x):
+    """ Return the row/column of pixels containing some coordinates
+
+    Parameters
+    ----------
+    transform : affine.Affine
+        Affine transform
+    y : array-like
+        Y coordinates (latitude, y, etc)
+    x : array-like
+        X coordinates (longitude, x, etc)
+
+    Returns
+    -------
+    rows, cols : tuple[np.ndarray, np.ndarray]
+        Row and column indexes (may be outside of the raster)
+    """
+    y = np.asarray(y, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    cols, rows = (x, y) * ~transform
+    return (np.floor(rows).astype(np.int64),
+            np.floor(cols).astype(np.int64))
+
+
 # ============================================================================
 # From coordinates
 def coords_to_transform(y, x, center=True, assume_unique=True):
@@ -185,6 +216,15 @@ def coords_to_bounds(y, x, center=True, assume_unique=True):
 # TODO: @lru_cache?
 def _inspect_coords(y, x, center=True, assume_unique=True):
     # returns transform, bounds, shape
+    y, x = _affine_coordinate(y), _affine_coordinate(x)
+    if (isinstance(y, AffineCoordinate) and isinstance(x, AffineCoordinate)
+            and y.center == center and x.center == center):
+        # Exact, and no need to look at the coordinate values
+        transform = Affine(x.transform.a, 0., x.transform.c,
+                           0., y.transform.e, y.transform.f)
+        bounds = transform_to_bounds(transform, len(y), len(x))
+        return transform, bounds, (len(x), len(y))
+
     y_ = np.atleast_1d(y)
     x_ = np.atleast_1d(x)
 
@@ -243,6 +283,128 @@ def _inspect_coords(y, x, center=True, assume_unique=True):
     return transform, bounds, (nx, ny)
 
 
+class AffineCoordinate(object):
+    """ Y or X coordinates of pixels along an axis of an affine transform
+
+    Coordinates are defined by the ``transform`` and the number of pixels
+    and are only calculated when needed (e.g., when converted to a
+    :py:class:`np.ndarray`). Slicing with a positive step returns another
+    :py:class:`AffineCoordinate`. The transform can be recovered exactly
+    by :py:func:`coords_to_transform`.
+
+    Parameters
+    ----------
+    transform : affine.Affine
+        Affine transform (without rotation)
+    size : int
+        Number of pixels along the axis
+    axis : {'y', 'x'}
+        Axis of the coordinate
+    center : bool, optional
+        Coordinates are for the center of each pixel
+    """
+    ndim = 1
+    dtype = np.dtype(np.float64)
+
+    def __init__(self, transform, size, axis, center=True):
+        if axis not in ('y', 'x'):
+            raise ValueError(f'Unknown axis "{axis}" (must be "y" or "x")')
+        if transform.b or transform.d:
+            raise ValueError('Not implemented for rotated transformations')
+        self.transform = transform
+        self.size = int(size)
+        self.axis = axis
+        self.center = center
+
+    def __repr__(self):
+        return (f'AffineCoordinate(axis={self.axis}, size={self.size}, '
+                f'start={self.start}, step={self.step})')
+
+    @property
+    def shape(self):
+        """ tuple[int]: Shape of the coordinate
+        """
+        return (self.size, )
+
+    @property
+    def step(self):
+        """ float: Spacing between coordinates (pixel size)
+        """
+        return self.transform.a if self.axis == 'x' else self.transform.e
+
+    @property
+    def start(self):
+        """ float: First coordinate
+        """
+        origin = self.transform.c if self.axis == 'x' else self.transform.f
+        return origin + self.step * (0.5 if self.center else 0.)
+
+    @property
+    def values(self):
+        """ np.ndarray: Coordinate values
+        """
+        return self._values(np.arange(self.size))
+
+    def __len__(self):
+        return self.size
+
+    def __array__(self, dtype=None, copy=None):
+        values = self.values
+        return values if dtype is None else values.astype(dtype)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple) and len(key) == 1:
+            key = key[0]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.size)
+            if step > 0:
+                size = len(range(start, stop, step))
+                # Keep pixel centers when pixels get larger
+                if self.center:
+                    start += 0.5 - 0.5 * step
+                if self.axis == 'x':
+                    window = (Affine.translation(start, 0) *
+                              Affine.scale(step, 1))
+                else:
+                    window = (Affine.translation(0, start) *
+                              Affine.scale(1, step))
+                return self.__class__(self.transform * window, size,
+                                      self.axis, center=self.center)
+        elif isinstance(key, (int, np.integer)):
+            if not -self.size <= key < self.size:
+                raise IndexError(f'Index {key} is out of bounds for '
+                                 f'coordinate with size {self.size}')
+            return float(self._values(np.asarray(key % self.size)))
+        return self.values[key]
+
+    def _values(self, index):
+        # Same calculation as ``transform_to_coords``
+        offset = 0.5 if self.center else 0.0
+        index = index + offset
+        if self.axis == 'x':
+            values, _ = (index, np.zeros_like(index) + offset) * self.transform
+        else:
+            _, values = (np.zeros_like(index) + offset, index) * self.transform
+        return values
+
+
+def _affine_coordinate(coord):
+    # Unwrap XArray coordinates indexed by ``stems.gis.indexes.AffineIndex``
+    if isinstance(coord, AffineCoordinate):
+        return coord
+    xindexes = getattr(coord, 'xindexes', None)
+    if xindexes is not None and getattr(coord, 'name', None) in xindexes:
+        index = xindexes[coord.name]
+        transform = getattr(index, 'transform', None)
+        coordinate = getattr(transform, 'coordinate', None)
+        if isinstance(coordinate, AffineCoordinate):
+            return coordinate
+    return coord
+
+
 def _check_spacing(coord):
     """ Check for equal spacing (see GDAL NetCDF driver)
 
@@ -23,7 +23,7 @@ from rasterio.crs import CRS
 import shapely.geometry
 
 from .coords import transform_to_coords
-from . import convert, geom
+from . import convert, geom, projections
 
 
 logger = logging.getLogger(__name__)
@@ -472,17 +472,20 @@ class Tile(object):
 
     @property
     def height(self):
-        """ int : The number of columns in this Tile
+        """ int : The number of rows in this Tile
         """
-        return self.size[0]
+        return self.size[1]
 
-    def coords(self, center=True):
+    def coords(self, center=True, virtual=False):
         """ Return y/x pixel coordinates
 
         Parameters
         ----------
         center : bool, optional
             Return coordinates for pixel centers (default)
+        virtual : bool, optional
+            Return :py:class:`stems.gis.coords.AffineCoordinate` that
+            compute coordinate values only when needed
 
         Returns
         -------
@@ -494,7 +497,31 @@ class Tile(object):
         return transform_to_coords(self.transform,
                                    width=self.width,
                                    height=self.height,
-                                   center=center)
+                                   center=center,
+                                   virtual=virtual)
+
+    def coordinates(self, center=True):
+        """ Return y/x coordinates for XArray data on this Tile
+
+        The coordinates are indexed by
+        :py:class:`stems.gis.indexes.AffineIndex`, so their values are not
+        materialized and the transform is recovered exactly, without
+        inspecting coordinate spacing.
+
+        Parameters
+        ----------
+        center : bool, optional
+            Return coordinates for pixel centers (default)
+
+        Returns
+        -------
+        xarray.Coordinates
+            Y/X coordinates, named for the Tile's CRS
+        """
+        from .indexes import affine_coordinates
+        dims = projections.cf_xy_coord_names(self.crs)[::-1]
+        return affine_coordinates(self.transform, self.height, self.width,
+                                  dims=dims, center=center)
 
     def geojson(self, crs=_GEOJSON_EPSG_4326_STRING):
         """ Return this Tile's geometry as GeoJSON
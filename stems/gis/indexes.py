@@ -0,0 +1,235 @@
+""" XArray indexes for y/x coordinates defined by an affine transform
+
+Dimension coordinates given to XArray as arrays (including
+:py:class:`stems.gis.coords.AffineCoordinate`) are converted into a
+:py:class:`pandas.Index`, materializing their values. The
+:py:class:`AffineIndex` keeps the coordinates defined by the transform
+instead, computing values only for the elements requested, and is kept
+when the data are sliced.
+
+Requires a version of XArray with
+:py:class:`xarray.indexes.CoordinateTransformIndex`. With older versions,
+this module can be imported but creating an :py:class:`AffineIndex` raises
+an :py:class:`ImportError`.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+_HAS_TRANSFORM_INDEX = True
+try:
+    from xarray.core.indexing import IndexSelResult
+    from xarray.indexes import (CoordinateTransform,
+                                CoordinateTransformIndex,
+                                PandasIndex)
+except ImportError:
+    _HAS_TRANSFORM_INDEX = False
+    CoordinateTransform = CoordinateTransformIndex = object
+
+from .coords import AffineCoordinate, transform_to_coords
+
+logger = logging.getLogger(__name__)
+
+
+def affine_coordinates(transform, height, width, dims=('y', 'x', ),
+                       center=True):
+    """ Return y/x coordinates, indexed by an :py:class:`AffineIndex`
+
+    Parameters
+    ----------
+    transform : affine.Affine
+        Affine transform (without rotation)
+    height : int
+        Number of pixels tall
+    width : int
+        Number of pixels wide
+    dims : tuple[str, str], optional
+        Names of the y/x dimensions
+    center : bool, optional
+        Coordinates are for the center of each pixel
+
+    Returns
+    -------
+    xarray.Coordinates
+        Y/X coordinates, whose values are not materialized
+
+    Raises
+    ------
+    ImportError
+        Raised if the version of XArray installed doesn't support coordinate
+        transform indexes
+    """
+    _check_transform_index()
+    y, x = transform_to_coords(transform, height=height, width=width,
+                               center=center, virtual=True)
+    variables, indexes = {}, {}
+    for coordinate, dim in zip((y, x), dims):
+        index = AffineIndex.from_coordinate(coordinate, dim)
+        for name, var in index.create_variables().items():
+            variables[name] = var
+            indexes[name] = index
+    return xr.Coordinates(variables, indexes=indexes)
+
+
+class AffineCoordinateTransform(CoordinateTransform):
+    """ Coordinate transform for a :py:class:`AffineCoordinate`
+
+    Parameters
+    ----------
+    coordinate : stems.gis.coords.AffineCoordinate
+        Y or X coordinate
+    coord_name : str
+        Name of the coordinate
+    dim : str
+        Name of the dimension
+    """
+    def __init__(self, coordinate, coord_name, dim):
+        super().__init__((coord_name, ), {dim: coordinate.size},
+                         dtype=coordinate.dtype)
+        self.coordinate = coordinate
+
+    @property
+    def coord_name(self):
+        """ str: Name of the coordinate
+        """
+        return self.coord_names[0]
+
+    @property
+    def dim(self):
+        """ str: Name of the dimension
+        """
+        return self.dims[0]
+
+    def forward(self, dim_positions):
+        positions = np.asarray(dim_positions[self.dim])
+        return {self.coord_name: self.coordinate._values(positions)}
+
+    def reverse(self, coord_labels):
+        labels = np.asarray(coord_labels[self.coord_name], dtype=self.dtype)
+        positions = (labels - self.coordinate.start) / self.coordinate.step
+        return {self.dim: positions}
+
+    def equals(self, other, exclude=None, **kwds):
+        if not isinstance(other, AffineCoordinateTransform):
+            return False
+        return (self.coordinate.size == other.coordinate.size and
+                self.coordinate.start == other.coordinate.start and
+                self.coordinate.step == other.coordinate.step)
+
+
+class AffineIndex(CoordinateTransformIndex):
+    """ XArray index for y or x coordinates defined by an affine transform
+
+    Create using :py:meth:`from_coordinate`, or :py:func:`affine_coordinates`
+    for both y/x coordinates. Like :py:class:`xarray.indexes.RangeIndex`,
+    label based selection requires ``method="nearest"`` and only exact
+    alignment is supported.
+    """
+    @classmethod
+    def from_coordinate(cls, coordinate, dim, coord_name=None):
+        """ Create an index from a :py:class:`AffineCoordinate`
+
+        Parameters
+        ----------
+        coordinate : stems.gis.coords.AffineCoordinate
+            Y or X coordinate
+        dim : str
+            Name of the dimension
+        coord_name : str, optional
+            Name of the coordinate (defaults to ``dim``)
+
+        Returns
+        -------
+        AffineIndex
+            Index for the coordinate
+
+        Raises
+        ------
+        ImportError
+            Raised if the version of XArray installed doesn't support
+            coordinate transform indexes
+        """
+        _check_transform_index()
+        return cls(AffineCoordinateTransform(coordinate, coord_name or dim,
+                                             dim))
+
+    @property
+    def coordinate(self):
+        """ stems.gis.coords.AffineCoordinate: Coordinate of the index
+        """
+        return self.transform.coordinate
+
+    @property
+    def dim(self):
+        """ str: Name of the dimension
+        """
+        return self.transform.dim
+
+    @property
+    def coord_name(self):
+        """ str: Name of the coordinate
+        """
+        return self.transform.coord_name
+
+    def isel(self, indexers):
+        idxer = indexers[self.dim]
+        if isinstance(idxer, slice):
+            coordinate = self.coordinate[idxer]
+            if isinstance(coordinate, AffineCoordinate):
+                return self.from_coordinate(coordinate, self.dim,
+                                            coord_name=self.coord_name)
+            values = np.asarray(coordinate)
+            new_dim = self.dim
+        elif np.ndim(idxer) == 1:
+            values = self.transform.forward({self.dim: idxer})[
+                self.coord_name]
+            new_dim = getattr(idxer, 'dims', (self.dim, ))[0]
+        else:
+            # Scalar or multidimensional selection drops the index
+            return None
+        return PandasIndex(pd.Index(values, name=self.coord_name), new_dim,
+                           coord_dtype=values.dtype)
+
+    def sel(self, labels, method=None, tolerance=None):
+        if method != 'nearest':
+            raise ValueError('AffineIndex only supports selection with '
+                             'method="nearest"')
+        label = labels[self.coord_name]
+
+        if isinstance(label, slice):
+            if label.step is not None:
+                raise ValueError('AffineIndex does not support selecting '
+                                 'slices with a step')
+            start, stop = 0, self.coordinate.size
+            if label.start is not None:
+                start = max(start, self._positions(label.start))
+            if label.stop is not None:
+                stop = min(stop, self._positions(label.stop) + 1)
+            return IndexSelResult({self.dim: slice(start, stop)})
+        elif isinstance(label, (xr.DataArray, xr.Variable, )):
+            # Vectorized (point-wise) selection
+            return super().sel(labels, method=method, tolerance=tolerance)
+        return IndexSelResult({self.dim: self._positions(label)})
+
+    def to_pandas_index(self):
+        return pd.Index(self.coordinate.values, name=self.coord_name)
+
+    def _repr_inline_(self, max_width):
+        return (f'{type(self).__name__} (start={self.coordinate.start:.6g}, '
+                f'step={self.coordinate.step:.6g})')
+
+    def _positions(self, labels):
+        # Nearest positions of coordinate labels
+        positions = self.transform.reverse({self.coord_name: labels})
+        return np.round(positions[self.dim]).astype(int)
+
+
+def _check_transform_index():
+    if not _HAS_TRANSFORM_INDEX:
+        raise ImportError(
+            'Indexing coordinates by an affine transform requires a version '
+            f'of XArray (installed: {xr.__version__}) with '
+            '`xarray.indexes.CoordinateTransformIndex`. Upgrade XArray, or use '
+            '`stems.gis.coords.transform_to_coords` for coordinate values')
@@ -14,7 +14,7 @@ import logging
 from rasterio.crs import CRS
 from osgeo import osr
 
-from .utils import crs2osr
+from .utils import _crs2osr, crs_cache
 from .. import errors
 
 logger = logging.getLogger(__name__)
@@ -124,11 +124,14 @@ def _epsg_code_osr(crs):
 
 
 @epsg_code.register(CRS)
+@crs_cache
 def _epsg_code_rasterio(crs):
-    osr_crs = crs2osr(crs)
+    # ``AutoIdentifyEPSG`` can modify the OSR object, so use a copy
+    osr_crs = _crs2osr(crs).Clone()
     return _epsg_code_osr(osr_crs)
 
 
+@crs_cache
 def crs_longname(crs):
     """ Return name of a CRS / ellipsoid pair
 
@@ -150,7 +153,7 @@ def crs_longname(crs):
     'WGS 84 / UTM zone 19N'
     """
     # This doesn't necessarily relate to CF but it's nice to have
-    crs_osr = crs2osr(crs)
+    crs_osr = _crs2osr(crs)
     if crs.is_projected:
         return crs_osr.GetAttrValue('PROJCS')
     elif crs.is_geographic:
@@ -159,6 +162,7 @@ def crs_longname(crs):
 
 # ============================================================================
 # CF info / parameters
+@crs_cache
 def cf_crs_name(crs):
     """ Return CF name of a CRS projection
 
@@ -179,7 +183,7 @@ def cf_crs_name(crs):
     >>> cf_crs_attrs(CRS.from_epsg(32619))  # UTM19N
     'transverse_mercator'
     """
-    crs_osr = crs2osr(crs)
+    crs_osr = _crs2osr(crs)
     if crs.is_projected:
         name = crs_osr.GetAttrValue('PROJECTION')
         if name not in CF_PROJECTION_NAMES:
@@ -193,6 +197,7 @@ def cf_crs_name(crs):
         return 'latitude_longitude'
 
 
+@crs_cache(copy_result=True)
 def cf_crs_attrs(crs):
     """ Return CF-compliant CRS info to prevent "unknown" CRS/Ellipse/Geoid
 
@@ -223,7 +228,7 @@ def cf_crs_attrs(crs):
                  ('reference_ellipsoid_name', 'WGS 84'),
                  ('prime_meridian_name', 'Greenwich')])
     """
-    osr_crs = crs2osr(crs)
+    osr_crs = _crs2osr(crs)
     attrs = OrderedDict()
 
     long_name = crs_longname(crs)
@@ -239,6 +244,7 @@ def cf_crs_attrs(crs):
     return attrs
 
 
+@crs_cache(copy_result=True)
 def cf_proj_params(crs):
     """ Return projection parameters for a CRS
 
@@ -269,7 +275,7 @@ def cf_proj_params(crs):
                  ('false_northing', 0.0)])
     """
     name = cf_crs_name(crs)
-    osr_crs = crs2osr(crs)
+    osr_crs = _crs2osr(crs)
 
     if name not in CF_PROJECTION_DEFS:
         raise errors.TODO(f'Cannot handle "{name}" CRS types yet')
@@ -284,6 +290,7 @@ def cf_proj_params(crs):
     return parms
 
 
+@crs_cache(copy_result=True)
 def cf_ellps_params(crs):
     """ Return ellipsoid parameters for a CRS
 
@@ -308,7 +315,7 @@ def cf_ellps_params(crs):
                  ('semi_minor_axis', 6356752.314245179),
                  ('inverse_flattening', 298.257223563)])
     """
-    osr_crs = crs2osr(crs)
+    osr_crs = _crs2osr(crs)
 
     return OrderedDict(
         (key, getattr(osr_crs, func)())
@@ -316,6 +323,7 @@ def cf_ellps_params(crs):
     )
 
 
+@crs_cache
 def cf_xy_coord_names(crs):
     """ Returns appropriate names for coordinates given CRS
 
@@ -39,6 +39,46 @@ def test_is_georeferenced():
     xr.testing.assert_equal(gm_ds, gm_a)
 
 
+def test_georeference_lightweight():
+    a = xr.DataArray(np.ones((5, 5)), dims=('y', 'x', ),
+                     coords={'x': np.arange(5) + 0.5,
+                             'y': np.arange(5)[::-1] + 0.5})
+    ds = xr.Dataset({'a': a, 'b': a.copy(), 'c': a.x})
+    crs_ = CRS.from_epsg(32619)
+    transform_ = Affine(1, 0, 0, 0, -1., 5)
+
+    ans = conventions.georeference(ds, crs_, transform_)
+    test = conventions.georeference(ds, crs_, transform_, lightweight=True)
+    assert conventions.is_georeferenced(test)
+    xr.testing.assert_identical(test, ans)
+
+    # Shares data, doesn't modify input
+    assert test['a'].data is ds['a'].data
+    assert 'grid_mapping' not in ds['a'].attrs
+    assert 'grid_mapping' not in test['c'].attrs
+    assert not ds['x'].attrs
+    assert 'crs' not in ds.coords
+
+    test_a = conventions.georeference(a, crs_, transform_, lightweight=True)
+    assert test_a.attrs['grid_mapping'] == 'crs'
+    assert test_a.data is a.data
+
+
+def test_georeference_lightweight_coords():
+    # Create y/x from transform
+    a = xr.DataArray(np.ones((3, 4)), dims=('y', 'x', ))
+    crs_ = CRS.from_epsg(32619)
+    transform_ = Affine(30., 0, 100., 0, -30., 200.)
+
+    test = conventions.georeference(a, crs_, transform_, lightweight=True)
+    np.testing.assert_equal(test['x'].values, [115., 145., 175., 205.])
+    np.testing.assert_equal(test['y'].values, [185., 155., 125.])
+    assert test['x'].attrs['units'] == 'metre'
+
+    with pytest.raises(ValueError, match=r'Must provide `transform`'):
+        conventions.georeference(a, crs_, lightweight=True)
+
+
 # ----------------------------------------------------------------------------
 # create_grid_mapping
 utm19n = {
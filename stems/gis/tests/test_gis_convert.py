@@ -31,6 +31,11 @@ def test_to_crs_str(ex_crs):
     assert convert.to_crs(ex_crs.wkt) == ex_crs
 
 
+def test_to_crs_str_cached(ex_crs):
+    wkt = ex_crs.wkt
+    assert convert.to_crs(wkt) is convert.to_crs(wkt)
+
+
 def test_to_crs_str_error():
     bad = '+proj=wrong'
     msg = 'Could not interpret CRS.*WKT or Proj4'
@@ -185,3 +185,74 @@ def test_coord_transform_integration(transform, shape, center):
                                       center=center)
     transform_ = coords.coords_to_transform(y, x, center=center)
     assert transform == transform_
+
+
+# ============================================================================
+# AffineCoordinate
+@pytest.mark.parametrize(('transform', 'shape', ),
+                         zip(TRANSFORMS, SHAPES))
+@param_centered
+def test_affine_coordinate(transform, shape, center):
+    y_, x_ = coords.transform_to_coords(transform,
+                                        height=shape[1],
+                                        width=shape[0],
+                                        center=center)
+    y, x = coords.transform_to_coords(transform,
+                                      height=shape[1],
+                                      width=shape[0],
+                                      center=center,
+                                      virtual=True)
+    assert isinstance(y, coords.AffineCoordinate)
+    assert y.shape == y_.shape and len(x) == len(x_)
+    # Same values when materialized
+    np.testing.assert_equal(np.asarray(y), y_)
+    np.testing.assert_equal(np.asarray(x), x_)
+    assert x[5] == x_[5]
+    assert y[-1] == y_[-1]
+    np.testing.assert_equal(x[[1, 3]], x_[[1, 3]])
+
+    # Exact roundtrip
+    assert coords.coords_to_transform(y, x, center=center) == transform
+    assert coords.coords_to_bounds(y, x, center=center) == \
+        coords.transform_to_bounds(transform, shape[1], shape[0])
+
+
+@pytest.mark.parametrize('key', [
+    slice(10, 20),
+    slice(None, None, 3),
+    slice(-30, None, 2),
+    slice(5, 3)
+])
+def test_affine_coordinate_slice(key):
+    y_, x_ = coords.transform_to_coords(TRANSFORM_1, height=100, width=120)
+    y, x = coords.transform_to_coords(TRANSFORM_1, height=100, width=120,
+                                      virtual=True)
+    test_y, test_x = y[key], x[key]
+    assert isinstance(test_y, coords.AffineCoordinate)
+    assert isinstance(test_x, coords.AffineCoordinate)
+    np.testing.assert_allclose(np.asarray(test_y), y_[key])
+    np.testing.assert_allclose(np.asarray(test_x), x_[key])
+
+
+def test_affine_coordinate_error():
+    with pytest.raises(ValueError, match=r'Unknown axis'):
+        coords.AffineCoordinate(TRANSFORM_1, 10, 'z')
+    x = coords.AffineCoordinate(TRANSFORM_1, 10, 'x')
+    with pytest.raises(IndexError, match=r'out of bounds'):
+        x[10]
+
+
+@pytest.mark.parametrize('transform', TRANSFORMS)
+def test_coords_to_indices(transform):
+    y, x = coords.transform_to_coords(transform, height=10, width=20)
+    rows, cols = coords.coords_to_indices(transform, y[[0, 5, 9]],
+                                          x[[0, 19, 3]])
+    np.testing.assert_equal(rows, [0, 5, 9])
+    np.testing.assert_equal(cols, [0, 19, 3])
+
+    # Upper-left is inside, past the lower-right is outside
+    rows, cols = coords.coords_to_indices(
+        transform, [transform.f, transform.f + 10 * transform.e],
+        [transform.c, transform.c - transform.a / 2])
+    np.testing.assert_equal(rows, [0, 10])
+    np.testing.assert_equal(cols, [0, -1])
@@ -9,7 +9,7 @@ from rasterio.crs import CRS
 from shapely.geometry import Polygon
 import pytest
 
-from stems.gis import grids
+from stems.gis import coords, grids
 
 
 # =============================================================================
@@ -78,6 +78,19 @@ def test_tilegrid_props():
     assert len(all_tiles) == len(grid)
 
 
+def test_tile_coords_virtual():
+    grid = grids.TileGrid(ul=[0, 100], crs='epsg:5070', res=[5, 5],
+                          size=[10, 8])
+    tile = grid[0, 0]
+    y, x = tile.coords(virtual=True)
+    y_, x_ = tile.coords()
+    assert len(y) == tile.height == 8
+    assert len(x) == tile.width == 10
+    assert list(y) == list(y_)
+    assert list(x) == list(x_)
+    assert coords.coords_to_transform(y, x) == tile.transform
+
+
 def test_tilegrid_to_from_dict():
     grid = grids.TileGrid(
         ul=(0, 0),
@@ -0,0 +1,88 @@
+""" Tests for :py:mod:`stems.gis.indexes`
+"""
+from affine import Affine
+import numpy as np
+import pytest
+import xarray as xr
+
+from stems import xarray_accessor  # registers with xarray here
+from stems.gis import conventions, coords, grids, indexes
+
+
+TRANSFORM = Affine(30., 0., 300000., 0., -30., 4500000.)
+
+
+@pytest.fixture
+def no_values(monkeypatch):
+    # Fail if all values of an ``AffineCoordinate`` are computed
+    def values(self):
+        raise AssertionError('Coordinate values were materialized')
+    monkeypatch.setattr(coords.AffineCoordinate, 'values', property(values))
+
+
+def test_affine_coordinates():
+    test = indexes.affine_coordinates(TRANSFORM, 40, 50)
+    y, x = coords.transform_to_coords(TRANSFORM, height=40, width=50)
+    assert isinstance(test.xindexes['y'], indexes.AffineIndex)
+    assert isinstance(test.xindexes['x'], indexes.AffineIndex)
+    np.testing.assert_equal(test['y'].values, y)
+    np.testing.assert_equal(test['x'].values, x)
+
+
+def test_affine_index_isel():
+    ds = xr.Dataset(coords=indexes.affine_coordinates(TRANSFORM, 40, 50))
+    y, x = coords.transform_to_coords(TRANSFORM, height=40, width=50)
+
+    test = ds.isel(y=slice(10, 20), x=slice(5, None))
+    assert isinstance(test.xindexes['y'], indexes.AffineIndex)
+    np.testing.assert_equal(test['y'].values, y[10:20])
+    np.testing.assert_equal(test['x'].values, x[5:])
+    assert coords.coords_to_transform(test['y'], test['x']) == \
+        TRANSFORM * Affine.translation(5, 10)
+
+    test = ds.isel(x=[1, 3])
+    np.testing.assert_equal(test['x'].values, x[[1, 3]])
+
+
+def test_affine_index_sel():
+    ds = xr.Dataset(coords=indexes.affine_coordinates(TRANSFORM, 40, 50))
+    test = ds.sel(x=300050., y=4499950., method='nearest')
+    assert test['x'].values == 300045.
+    assert test['y'].values == 4499955.
+
+
+def test_affine_index_sel_slice():
+    ds = xr.Dataset(coords=indexes.affine_coordinates(TRANSFORM, 40, 50))
+    y, x = coords.transform_to_coords(TRANSFORM, height=40, width=50)
+    test = ds.sel(y=slice(y[5], y[9]), x=slice(x[2], None), method='nearest')
+    assert isinstance(test.xindexes['y'], indexes.AffineIndex)
+    np.testing.assert_equal(test['y'].values, y[5:10])
+    np.testing.assert_equal(test['x'].values, x[2:])
+
+
+def test_affine_index_old_xarray(monkeypatch):
+    monkeypatch.setattr(indexes, '_HAS_TRANSFORM_INDEX', False)
+    with pytest.raises(ImportError, match=r'.*CoordinateTransformIndex.*'):
+        indexes.affine_coordinates(TRANSFORM, 40, 50)
+    # Coordinates not indexed by XArray still work
+    y, x = coords.transform_to_coords(TRANSFORM, height=40, width=50,
+                                      virtual=True)
+    assert coords.coords_to_transform(y, x) == TRANSFORM
+
+
+def test_tile_coordinates(no_values):
+    # Materializing the coordinates would need 16GB
+    grid = grids.TileGrid(ul=(0., 1e9), crs='epsg:32619', res=(1., 1.),
+                          size=(10 ** 9, 10 ** 9))
+    tile = grid[0, 0]
+    ds = xr.Dataset(coords=tile.coordinates())
+    assert ds.sizes == {'y': 10 ** 9, 'x': 10 ** 9}
+    assert coords.coords_to_transform(ds['y'], ds['x']) == tile.transform
+
+    ds = conventions.georeference(ds, tile.crs, lightweight=True)
+    assert ds.stems.transform == tile.transform
+    assert ds.stems.bounds == tile.bounds
+
+    sub = ds.isel(y=slice(10, 20), x=slice(100, 200))
+    assert sub.stems.transform == tile.transform * Affine.translation(100, 10)
+    assert sub['x'].values[0] == 100.5
@@ -66,6 +66,16 @@ def test_cf_crs_attrs_1():
     assert test['prime_meridian_name'] == 'Greenwich'
 
 
+def test_cf_crs_attrs_copy():
+    # results are cached, but shouldn't be modifiable
+    crs = CRS.from_epsg(4326)
+    test1 = projections.cf_crs_attrs(crs)
+    test1.clear()
+    test2 = projections.cf_crs_attrs(crs)
+    assert test2
+    assert test1 is not test2
+
+
 def test_cf_crs_attrs_2():
     # NAD83 / CONUS AEA
     crs = CRS.from_epsg(5070)
@@ -22,6 +22,45 @@ def test_crs2osr(code):
     assert sr_.IsSame(crs_sr)
 
 
+def test_crs2osr_copy():
+    # cached OSR object is shared, so we should get a copy
+    crs_ = CRS.from_epsg(4326)
+    assert utils.crs2osr(crs_) is not utils.crs2osr(crs_)
+
+
+# crs_cache
+def test_crs_cache():
+    calls = []
+
+    @utils.crs_cache
+    def f(crs):
+        calls.append(crs)
+        return crs.to_epsg()
+
+    # equal CRS (by WKT) share cache entries
+    crs1 = CRS.from_epsg(3857)
+    crs2 = CRS.from_wkt(crs1.wkt)
+    assert f(crs1) == 3857
+    assert f(crs2) == 3857
+    assert len(calls) == 1
+    assert f.cache_info().hits == 1
+
+    f.cache_clear()
+    f(crs1)
+    assert len(calls) == 2
+
+
+def test_crs_cache_copy_result():
+    @utils.crs_cache(copy_result=True)
+    def f(crs):
+        return {'wkt': crs.wkt}
+
+    crs = CRS.from_epsg(4326)
+    test = f(crs)
+    test['wkt'] = 'modified'
+    assert f(crs)['wkt'] == crs.wkt
+
+
 # same_crs
 def test_same_crs_1():
     # literally the same
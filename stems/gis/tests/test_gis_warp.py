@@ -0,0 +1,91 @@
+""" Tests for :py:mod:`stems.gis.warp`
+"""
+from affine import Affine
+import dask.array as da
+import numpy as np
+import pytest
+from rasterio.crs import CRS
+from rasterio.warp import Resampling, reproject, transform_bounds
+import xarray as xr
+
+from stems.gis import conventions, grids, warp
+
+
+CRS_ = CRS.from_epsg(32619)
+TRANSFORM = Affine(30., 0., 300000., 0., -30., 4500000.)
+
+
+@pytest.fixture
+def src():
+    data = np.arange(2 * 40 * 50, dtype=np.float32).reshape(2, 40, 50) + 1
+    xarr = xr.DataArray(data, dims=('band', 'y', 'x'),
+                        coords={'band': ['b1', 'b2']})
+    xarr = conventions.georeference(xarr, CRS_, TRANSFORM, lightweight=True)
+    return xarr.chunk({'y': 16, 'x': 16})
+
+
+def test_reproject_xarray_same(src):
+    test = warp.reproject_xarray(src, CRS_, TRANSFORM, (40, 50), chunks=16)
+    assert isinstance(test.data, da.Array)
+    assert test.data.chunks == ((2, ), (16, 16, 8), (16, 16, 16, 2))
+    np.testing.assert_equal(test.values, src.values)
+    assert list(test['band'].values) == ['b1', 'b2']
+    assert test.stems.crs == CRS_
+    assert test.stems.transform == TRANSFORM
+
+
+def test_reproject_xarray_subset(src):
+    # Partially outside, so needs to fill with NaN
+    transform = TRANSFORM * Affine.translation(40, 5)
+    test = warp.reproject_xarray(src, CRS_, transform, (20, 20))
+    np.testing.assert_equal(test.values[:, :, :10], src.values[:, 5:25, 40:])
+    assert np.isnan(test.values[:, :, 10:]).all()
+
+    # Completely outside
+    transform = TRANSFORM * Affine.translation(100, 100)
+    test = warp.reproject_xarray(src, CRS_, transform, (20, 20),
+                                 dst_nodata=-1)
+    assert (test.values == -1).all()
+
+
+@pytest.mark.parametrize('resampling', ['nearest', 'bilinear'])
+def test_reproject_xarray_crs(src, resampling):
+    crs = CRS.from_epsg(4326)
+    bounds = transform_bounds(CRS_, crs, 300000, 4500000 - 1200,
+                              301500, 4500000)
+    transform = Affine(0.0002, 0, bounds[0], 0, -0.0002, bounds[3])
+    test = warp.reproject_xarray(src, crs, transform, (50, 90),
+                                 resampling=resampling, chunks=20)
+    assert test.dims == ('band', 'latitude', 'longitude')
+
+    ans = np.full((2, 50, 90), np.nan, dtype=np.float32)
+    reproject(src.values, ans, src_transform=TRANSFORM, src_crs=CRS_,
+              dst_transform=transform, dst_crs=crs, dst_nodata=np.nan,
+              resampling=Resampling[resampling])
+    # GDAL's approximate transformer can differ a little by block
+    diff = ~np.isclose(test.values, ans, equal_nan=True, atol=0.1)
+    assert diff.mean() < 0.01
+
+
+def test_reproject_tile(src):
+    ds = xr.Dataset({'a': src, 'b': src.isel(band=0)}).chunk({'y': 16,
+                                                              'x': 16})
+    ds = conventions.georeference(ds, CRS_, TRANSFORM, lightweight=True)
+    grid = grids.TileGrid(ul=(300000., 4500000.), crs=CRS_, res=(60, 60),
+                          size=(10, 5))
+    tile = grid[0, 1]
+
+    test = ds.stems.reproject(tile, resampling='average')
+    assert test['a'].shape == (2, 5, 10)
+    assert test['b'].shape == (5, 10)
+    assert test.stems.transform == tile.transform
+    ans = src.values[:, :10, 20:40].reshape(2, 5, 2, 10, 2).mean(axis=(2, 4))
+    np.testing.assert_allclose(test['a'].values, ans)
+
+
+def test_reproject_nodata(src):
+    src = src.where(src.x > src.x[10], -9999)
+    src.attrs['_FillValue'] = -9999
+    test = warp.reproject_xarray(src, CRS_, TRANSFORM, (40, 50))
+    assert (test.values[:, :, :11] == -9999).all()
+    np.testing.assert_equal(test.values[:, :, 11:], src.values[:, :, 11:])
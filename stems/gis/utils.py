@@ -1,5 +1,7 @@
 """ Assorted GIS utilities
 """
+import copy
+from functools import lru_cache, wraps
 import logging
 
 from osgeo import osr
@@ -7,6 +9,9 @@ from rasterio.crs import CRS
 
 osr.UseExceptions()
 
+#: int: Number of CRS to keep in each CRS cache (see :py:func:`crs_cache`)
+CRS_CACHE_SIZE = 128
+
 
 def crs2osr(crs):
     """ Return `osgeo.osr.SpatialReference` of a `rasterio.crs.CRS`
@@ -21,6 +26,65 @@ def crs2osr(crs):
     osr.SpatialReference
         CRS as OSR object
     """
+    # Cached copy is shared, so give out a clone
+    return _crs2osr(crs).Clone()
+
+
+def crs_cache(func=None, copy_result=False):
+    """ Cache results of a function of a CRS, keyed on the CRS WKT
+
+    The cache is bounded (see :py:data:`CRS_CACHE_SIZE`) and thread-safe.
+    Clear it using the ``cache_clear`` attribute of the decorated function.
+
+    Parameters
+    ----------
+    func : callable
+        Function that accepts a :py:class:`rasterio.crs.CRS` as its only
+        argument
+    copy_result : bool, optional
+        Return a (shallow) copy of the cached result. Use for functions
+        returning mutable results (e.g., dicts)
+
+    Returns
+    -------
+    callable
+        Decorated function
+    """
+    if func is None:
+        return lambda f: crs_cache(f, copy_result=copy_result)
+
+    @lru_cache(maxsize=CRS_CACHE_SIZE)
+    def cached(key):
+        return func(key.crs)
+
+    @wraps(func)
+    def wrapper(crs):
+        result = cached(_CRSKey(crs))
+        return copy.copy(result) if copy_result else result
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+
+class _CRSKey(object):
+    # Hash/compare CRS using WKT, but keep the CRS to compute results
+    __slots__ = ('crs', 'wkt', )
+
+    def __init__(self, crs):
+        self.crs = crs
+        self.wkt = crs.wkt
+
+    def __hash__(self):
+        return hash(self.wkt)
+
+    def __eq__(self, other):
+        return isinstance(other, _CRSKey) and self.wkt == other.wkt
+
+
+@crs_cache
+def _crs2osr(crs):
+    # Shared and cached, so don't modify the result
     crs_osr = osr.SpatialReference()
     crs_osr.ImportFromWkt(crs.wkt)
     crs_osr.Fixup()
@@ -70,7 +134,7 @@ def osr_same_crs(*crs):
         True if all CRS are equivalent
     """
     assert len(crs) >= 1
-    sr_crs = [crs2osr(crs_) for crs_ in crs]
+    sr_crs = [_crs2osr(crs_) for crs_ in crs]
     base = sr_crs[0]
     for other in sr_crs[1:]:
         if not bool(base.IsSame(other)):
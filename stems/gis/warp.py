@@ -0,0 +1,246 @@
+""" Reproject XArray data, lazily, one block at a time
+
+Each block of the output is warped using :py:func:`rasterio.warp.reproject`
+from a window of the source data calculated using
+:py:func:`stems.gis.geom.calculate_src_window`. Only the source chunks
+overlapping an output block are read to create it.
+"""
+import logging
+
+from affine import Affine
+import dask.array as da
+import numpy as np
+from rasterio.enums import Resampling
+from rasterio.errors import WindowError
+from rasterio.warp import reproject, transform_bounds
+from rasterio.windows import Window
+import xarray as xr
+
+from . import conventions, coords, geom, projections
+from .. import xarray_accessor  # register accessor
+
+logger = logging.getLogger(__name__)
+
+#: int: Number of source pixels to pad each window for resampling kernels
+SRC_WINDOW_PADDING = 3
+
+
+def reproject_xarray(xarr, crs, transform, shape, resampling='nearest',
+                     nodata=None, dst_nodata=None, chunks=None):
+    """ Reproject georeferenced XArray data onto a grid
+
+    Parameters
+    ----------
+    xarr : xarray.DataArray or xarray.Dataset
+        Georeferenced data
+    crs : rasterio.crs.CRS
+        Destination coordinate reference system
+    transform : affine.Affine
+        Destination affine transform
+    shape : tuple[int, int]
+        Destination number of rows and columns
+    resampling : str or rasterio.enums.Resampling, optional
+        Resampling method
+    nodata : int or float, optional
+        NoData value of the source data. Defaults to the "nodata" or
+        "_FillValue" attribute or encoding of each variable, if any
+    dst_nodata : int or float, optional
+        Value to fill destination pixels without data. Defaults to
+        ``nodata`` (NaN if ``nodata`` is not given and data are floats)
+    chunks : int or tuple[int, int], optional
+        Destination chunk sizes for the y/x dimensions. Defaults to the
+        y/x chunk sizes of the source data
+
+    Returns
+    -------
+    xarray.DataArray or xarray.Dataset
+        Reprojected data (as Dask arrays), georeferenced to the destination
+        grid
+
+    Raises
+    ------
+    KeyError
+        Raised if ``xarr`` is not georeferenced
+    """
+    if isinstance(resampling, str):
+        resampling = Resampling[resampling]
+    src_crs, src_transform = xarr.stems.crs, xarr.stems.transform
+    dim_y, dim_x = xarr.stems.coord_y.dims[0], xarr.stems.coord_x.dims[0]
+    dst_x, dst_y = projections.cf_xy_coord_names(crs)
+    height, width = shape
+    grid_mapping = xarr.stems.grid_mapping.name
+
+    kwds = dict(src_crs=src_crs, src_transform=src_transform,
+                dst_crs=crs, dst_transform=transform, dst_shape=shape,
+                resampling=resampling, chunks=chunks)
+
+    def _reproject(dv):
+        if dim_y not in dv.dims or dim_x not in dv.dims:
+            return dv
+        other = tuple(d for d in dv.dims if d not in (dim_y, dim_x))
+        dv = dv.transpose(*other, dim_y, dim_x)
+        src_nodata = _guess_nodata(dv) if nodata is None else nodata
+        data = reproject_array(dv.data, src_nodata=src_nodata,
+                               dst_nodata=dst_nodata, **kwds)
+        return xr.DataArray(data, dims=other + (dst_y, dst_x),
+                            coords={d: dv.coords[d] for d in other
+                                    if d in dv.coords},
+                            attrs=dv.attrs, name=dv.name)
+
+    if isinstance(xarr, xr.DataArray):
+        out = _reproject(xarr.drop_vars(grid_mapping))
+    else:
+        out = xr.Dataset(
+            {name: _reproject(dv)
+             for name, dv in xarr.drop_vars(grid_mapping).data_vars.items()},
+            attrs=xarr.attrs
+        )
+
+    y, x = coords.transform_to_coords(transform, height=height, width=width)
+    out = out.assign_coords({dst_y: y, dst_x: x})
+    return conventions.georeference(out, crs, transform,
+                                    grid_mapping=grid_mapping,
+                                    lightweight=True)
+
+
+def reproject_array(src, src_crs, src_transform, dst_crs, dst_transform,
+                    dst_shape, resampling=Resampling.nearest,
+                    src_nodata=None, dst_nodata=None, chunks=None):
+    """ Lazily reproject an array with spatial dimensions last
+
+    Parameters
+    ----------
+    src : np.ndarray or dask.array.Array
+        Source data, with y/x as the last two dimensions
+    src_crs : rasterio.crs.CRS
+        Source coordinate reference system
+    src_transform : affine.Affine
+        Source affine transform
+    dst_crs : rasterio.crs.CRS
+        Destination coordinate reference system
+    dst_transform : affine.Affine
+        Destination affine transform
+    dst_shape : tuple[int, int]
+        Destination number of rows and columns
+    resampling : rasterio.enums.Resampling, optional
+        Resampling method
+    src_nodata : int or float, optional
+        NoData value of the source data
+    dst_nodata : int or float, optional
+        Value to fill destination pixels without data. Defaults to
+        ``src_nodata`` (NaN if not given and data are floats)
+    chunks : int or tuple[int, int], optional
+        Destination chunk sizes for the y/x dimensions. Defaults to the
+        y/x chunk sizes of the source data
+
+    Returns
+    -------
+    dask.array.Array
+        Reprojected data
+    """
+    src = da.asarray(src)
+    if dst_nodata is None:
+        dst_nodata = src_nodata
+    if dst_nodata is None and src.dtype.kind == 'f':
+        dst_nodata = np.nan
+    fill = 0 if dst_nodata is None else dst_nodata
+
+    if chunks is None:
+        chunks = (src.chunks[-2][0], src.chunks[-1][0])
+    elif isinstance(chunks, int):
+        chunks = (chunks, chunks)
+    chunks_y, chunks_x = da.core.normalize_chunks(chunks, tuple(dst_shape))
+
+    src_shape = src.shape[-2:]
+    src_bounds = coords.transform_to_bounds(src_transform, *src_shape)
+    leading = src.shape[:-2]
+
+    blocks = []
+    row_off = 0
+    for height in chunks_y:
+        row = []
+        col_off = 0
+        for width in chunks_x:
+            block_transform = dst_transform * Affine.translation(col_off,
+                                                                 row_off)
+            window = _src_window(src_bounds, src_transform, src_shape,
+                                 src_crs, dst_crs, block_transform,
+                                 (height, width))
+            if window is None:
+                block = da.full(leading + (height, width), fill,
+                                dtype=src.dtype,
+                                chunks=src.chunks[:-2] + ((height, ),
+                                                          (width, )))
+            else:
+                (r0, r1), (c0, c1) = window.toranges()
+                src_block = src[..., r0:r1, c0:c1].rechunk(
+                    src.chunks[:-2] + ((r1 - r0, ), (c1 - c0, ))
+                )
+                block = src_block.map_blocks(
+                    _reproject_block,
+                    src_crs=src_crs,
+                    src_transform=(src_transform *
+                                   Affine.translation(c0, r0)),
+                    dst_crs=dst_crs,
+                    dst_transform=block_transform,
+                    dst_shape=(height, width),
+                    resampling=resampling,
+                    src_nodata=src_nodata,
+                    dst_nodata=dst_nodata,
+                    chunks=src.chunks[:-2] + ((height, ), (width, )),
+                    dtype=src.dtype
+                )
+            row.append(block)
+            col_off += width
+        blocks.append(row)
+        row_off += height
+
+    return da.block(blocks)
+
+
+def _src_window(src_bounds, src_transform, src_shape,
+                src_crs, dst_crs, dst_transform, dst_shape):
+    # Window of source needed to create destination block, or None
+    dst_bounds = coords.transform_to_bounds(dst_transform, *dst_shape)
+    if src_crs != dst_crs:
+        dst_bounds = transform_bounds(dst_crs, src_crs, *dst_bounds,
+                                      densify_pts=21)
+    try:
+        window, _ = geom.calculate_src_window(src_bounds, src_transform,
+                                              dst_bounds)
+    except WindowError:
+        return None
+    if window.width <= 0 or window.height <= 0:
+        return None
+
+    (r0, r1), (c0, c1) = window.toranges()
+    pad = SRC_WINDOW_PADDING
+    r0, c0 = max(r0 - pad, 0), max(c0 - pad, 0)
+    r1, c1 = min(r1 + pad, src_shape[0]), min(c1 + pad, src_shape[1])
+    if r1 <= r0 or c1 <= c0:
+        return None
+    return Window(c0, r0, c1 - c0, r1 - r0)
+
+
+def _reproject_block(src, src_crs, src_transform, dst_crs, dst_transform,
+                     dst_shape, resampling, src_nodata, dst_nodata):
+    leading = src.shape[:-2]
+    src_ = src.reshape((-1, ) + src.shape[-2:])
+    fill = 0 if dst_nodata is None else dst_nodata
+    dst = np.full((src_.shape[0], ) + tuple(dst_shape), fill,
+                  dtype=src.dtype)
+    if src_.shape[0]:
+        reproject(src_, dst,
+                  src_transform=src_transform, src_crs=src_crs,
+                  dst_transform=dst_transform, dst_crs=dst_crs,
+                  src_nodata=src_nodata, dst_nodata=dst_nodata,
+                  resampling=resampling)
+    return dst.reshape(leading + tuple(dst_shape))
+
+
+def _guess_nodata(xarr):
+    for key in ('nodata', '_FillValue', ):
+        for attrs in (xarr.attrs, xarr.encoding):
+            if attrs.get(key) is not None:
+                return attrs[key]
+    return None
@@ -17,9 +17,14 @@ Chunks vs chunksizes::
 """
 from collections import Counter, OrderedDict, defaultdict
 from functools import singledispatch
+import json
 import logging
+import os
 from pathlib import Path
+import warnings
 
+from dask.utils import parse_bytes
+import numpy as np
 import xarray as xr
 
 from ..utils import register_multi_singledispatch
@@ -29,15 +34,21 @@ logger = logging.getLogger(__name__)
 
 # ----------------------------------------------------------------------------
 # Read chunks from files
-def read_chunks(filename, variables=None):
+def read_chunks(filename, variables=None, reader=None):
     """ Return chunks associated with each variable if possible
 
+    Readers registered in :py:data:`CHUNK_READERS` are tried in turn,
+    starting with those matching the file extension (see
+    :py:data:`CHUNK_READER_EXTENSIONS`).
+
     Parameters
     ----------
     filename : str
         Read chunks from this file
     variables : Sequence
         Subset of variables to retrieve ``chunking`` for
+    reader : str, optional
+        Only try the reader registered with this name
 
     Returns
     -------
@@ -49,9 +60,16 @@ def read_chunks(filename, variables=None):
     ------
     ValueError
         Raised if no chunks can be determined (unknown file format, etc.)
+    KeyError
+        Raised if ``reader`` is not registered
     """
-    read_funcs = (read_chunks_netcdf4, )
-    for func in read_funcs:
+    if reader is not None:
+        names = [reader]
+    else:
+        names = guess_chunk_readers(filename)
+
+    for name in names:
+        func = CHUNK_READERS[name]
         try:
             var_chunks = func(filename, variables=variables)
         except Exception as e:
@@ -62,6 +80,49 @@ def read_chunks(filename, variables=None):
     raise ValueError(f'Could not determine chunks for "{filename}"')
 
 
+def register_chunk_reader(name, func, extensions=()):
+    """ Register a function to read chunks for a file format
+
+    Parameters
+    ----------
+    name : str
+        Name of the reader
+    func : callable
+        Function accepting a filename and ``variables`` keyword argument,
+        returning a mapping of variable names to chunks (see
+        :py:func:`read_chunks`)
+    extensions : Sequence[str], optional
+        File extensions (e.g., ``'.nc'``) this reader should be tried
+        first for
+    """
+    CHUNK_READERS[name] = func
+    for ext in extensions:
+        CHUNK_READER_EXTENSIONS[ext.lower()] = name
+
+
+def guess_chunk_readers(filename):
+    """ Return names of chunk readers to try for a file, in order
+
+    Parameters
+    ----------
+    filename : str
+        Filename
+
+    Returns
+    -------
+    list[str]
+        Names of readers in :py:data:`CHUNK_READERS`, starting with the
+        reader registered for the file extension (if any)
+    """
+    ext = os.path.splitext(str(filename).rstrip('/'))[1].lower()
+    names = list(CHUNK_READERS)
+    if ext in CHUNK_READER_EXTENSIONS:
+        first = CHUNK_READER_EXTENSIONS[ext]
+        names.remove(first)
+        names.insert(0, first)
+    return names
+
+
 def read_chunks_netcdf4(filename, variables=None):
     """ Return chunks associated with each variable
 
@@ -135,6 +196,173 @@ def read_chunks_rasterio(riods):
     return chunks
 
 
+def read_chunks_rasterio_bands(filename, variables=None):
+    """ Return chunks for a raster, using the variable name used by xarray
+
+    Parameters
+    ----------
+    filename : str
+        Filename of raster
+    variables : Sequence
+        Ignored. Rasters are read as a single ``band_data`` variable
+
+    Returns
+    -------
+    Mapping[str, Mapping[str, int]]
+        Chunks for the ``band_data`` variable with dimensions
+        ``(band, y, x)``. Pixel interleaved rasters store all bands
+        together in each block.
+    """
+    import rasterio
+    from rasterio.enums import Interleaving
+
+    with rasterio.open(str(filename), 'r') as riods:
+        yx = read_chunks_rasterio(riods)
+        if riods.interleaving == Interleaving.pixel:
+            band = riods.count
+        else:
+            band = 1
+    return {'band_data': OrderedDict((('band', band), ('y', yx['y']),
+                                      ('x', yx['x'])))}
+
+
+def read_chunks_zarr(filename, variables=None):
+    """ Return chunks associated with each array in a Zarr store
+
+    Reads array metadata (``.zarray`` and ``.zattrs`` for Zarr version 2,
+    or ``zarr.json`` for version 3) without requiring the ``zarr`` library
+
+    Parameters
+    ----------
+    filename : str
+        Zarr store directory
+    variables : Sequence
+        Subset of variables to retrieve chunks for
+
+    Returns
+    -------
+    Mapping[str, Mapping[str, int]]
+        Mapping of variable names to chunks. Chunks are stored
+        mapping dimension name to chunksize (e.g., ``{'x': 250}``)
+    """
+    root = Path(filename)
+    if not root.is_dir():
+        raise ValueError(f'"{filename}" is not a Zarr directory store')
+
+    chunks = OrderedDict()
+    for path in sorted(root.iterdir()):
+        name = path.name
+        if variables and name not in variables:
+            continue
+        if path.joinpath('.zarray').exists():
+            meta = json.loads(path.joinpath('.zarray').read_text())
+            attrs = path.joinpath('.zattrs')
+            attrs = json.loads(attrs.read_text()) if attrs.exists() else {}
+            shape, sizes = meta['shape'], meta['chunks']
+            dims = attrs.get('_ARRAY_DIMENSIONS')
+        elif path.joinpath('zarr.json').exists():
+            meta = json.loads(path.joinpath('zarr.json').read_text())
+            if meta.get('node_type') != 'array':
+                continue
+            shape = meta['shape']
+            sizes = meta['chunk_grid']['configuration']['chunk_shape']
+            dims = (meta.get('dimension_names') or
+                    meta.get('attributes', {}).get('_ARRAY_DIMENSIONS'))
+        else:
+            continue
+
+        dims = dims or [f'dim_{i}' for i in range(len(shape))]
+        chunks[name] = OrderedDict(zip(dims, sizes)) if sizes else None
+
+    if not chunks:
+        raise ValueError(f'No Zarr arrays found in "{filename}"')
+    return chunks
+
+
+def read_chunks_h5py(filename, variables=None):
+    """ Return chunks associated with each dataset in an HDF5 file
+
+    Dimension names are taken from attached dimension scales (e.g., as
+    written by NetCDF4), and otherwise named like ``phony_dim_0``.
+
+    Parameters
+    ----------
+    filename : str
+        Filename of HDF5 file
+    variables : Sequence
+        Subset of variables to retrieve chunks for
+
+    Returns
+    -------
+    Mapping[str, Mapping[str, int]]
+        Mapping of variable names to chunks. Chunks are stored
+        mapping dimension name to chunksize (e.g., ``{'x': 250}``)
+    """
+    # Keep this import inside incase user doesn't have library
+    import h5py
+
+    chunks = OrderedDict()
+
+    def _visit(name, obj):
+        if not isinstance(obj, h5py.Dataset):
+            return
+        dims = []
+        for i, dim in enumerate(obj.dims):
+            if len(dim):
+                dims.append(dim[0].name.rsplit('/', 1)[-1])
+            else:
+                dims.append(dim.label or f'phony_dim_{i}')
+        if obj.chunks:
+            chunks[name] = OrderedDict(zip(dims, obj.chunks))
+        else:
+            chunks[name] = None
+
+    with h5py.File(str(filename), 'r') as h5:
+        if variables:
+            for name in variables:
+                _visit(name, h5[name])
+        else:
+            h5.visititems(_visit)
+
+    return chunks
+
+
+#: dict: Functions that read chunks for a file format, by name. Register
+#        more using :py:func:`register_chunk_reader`
+CHUNK_READERS = OrderedDict((
+    ('netcdf4', read_chunks_netcdf4),
+    ('rasterio', read_chunks_rasterio_bands),
+    ('zarr', read_chunks_zarr),
+    ('h5py', read_chunks_h5py),
+))
+
+#: dict: Chunk reader to try first, by file extension
+CHUNK_READER_EXTENSIONS = {
+    '.nc': 'netcdf4',
+    '.nc4': 'netcdf4',
+    '.tif': 'rasterio',
+    '.tiff': 'rasterio',
+    '.vrt': 'rasterio',
+    '.zarr': 'zarr',
+    '.h5': 'h5py',
+    '.hdf5': 'h5py',
+    '.he5': 'h5py',
+}
+
+
+#: str: Default target size of chunks
+DEFAULT_CHUNK_BUDGET = '128MB'
+
+#: tuple: Access patterns chunks can be sized for. Chunks for "time-series"
+#         access span as much of the non-spatial dimensions as possible, and
+#         chunks for "spatial-map" access span as much of the spatial
+#         dimensions as possible
+ACCESS_PATTERNS = ('time-series', 'spatial-map', )
+
+#: tuple: Names of spatial dimensions
+SPATIAL_DIMS = ('y', 'x', 'latitude', 'longitude', 'lat', 'lon', )
+
+
 # ----------------------------------------------------------------------------
 # Chunk heuristics
 def best_chunksizes(chunks, tiebreaker=max):
@@ -200,13 +428,121 @@ def best_chunksizes(chunks, tiebreaker=max):
     return guess
 
 
-def auto_determine_chunks(filename):
+def budget_chunksizes(sizes, dtype, chunksizes=None,
+                      budget=DEFAULT_CHUNK_BUDGET,
+                      pattern='time-series',
+                      spatial_dims=SPATIAL_DIMS):
+    """ Return chunksizes fitting a memory budget and access pattern
+
+    Starting from the on-disk ``chunksizes``, chunks are grown by whole
+    multiples of the on-disk chunks (or up to the full dimension) until they
+    would exceed ``budget``. Dimensions are grown in an order determined
+    by ``pattern`` -- all of the non-spatial dimensions first for
+    "time-series", or all of the spatial dimensions first for "spatial-map".
+    Dimensions within the same group are grown evenly.
+
+    Parameters
+    ----------
+    sizes : Mapping[str, int]
+        Size of each dimension
+    dtype : np.dtype
+        Data type of the data
+    chunksizes : Mapping[str, int], optional
+        On-disk chunksizes. Dimensions not given are considered to
+        have a chunksize of 1
+    budget : int or str, optional
+        Target chunk size in bytes, or as a string (e.g., "128MB")
+    pattern : str, optional
+        Access pattern (see :py:data:`ACCESS_PATTERNS`)
+    spatial_dims : Sequence[str], optional
+        Names of spatial dimensions
+
+    Returns
+    -------
+    dict
+        Chunksize per dimension
+
+    Raises
+    ------
+    ValueError
+        Raised if ``pattern`` is not known
+
+    Examples
+    --------
+    >>> budget_chunksizes({'time': 1000, 'y': 5000, 'x': 5000}, 'int16',
+    ...                   {'time': 1, 'y': 250, 'x': 250}, budget='64MB')
+    OrderedDict([('time', 512), ('y', 250), ('x', 250)])
+    """
+    if pattern not in ACCESS_PATTERNS:
+        raise ValueError(f'Unknown access pattern "{pattern}". Choose from: '
+                         f'{ACCESS_PATTERNS}')
+    budget = parse_bytes(budget) if isinstance(budget, str) else int(budget)
+    itemsize = np.dtype(dtype).itemsize
+    chunksizes = chunksizes or {}
+
+    disk = OrderedDict(
+        (dim, max(1, min(chunksizes.get(dim) or 1, size)))
+        for dim, size in sizes.items()
+    )
+    multiple = OrderedDict((dim, 1) for dim in sizes)
+
+    def _size(dim, m):
+        return min(sizes[dim], disk[dim] * m)
+
+    def _nbytes(multiple):
+        return itemsize * int(np.prod([_size(d, m)
+                                       for d, m in multiple.items()]))
+
+    if _nbytes(multiple) > budget:
+        logger.debug('On-disk chunks are larger than chunk budget')
+
+    spatial = [d for d in sizes if d in spatial_dims]
+    other = [d for d in sizes if d not in spatial_dims]
+    groups = (other, spatial) if pattern == 'time-series' else (spatial, other)
+
+    for group in groups:
+        # Grow dimensions evenly, one multiple at a time
+        growing = [d for d in group if _size(d, 1) < sizes[d]]
+        while growing:
+            if len(growing) == 1:
+                # Jump straight to the largest multiple that fits
+                dim = growing.pop()
+                unit = _nbytes(OrderedDict(multiple, **{dim: 1}))
+                most = -(-sizes[dim] // disk[dim])
+                multiple[dim] = max(multiple[dim],
+                                    min(most, budget // max(unit, 1)))
+                break
+            for dim in list(growing):
+                # Step to next multiple that changes the chunksize
+                test = OrderedDict(multiple)
+                test[dim] = -(-(_size(dim, multiple[dim]) + 1) // disk[dim])
+                if _nbytes(test) > budget:
+                    growing.remove(dim)
+                    continue
+                multiple = test
+                if _size(dim, multiple[dim]) >= sizes[dim]:
+                    growing.remove(dim)
+        if any(_size(d, multiple[d]) < sizes[d] for d in group):
+            # Budget is exhausted, so stop before the next group
+            break
+
+    return OrderedDict((d, _size(d, m)) for d, m in multiple.items())
+
+
+def auto_determine_chunks(filename, budget=None, pattern='time-series'):
     """ Try to guess the best chunksizes for a filename
 
+    The reader used depends on the file format (see :py:func:`read_chunks`)
+
     Parameters
     ----------
     filename : str
         File to read
+    budget : int or str, optional
+        If provided, grow the on-disk chunks to fit this target chunk size
+        (see :py:func:`budget_chunksizes`)
+    pattern : str, optional
+        Access pattern used alongside ``budget``
 
     Returns
     -------
@@ -221,6 +557,19 @@ def auto_determine_chunks(filename):
     else:
         chunks = best_chunksizes(var_chunks)
 
+    if budget is not None:
+        try:
+            with xr.open_dataset(str(filename), chunks={}) as ds:
+                sizes = OrderedDict(ds.sizes.items())
+                dtype = max((v.dtype for v in ds.data_vars.values()),
+                            key=lambda dt: dt.itemsize)
+        except Exception:
+            logger.debug(f'Could not read dimension sizes from "{filename}" '
+                         'to fit chunks to budget', exc_info=True)
+        else:
+            chunks = budget_chunksizes(sizes, dtype, chunksizes=chunks,
+                                       budget=budget, pattern=pattern)
+
     return chunks
 
 
@@ -314,3 +663,33 @@ def _chunks_to_chunksizes_dataarray(data, dims=None):
         dim_idx = dims or range(len(data.chunks))
 
     return tuple(data.chunks[i][0] for i in dim_idx)
+
+
+def chunk_indices(chunks, index):
+    """ Return the chunk containing each index, and the index in that chunk
+
+    Parameters
+    ----------
+    chunks : Sequence[int]
+        Chunk sizes along a dimension (e.g., ``(3, 3, 3, 1, )``)
+    index : array-like
+        Integer indexes along the dimension
+
+    Returns
+    -------
+    np.ndarray
+        Chunk number of each index
+    np.ndarray
+        Index relative to the start of each chunk
+
+    Raises
+    ------
+    IndexError
+        Raised if any ``index`` is outside of the dimension
+    """
+    index = np.asarray(index)
+    edges = np.cumsum((0, ) + tuple(chunks))
+    if index.size and (index.min() < 0 or index.max() >= edges[-1]):
+        raise IndexError(f'Index outside of dimension of size {edges[-1]}')
+    chunk = np.searchsorted(edges, index, side='right') - 1
+    return chunk, index - edges[chunk]
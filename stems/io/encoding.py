@@ -1,12 +1,16 @@
 from collections import OrderedDict
 from functools import singledispatch
 import logging
+import time
+import zlib as zlib_
 
+import dask
 import numpy as np
 import xarray as xr
 
 from ..utils import list_like
-from .chunk import chunks_to_chunksizes
+from .chunk import (ACCESS_PATTERNS, SPATIAL_DIMS,
+                    budget_chunksizes, chunks_to_chunksizes)
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +18,16 @@ logger = logging.getLogger(__name__)
 #: NumPy string types (str, bytes, unicode)
 _NP_STRING_TYPES = (np.str_, np.bytes_, np.unicode_, )
 
+#: int: Default size (bytes) of the HDF5 chunk cache used by NetCDF4 for
+#       each variable
+DEFAULT_CHUNK_CACHE_SIZE = 16 * 2 ** 20
+
+#: tuple: Compression settings compared by :py:func:`select_compression`
+COMPRESSION_CANDIDATES = tuple(
+    {'zlib': True, 'complevel': complevel, 'shuffle': shuffle}
+    for complevel in (1, 4, 9) for shuffle in (True, False)
+) + ({'zlib': False, 'complevel': 0, 'shuffle': False}, )
+
 
 @singledispatch
 def netcdf_encoding(data,
@@ -21,6 +35,8 @@ def netcdf_encoding(data,
                     zlib=True,
                     complevel=4,
                     nodata=None,
+                    min_speed=None,
+                    max_ratio=None,
                     **encoding_kwds):
     """ Return "good" NetCDF encoding information for some data
 
@@ -41,19 +57,31 @@ def netcdf_encoding(data,
     dtype : np.dtype, optional
         The data type used for the encoded data. Defaults to the input data
         type(s), but can be set to facilitate discretization based compression
-        (typically alongside scale_factor and _FillValue)
-    chunks : None, tuple or dict, optional
+        (typically alongside scale_factor and _FillValue, which can be
+        determined using :py:func:`packing_encoding`)
+    chunks : None, str, tuple or dict, optional
         Chunksizes used to encode NetCDF. If given as a `tuple`, chunks should
         be given for each dimension. Chunks for dimensions not specified when
-        given as a `dict` will default to 1. Passing ``False`` will not
-        use chunks.
-    zlib : bool, optional
-        Use compression
+        given as a `dict` will default to 1. If given as a `str`, plan
+        chunks for this access pattern (see :py:func:`plan_chunksizes`).
+        Passing ``False`` will not use chunks.
+    zlib : bool or str, optional
+        Use compression. If "auto", choose compression settings (``zlib``,
+        ``complevel``, and ``shuffle``) by benchmarking them on a sample of
+        chunks (see :py:func:`select_compression`). If neither ``dtype`` or
+        ``nodata`` are given, losslessly packing the data into a smaller
+        integer ``dtype`` is also considered, which requires a pass over the
+        data (see :py:func:`lossless_dtype`)
     complevel : int, optional
         Compression level
     nodata : int, float, or sequence, optional
         NoDataValue(s). Specify one for each ``DataArray`` in ``data``
         if a :py:class:`xarray.Dataset`. Used for ``_FillValue``
+    min_speed : float, optional
+        When ``zlib="auto"``, the minimum decompression speed (MB/s)
+    max_ratio : float, optional
+        When ``zlib="auto"``, the maximum compressed size as a fraction of
+        the uncompressed size
     encoding_kwds : dict
         Additional encoding data to pass
 
@@ -83,6 +111,8 @@ def _netcdf_encoding_dataarray(data,
                                zlib=True,
                                complevel=4,
                                nodata=None,
+                               min_speed=None,
+                               max_ratio=None,
                                **encoding_kwds):
     name = encoding_name(data)
     encoding = {name: {}}
@@ -107,8 +137,19 @@ def _netcdf_encoding_dataarray(data,
         encoding[name]['_FillValue'] = nodata
 
     # complevel & zlib: compression
-    encoding[name]['complevel'] = complevel
-    encoding[name]['zlib'] = zlib
+    if zlib == 'auto':
+        compression, _ = select_compression(
+            data,
+            chunksizes=encoding[name].get('chunksizes'),
+            min_speed=min_speed,
+            max_ratio=max_ratio,
+            # Don't override user's datatype or NoDataValue
+            pack=dtype is None and nodata is None
+        )
+        encoding[name].update(compression)
+    else:
+        encoding[name]['complevel'] = complevel
+        encoding[name]['zlib'] = zlib
 
     # Fill in user input
     encoding[name].update(encoding_kwds)
@@ -123,6 +164,8 @@ def _netcdf_encoding_dataset(data,
                              zlib=True,
                              complevel=4,
                              nodata=None,
+                             min_speed=None,
+                             max_ratio=None,
                              **encoding_kwds):
     encoding = OrderedDict()
     for var in data.data_vars:
@@ -137,6 +180,8 @@ def _netcdf_encoding_dataset(data,
             zlib=zlib[var] if _is_dict(zlib) else zlib,
             complevel=complevel[var] if _is_dict(complevel) else complevel,
             nodata=nodata[var] if _is_dict(nodata) else nodata,
+            min_speed=min_speed[var] if _is_dict(min_speed) else min_speed,
+            max_ratio=max_ratio[var] if _is_dict(max_ratio) else max_ratio,
             **kwds
         )
         encoding[var] = var_encoding[var]
@@ -190,8 +235,9 @@ def encoding_chunksizes(xarr, chunks=None):
     ----------
     xarr : xarray.DataArray
         DataArray to consider
-    chunks : tuple[int] or Mapping[str, int]
-        Chunks per dimension
+    chunks : str, tuple[int] or Mapping[str, int]
+        Chunks per dimension, or an access pattern to plan chunks for
+        (see :py:func:`plan_chunksizes`)
 
     Returns
     -------
@@ -201,13 +247,505 @@ def encoding_chunksizes(xarr, chunks=None):
     if chunks is None:
         # Grab chunks from DataArray
         chunksize = chunks_to_chunksizes(xarr)
+    elif isinstance(chunks, str):
+        chunksize = plan_chunksizes(xarr, pattern=chunks)
+        amp = read_amplification(xarr, chunksize, pattern=chunks)
+        logger.debug(f'Planned chunks {chunksize} for "{chunks}" reads of '
+                     f'"{xarr.name}" (read amplification: {amp:.2f})')
     elif isinstance(chunks, dict):
         # Default to 1 chunk per dimension if none found
         chunksize = tuple(chunks.get(dim, len(xarr.coords[dim]))
                           for dim in xarr.dims)
+    else:
+        chunksize = tuple(chunks)
     return chunksize
 
 
+# ----------------------------------------------------------------------------
+# Chunk planning for access patterns
+def plan_chunksizes(xarr, pattern='time-series',
+                    chunk_cache=DEFAULT_CHUNK_CACHE_SIZE,
+                    spatial_dims=SPATIAL_DIMS):
+    """ Plan chunksizes for data that will be read using an access pattern
+
+    Chunks are sized to fit within the chunk cache, since HDF5 doesn't cache
+    chunks larger than the cache. Within this limit, chunks span as much of
+    the dimensions read at once as possible -- all non-spatial dimensions
+    (e.g., "time") for "time-series" reads of a pixel, or the spatial
+    dimensions for "spatial-map" reads of a scene.
+
+    Parameters
+    ----------
+    xarr : xarray.DataArray
+        DataArray to plan chunks for
+    pattern : str, optional
+        Access pattern (see :py:data:`stems.io.chunk.ACCESS_PATTERNS`)
+    chunk_cache : int, optional
+        Size of the chunk cache in bytes
+    spatial_dims : Sequence[str], optional
+        Names of spatial dimensions
+
+    Returns
+    -------
+    tuple[int]
+        Chunksizes per dimension
+    """
+    sizes = OrderedDict(zip(xarr.dims, xarr.shape))
+    chunks = budget_chunksizes(sizes, xarr.dtype, budget=chunk_cache,
+                               pattern=pattern, spatial_dims=spatial_dims)
+    return tuple(chunks.values())
+
+
+def read_amplification(xarr, chunksizes, pattern='time-series',
+                       chunk_cache=DEFAULT_CHUNK_CACHE_SIZE,
+                       spatial_dims=SPATIAL_DIMS):
+    """ Return the expected read amplification for an access pattern
+
+    Read amplification is the number of bytes decompressed for each byte
+    requested. For "time-series" access, each read requests all
+    non-spatial dimensions for one pixel. For "spatial-map" access, each
+    read requests all spatial dimensions for one index along the other
+    dimensions. Reads are assumed to be made in order, so if all of the
+    chunks needed for a read fit into ``chunk_cache``, they are reused
+    by the next reads within the same chunks.
+
+    Parameters
+    ----------
+    xarr : xarray.DataArray
+        DataArray to be read
+    chunksizes : tuple[int]
+        Chunksizes per dimension
+    pattern : str, optional
+        Access pattern (see :py:data:`stems.io.chunk.ACCESS_PATTERNS`)
+    chunk_cache : int, optional
+        Size of the chunk cache in bytes. Pass 0 to ignore the cache
+    spatial_dims : Sequence[str], optional
+        Names of spatial dimensions
+
+    Returns
+    -------
+    float
+        Read amplification (1 is ideal)
+
+    Raises
+    ------
+    ValueError
+        Raised if ``pattern`` is not known
+    """
+    if pattern not in ACCESS_PATTERNS:
+        raise ValueError(f'Unknown access pattern "{pattern}". Choose from: '
+                         f'{ACCESS_PATTERNS}')
+    if not chunksizes:
+        # Contiguous, so reads are exact only if along the last dimension
+        chunksizes = (1, ) * (xarr.ndim - 1) + xarr.shape[-1:]
+
+    decoded, requested, reused = 1, 1, 1
+    for dim, size, csize in zip(xarr.dims, xarr.shape, chunksizes):
+        spatial = dim in spatial_dims
+        if spatial == (pattern == 'spatial-map'):
+            # Read entirely
+            decoded *= -(-size // csize) * csize
+            requested *= size
+        else:
+            # Read one index, but decode the whole chunk
+            decoded *= csize
+            reused *= csize
+
+    amplification = decoded / requested
+    if decoded * xarr.dtype.itemsize <= chunk_cache:
+        amplification /= reused
+    return amplification
+
+
+# ----------------------------------------------------------------------------
+# Discretization (scale/offset packing)
+#: tuple: Integer datatypes considered for packing, from smallest to largest
+PACKING_DTYPES = ('int8', 'int16', 'int32', )
+
+
+@singledispatch
+def packing_encoding(data, precision=None, significant_digits=None,
+                     dtype=None, value_range=None):
+    """ Return encoding to pack floating point data into integers
+
+    Data are stored as ``round((value - add_offset) / scale_factor)`` in an
+    integer datatype, with the smallest value of the datatype reserved for
+    ``_FillValue`` (used for missing values). If possible, ``add_offset`` is
+    0 so that packed values are simple multiples of ``precision``.
+
+    Parameters
+    ----------
+    data : xr.DataArray or xr.Dataset
+        Data to pack. If ``xr.Dataset``, return encoding for all floating
+        point variables in ``data.data_vars``
+    precision : float or dict, optional
+        Precision (quantization step) to retain, used for ``scale_factor``
+    significant_digits : int or dict, optional
+        Number of significant digits to retain, relative to the largest
+        absolute value. Used if ``precision`` is not given
+    dtype : np.dtype or dict, optional
+        Integer datatype to pack into. By default, uses the smallest
+        datatype from :py:data:`PACKING_DTYPES` that fits the data
+    value_range : tuple or dict, optional
+        Minimum and maximum value of the data. If not given, the range is
+        computed (in one pass, if data are Dask arrays). Values outside of
+        this range cannot be stored
+
+    Returns
+    -------
+    dict
+        Dict mapping variable names to packing encoding (``dtype``,
+        ``scale_factor``, ``add_offset`` and ``_FillValue``)
+
+    Raises
+    ------
+    ValueError
+        Raised if neither ``precision`` or ``significant_digits`` are given,
+        or if the data cannot be stored at this precision with ``dtype``
+
+    Examples
+    --------
+    >>> ds = xr.Dataset({'red': ('x', np.array([0.01, 0.5, 1.]))})
+    >>> packing_encoding(ds, precision=1e-4)
+    {'red': {'dtype': dtype('int16'), 'scale_factor': 0.0001,
+             'add_offset': 0.0, '_FillValue': -32768}}
+    """
+    raise TypeError(f'Unknown type for input ``data`` "{type(data)}"')
+
+
+@packing_encoding.register(xr.DataArray)
+def _packing_encoding_dataarray(data, precision=None,
+                                significant_digits=None,
+                                dtype=None, value_range=None):
+    if value_range is None:
+        value_range, = _value_ranges([data])
+    name = encoding_name(data)
+    return {name: _packing(data, precision, significant_digits,
+                           dtype, value_range)}
+
+
+@packing_encoding.register(xr.Dataset)
+def _packing_encoding_dataset(data, precision=None,
+                              significant_digits=None,
+                              dtype=None, value_range=None):
+    names = [name for name, var in data.data_vars.items()
+             if var.dtype.kind == 'f']
+
+    # Compute any missing value ranges together
+    if value_range is None:
+        missing = names
+    elif _is_dict(value_range):
+        missing = [name for name in names if name not in value_range]
+    else:
+        missing = []
+    ranges = dict(zip(missing, _value_ranges([data[n] for n in missing])))
+
+    encoding = OrderedDict()
+    for name in names:
+        if name in ranges:
+            range_ = ranges[name]
+        else:
+            range_ = (value_range[name] if _is_dict(value_range)
+                      else value_range)
+        encoding[name] = _packing(
+            data[name],
+            precision[name] if _is_dict(precision) else precision,
+            (significant_digits[name] if _is_dict(significant_digits)
+             else significant_digits),
+            dtype[name] if _is_dict(dtype) else dtype,
+            range_
+        )
+    return encoding
+
+
+def _value_ranges(xarrs):
+    # Compute min/max for all DataArrays at once
+    if not xarrs:
+        return []
+    values = dask.compute(*[(x.min(), x.max()) for x in xarrs])
+    return [(float(vmin), float(vmax)) for vmin, vmax in values]
+
+
+def _packing(xarr, precision, significant_digits, dtype, value_range):
+    vmin, vmax = value_range
+    if np.isnan(vmin) or np.isnan(vmax):  # all missing
+        vmin, vmax = 0., 0.
+
+    if precision is None:
+        if significant_digits is None:
+            raise ValueError('Must provide either `precision` or '
+                             '`significant_digits`')
+        largest = max(abs(vmin), abs(vmax)) or 1.
+        precision = 10. ** (np.floor(np.log10(largest)) -
+                            significant_digits + 1)
+
+    dtypes = [dtype] if dtype is not None else PACKING_DTYPES
+    for dtype_ in dtypes:
+        info = np.iinfo(dtype_)
+        low, high = info.min + 1, info.max  # reserve min for _FillValue
+        if np.round(vmin / precision) >= low and \
+                np.round(vmax / precision) <= high:
+            offset = 0.
+        elif np.round((vmax - vmin) / precision) <= high - low:
+            offset = vmin - low * precision
+        else:
+            continue
+
+        float_type = (xarr.dtype.type if xarr.dtype.kind == 'f'
+                      else np.float64)
+        return {
+            'dtype': np.dtype(dtype_),
+            'scale_factor': float_type(precision),
+            'add_offset': float_type(offset),
+            '_FillValue': info.min
+        }
+
+    raise ValueError(f'Cannot pack "{xarr.name}" with range ({vmin}, {vmax}) '
+                     f'at precision {precision} using {dtypes}')
+
+
+# ----------------------------------------------------------------------------
+# Compression benchmarking
+def benchmark_compression(xarr, candidates=COMPRESSION_CANDIDATES,
+                          chunksizes=None, n_chunks=3, pack=False):
+    """ Benchmark compression settings using a sample of chunks
+
+    Compression is measured using the same filters as NetCDF4/HDF5 (the
+    byte "shuffle" filter followed by zlib/deflate), applied to each chunk.
+
+    Parameters
+    ----------
+    xarr : xarray.DataArray
+        Data to compress
+    candidates : Sequence[dict], optional
+        Encoding settings (``zlib``, ``complevel`` and ``shuffle``) to try
+    chunksizes : tuple[int], optional
+        Chunksizes used when writing. Defaults to the chunks of ``xarr``,
+        or one chunk if it isn't chunked
+    n_chunks : int, optional
+        Number of chunks to sample, spread evenly across the data
+    pack : bool, optional
+        Also try each candidate with data packed losslessly into the
+        smallest integer data type that can hold the data (see
+        :py:func:`lossless_dtype`). Requires checking all of the data,
+        not just the sampled chunks
+
+    Returns
+    -------
+    list[dict]
+        For each candidate, the ``encoding`` tried, and the compression
+        ``ratio`` (compressed / uncompressed size), and encode and decode
+        speeds (MB/s of uncompressed data, ``encode_speed`` and
+        ``decode_speed``)
+    """
+    chunksizes = tuple(chunksizes or chunks_to_chunksizes(xarr) or xarr.shape)
+    samples = _sample_chunks(xarr, chunksizes, n_chunks)
+
+    encodings = [(dict(c), None) for c in candidates]
+    if pack:
+        packed = lossless_dtype(xarr)
+        if packed and packed['dtype'].itemsize < xarr.dtype.itemsize:
+            encodings.extend((dict(c, **packed), packed) for c in candidates)
+
+    nbytes = sum(sample.nbytes for sample in samples)
+    results = []
+    for encoding, packed in encodings:
+        size, t_encode, t_decode = 0, 0., 0.
+        for sample in samples:
+            if packed:
+                sample = _pack(sample, packed)
+            t0 = time.perf_counter()
+            data = _shuffle(sample) if encoding['shuffle'] else sample
+            data = data.tobytes()
+            if encoding['zlib']:
+                data = zlib_.compress(data, encoding['complevel'])
+            t1 = time.perf_counter()
+            if encoding['zlib']:
+                zlib_.decompress(data)
+            t2 = time.perf_counter()
+            size += len(data)
+            t_encode += t1 - t0
+            t_decode += t2 - t1
+
+        results.append(OrderedDict((
+            ('encoding', encoding),
+            ('ratio', size / max(nbytes, 1)),
+            ('encode_speed', _speed(nbytes, t_encode)),
+            ('decode_speed', _speed(nbytes, t_decode)),
+        )))
+
+    return results
+
+
+def select_compression(xarr, min_speed=None, max_ratio=None, **kwds):
+    """ Select compression settings meeting a speed and/or size target
+
+    Chooses the candidate benchmarked by :py:func:`benchmark_compression`
+    with the smallest compressed size that decompresses at least as fast as
+    ``min_speed``. If only ``max_ratio`` is given, chooses the fastest
+    candidate to decompress that is at least this small. If no candidates
+    meet the target(s), the candidate closest to meeting them is chosen.
+
+    Parameters
+    ----------
+    xarr : xarray.DataArray
+        Data to compress
+    min_speed : float, optional
+        Minimum decompression speed (MB/s)
+    max_ratio : float, optional
+        Maximum compressed size as a fraction of the uncompressed size
+    kwds
+        Options passed to :py:func:`benchmark_compression`
+
+    Returns
+    -------
+    dict
+        Encoding for chosen compression settings
+    list[dict]
+        Benchmark results for all candidates
+    """
+    results = benchmark_compression(xarr, **kwds)
+
+    ok = [r for r in results
+          if (min_speed is None or r['decode_speed'] >= min_speed) and
+          (max_ratio is None or r['ratio'] <= max_ratio)]
+    fastest = lambda r: r['decode_speed']  # noqa: E731
+    smallest = lambda r: (r['ratio'], -r['decode_speed'])  # noqa: E731
+    if ok:
+        if max_ratio is not None and min_speed is None:
+            pick = max(ok, key=fastest)
+        else:
+            pick = min(ok, key=smallest)
+    else:
+        logger.warning('No compression settings met target for '
+                       f'"{xarr.name}". Choosing closest')
+        if min_speed is not None:
+            pick = max(results, key=fastest)
+        else:
+            pick = min(results, key=smallest)
+
+    logger.debug(f'Selected compression {pick["encoding"]} for '
+                 f'"{xarr.name}" (ratio={pick["ratio"]:.3f}, decode '
+                 f'speed={pick["decode_speed"]:.1f} MB/s)')
+    return dict(pick['encoding']), results
+
+
+def lossless_dtype(data):
+    """ Return the smallest integer datatype that exactly holds some data
+
+    Parameters
+    ----------
+    data : xarray.DataArray, np.ndarray, or Sequence[np.ndarray]
+        Data. Floating point data must be integer valued, and
+        missing values (NaN) require a value in the datatype to be reserved
+        for ``_FillValue``. All of the data are checked (in one pass, if
+        data are Dask arrays)
+
+    Returns
+    -------
+    dict or None
+        Encoding (``dtype``, and ``_FillValue`` if there are missing
+        values), or None if no integer datatype can hold the data
+    """
+    if isinstance(data, xr.DataArray):
+        stats = _lossless_stats_xarray(data)
+    else:
+        stats = _lossless_stats(data)
+    if stats is None:
+        return None
+    vmin, vmax, missing = stats
+
+    for dtype in ('int8', 'uint8', 'int16', 'uint16', 'int32', 'uint32',
+                  'int64'):
+        info = np.iinfo(dtype)
+        low = info.min + 1 if missing else info.min
+        if low <= vmin and vmax <= info.max:
+            enc = {'dtype': np.dtype(dtype)}
+            if missing:
+                enc['_FillValue'] = info.min
+            return enc
+    return None
+
+
+def _lossless_stats(data):
+    # Range & if missing of integer valued arrays, or None if not
+    arrs = [np.asarray(d) for d in (data if isinstance(data, (list, tuple))
+                                    else [data])]
+    kind = arrs[0].dtype.kind
+    if kind not in 'iuf':
+        return None
+
+    finite = [a[np.isfinite(a)] if kind == 'f' else a.ravel() for a in arrs]
+    finite = np.concatenate(finite) if finite else np.array([])
+    if kind == 'f':
+        if np.isinf(np.concatenate([a.ravel() for a in arrs])).any():
+            return None
+        if finite.size and not np.array_equal(finite, np.round(finite)):
+            return None
+    missing = sum(a.size for a in arrs) > finite.size
+
+    vmin = finite.min() if finite.size else 0
+    vmax = finite.max() if finite.size else 0
+    return vmin, vmax, missing
+
+
+def _lossless_stats_xarray(xarr):
+    # Same as ``_lossless_stats``, computing over all of the data at once
+    kind = xarr.dtype.kind
+    if kind not in 'iuf':
+        return None
+    if kind != 'f':
+        (vmin, vmax), = _value_ranges([xarr])
+        return vmin, vmax, False
+
+    finite = np.isfinite(xarr)
+    vmin, vmax, fraction, n_finite = dask.compute(
+        xarr.min(), xarr.max(),
+        (xarr.where(finite, 0) % 1 != 0).any(),
+        finite.sum()
+    )
+    vmin, vmax, n_finite = float(vmin), float(vmax), int(n_finite)
+    if np.isinf(vmin) or np.isinf(vmax) or bool(fraction):
+        return None
+    if not n_finite:
+        vmin, vmax = 0, 0
+    return vmin, vmax, n_finite < xarr.size
+
+
+def _sample_chunks(xarr, chunksizes, n):
+    # Load ``n`` chunks spread evenly across the chunk grid
+    nchunks = [-(-size // csize) for size, csize in
+               zip(xarr.shape, chunksizes)]
+    total = int(np.prod(nchunks))
+    idx = np.unique(np.linspace(0, total - 1, min(n, total)).astype(int))
+
+    samples = []
+    for i in idx:
+        loc = np.unravel_index(i, nchunks)
+        slices = tuple(slice(j * c, (j + 1) * c)
+                       for j, c in zip(loc, chunksizes))
+        samples.append(np.ascontiguousarray(xarr.data[slices]))
+    return samples
+
+
+def _pack(arr, packed):
+    fill = packed.get('_FillValue')
+    if fill is not None:
+        arr = np.where(np.isnan(arr), fill, arr)
+    return arr.astype(packed['dtype'])
+
+
+def _shuffle(arr):
+    # Equivalent of the HDF5 shuffle filter: group bytes by significance
+    if arr.dtype.itemsize == 1:
+        return arr
+    return arr.view(np.uint8).reshape(-1, arr.dtype.itemsize).T.copy()
+
+
+def _speed(nbytes, seconds):
+    return nbytes / 1e6 / max(seconds, 1e-9)
+
+
 # ----------------------------------------------------------------------------
 # Encoding checks, safeguards, and fixes
 def guard_chunksizes(xarr, chunksizes):
@@ -0,0 +1,392 @@
+""" Reference manifests describing stacks of NetCDF files
+
+A manifest is a JSON document recording, once, what
+:py:func:`xarray.open_mfdataset` would otherwise need to rediscover each
+time a stack of files is opened: the files (with their modification times
+and sizes), the dimensions, coordinates, attributes, and encoding of each
+variable, and the on-disk chunk layout. Opening a manifest with
+:py:func:`open_manifest` creates a "virtual" dataset of lazy Dask arrays
+without opening any of the files. Files are only opened when data are
+computed, and are kept open by each process (or worker) reading them (see
+:py:data:`MANIFEST_FILE_CACHE_SIZE`).
+
+Manifests don't record byte offsets of chunks within files, so data are not
+read directly from byte ranges. Each chunk is read through
+:py:func:`xarray.open_dataset` (and the NetCDF/HDF5 library) from its file.
+Coordinates must be numbers, strings, or ``numpy.datetime64`` /
+``numpy.timedelta64`` (e.g., not ``cftime`` dates) to be stored as JSON.
+
+Manifests describe files that are concatenated along one dimension (e.g.,
+a time stack for a single tile). All other dimensions must be aligned
+across files.
+"""
+from collections import OrderedDict
+import datetime as dt
+from functools import lru_cache
+import json
+import logging
+import os
+from pathlib import Path
+
+import dask.array as da
+from dask.base import tokenize
+import numpy as np
+import xarray as xr
+
+from .chunk import best_chunksizes, read_chunks
+from .utils import parse_paths
+from ..utils import map_threads
+
+logger = logging.getLogger(__name__)
+
+#: int: Version of the manifest format
+MANIFEST_VERSION = 1
+
+#: tuple: Encoding keys retained in manifests
+MANIFEST_ENCODING_KEYS = (
+    'dtype', 'chunksizes', 'zlib', 'complevel', 'shuffle',
+    '_FillValue', 'scale_factor', 'add_offset', 'units', 'calendar'
+)
+
+#: int: Number of opened files cached by each process reading manifest data
+MANIFEST_FILE_CACHE_SIZE = 128
+
+
+class StaleManifestError(Exception):
+    """ Raised when a manifest doesn't match the files it describes
+    """
+    pass
+
+
+# ----------------------------------------------------------------------------
+# Build
+def build_manifest(paths, concat_dim, dst=None, parallel=False):
+    """ Scan a stack of NetCDF files and return a manifest describing them
+
+    Parameters
+    ----------
+    paths : str or List[str]
+        Either a string glob in the form "path/to/my/files/*.nc" or an explicit
+        list of files
+    concat_dim : str
+        Dimension the files are concatenated along
+    dst : str or Path, optional
+        Save the manifest as JSON to this file
+    parallel : bool or int, optional
+        Scan files concurrently using threads
+
+    Returns
+    -------
+    dict
+        Manifest
+
+    Raises
+    ------
+    IOError
+        Raise if ``paths`` does not parse into any filenames (e.g., a bad glob)
+    ValueError
+        Raised if files aren't aligned along dimensions other than
+        ``concat_dim``, or have coordinates or attributes that can't be
+        stored as JSON (e.g., ``cftime`` dates)
+    """
+    paths_ = parse_paths(paths, parallel=parallel)
+    if not paths_:
+        raise IOError(f'Could not find a file to read using input "{paths}"')
+
+    files = map_threads(lambda p: _scan_file(p, concat_dim), paths_, parallel)
+
+    first = files[0]
+    for f in files[1:]:
+        if f['dims'].keys() != first['dims'].keys() or any(
+                f['dims'][d] != first['dims'][d]
+                for d in f['dims'] if d != concat_dim):
+            raise ValueError(f'File "{f["path"]}" is not aligned with '
+                             f'"{first["path"]}" along dimensions other '
+                             f'than "{concat_dim}"')
+
+    # Coordinates along ``concat_dim`` are stored with each file
+    coords = OrderedDict()
+    for name, coord in first['coords'].items():
+        if concat_dim in coord['dims']:
+            coord = OrderedDict(coord, data=None)
+        coords[name] = coord
+
+    manifest = OrderedDict((
+        ('version', MANIFEST_VERSION),
+        ('concat_dim', concat_dim),
+        ('attrs', first['attrs']),
+        ('coords', coords),
+        ('variables', first['variables']),
+        ('files', [_file_entry(f, concat_dim) for f in files]),
+    ))
+
+    if dst:
+        with open(str(dst), 'w') as fid:
+            json.dump(manifest, fid, indent=1)
+        logger.debug(f'Wrote manifest for {len(files)} files to "{dst}"')
+
+    return manifest
+
+
+def _scan_file(path, concat_dim):
+    path = Path(path).absolute()
+    stat = path.stat()
+
+    try:
+        chunks = read_chunks(str(path))
+    except ValueError:
+        chunks = {}
+
+    with xr.open_dataset(str(path)) as ds:
+        variables = OrderedDict()
+        for name, var in ds.data_vars.items():
+            variables[name] = OrderedDict((
+                ('dims', list(var.dims)),
+                ('dtype', var.dtype.str),
+                ('attrs', _to_json(var.attrs)),
+                ('encoding', _to_json({
+                    k: v for k, v in var.encoding.items()
+                    if k in MANIFEST_ENCODING_KEYS
+                })),
+                ('chunks', _to_json(chunks.get(name) or {})),
+            ))
+
+        coords = OrderedDict(
+            (name, _encode_coord(coord))
+            for name, coord in ds.coords.items()
+        )
+        info = {
+            'path': str(path),
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'dims': OrderedDict((d, int(n)) for d, n in ds.sizes.items()),
+            'attrs': _to_json(ds.attrs),
+            'coords': coords,
+            'variables': variables,
+        }
+
+    return info
+
+
+def _file_entry(info, concat_dim):
+    entry = OrderedDict((
+        ('path', info['path']),
+        ('mtime', info['mtime']),
+        ('size', info['size']),
+        ('dims', info['dims']),
+        ('coords', OrderedDict(
+            (name, coord['data']) for name, coord in info['coords'].items()
+            if concat_dim in coord['dims']
+        )),
+    ))
+    return entry
+
+
+# ----------------------------------------------------------------------------
+# Read
+def read_manifest(manifest, check=True, paths=None):
+    """ Read a manifest, checking if it is out of date
+
+    Parameters
+    ----------
+    manifest : str, Path, or dict
+        Manifest file, or manifest data
+    check : bool, optional
+        Check the modification time and size of each file in the manifest
+    paths : Sequence[str], optional
+        Check that the manifest describes exactly these files
+
+    Returns
+    -------
+    dict
+        Manifest
+
+    Raises
+    ------
+    StaleManifestError
+        Raised if the manifest is missing, from another version, the
+        files described have been modified or removed, or don't match
+        ``paths``
+    """
+    if not isinstance(manifest, dict):
+        try:
+            with open(str(manifest)) as fid:
+                manifest = json.load(fid)
+        except (IOError, OSError, ValueError):
+            raise StaleManifestError(f'Could not read manifest "{manifest}"')
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise StaleManifestError('Manifest is from a different version '
+                                 f'("{manifest.get("version")}")')
+
+    if paths is not None:
+        paths_ = [str(Path(p).absolute()) for p in paths]
+        if paths_ != [entry['path'] for entry in manifest['files']]:
+            raise StaleManifestError('Manifest does not describe the files '
+                                     'requested')
+
+    if check:
+        for entry in manifest['files']:
+            try:
+                stat = os.stat(entry['path'])
+            except OSError:
+                raise StaleManifestError(f'File "{entry["path"]}" is missing')
+            if (stat.st_mtime_ns != entry['mtime'] or
+                    stat.st_size != entry['size']):
+                raise StaleManifestError(f'File "{entry["path"]}" has been '
+                                         'modified')
+
+    return manifest
+
+
+def open_manifest(manifest, chunks='auto', check=True, paths=None):
+    """ Open a manifest as a virtual, lazily loaded dataset
+
+    Parameters
+    ----------
+    manifest : str, Path, or dict
+        Manifest file, or manifest data
+    chunks : 'auto', dict, or None
+        Chunk sizes for each dimension. If 'auto', uses the most common on-disk
+        chunk sizes (see :py:func:`stems.io.chunk.best_chunksizes`). Chunks
+        along the concatenated dimension do not span files.
+    check : bool, optional
+        Check that the files described haven't been modified
+    paths : Sequence[str], optional
+        Check that the manifest describes exactly these files
+
+    Returns
+    -------
+    xarray.Dataset
+        Dataset, concatenated along the manifest's ``concat_dim``
+
+    Raises
+    ------
+    StaleManifestError
+        Raised if the manifest is out of date
+    """
+    manifest = read_manifest(manifest, check=check, paths=paths)
+    concat_dim = manifest['concat_dim']
+    files = manifest['files']
+
+    if chunks == 'auto':
+        chunks = best_chunksizes(OrderedDict(
+            (name, var['chunks'] or None)
+            for name, var in manifest['variables'].items()
+        ))
+    chunks = chunks or {}
+
+    # Coordinates, concatenating those that vary by file
+    coords = OrderedDict()
+    for name, coord in manifest['coords'].items():
+        if concat_dim in coord['dims']:
+            coords[name] = (coord['dims'], np.concatenate([
+                _decode_coord(coord, f['coords'][name]) for f in files
+            ]), coord['attrs'])
+        else:
+            coords[name] = (coord['dims'],
+                            _decode_coord(coord, coord['data']),
+                            coord['attrs'])
+
+    data_vars = OrderedDict()
+    for name, var in manifest['variables'].items():
+        dtype = np.dtype(var['dtype'])
+        dims = var['dims']
+        arrs = []
+        for entry in (files if concat_dim in dims else files[:1]):
+            shape = tuple(entry['dims'][d] for d in dims)
+            chunks_ = tuple(chunks.get(d, -1) for d in dims)
+            arr = _ManifestArray(entry['path'], entry['mtime'], name,
+                                 shape, dtype)
+            token = tokenize(entry['path'], entry['mtime'], entry['size'],
+                             name, chunks_)
+            arrs.append(da.from_array(
+                arr, chunks=chunks_, lock=False, asarray=True,
+                name=f'manifest-{name}-{token}'
+            ))
+        data = (da.concatenate(arrs, axis=dims.index(concat_dim))
+                if len(arrs) > 1 else arrs[0])
+        data_vars[name] = xr.Variable(dims, data, attrs=var['attrs'],
+                                      encoding=_encoding(var['encoding']))
+
+    ds = xr.Dataset(data_vars, coords=coords, attrs=manifest['attrs'])
+    return ds
+
+
+class _ManifestArray(object):
+    """ Array-like reading (decoded) data from a file only when indexed
+    """
+    def __init__(self, path, mtime, name, shape, dtype):
+        self.path = path
+        self.mtime = mtime
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.ndim = len(shape)
+
+    def __getitem__(self, key):
+        ds = _open_file(self.path, self.mtime)
+        return np.asarray(ds[self.name][key].values, dtype=self.dtype)
+
+
+@lru_cache(maxsize=MANIFEST_FILE_CACHE_SIZE)
+def _open_file(path, mtime):
+    # Cached per process, and by ``mtime`` so modified files are reopened.
+    # XArray limits how many of these files have open handles
+    return xr.open_dataset(path, cache=False)
+
+
+# ----------------------------------------------------------------------------
+# JSON (de)serialization helpers
+def _encode_coord(coord):
+    values = coord.values
+    if values.dtype.kind in 'mM':
+        # Store as integer nanoseconds
+        dtype = f'{values.dtype.name.split("[")[0]}[ns]'
+        data = values.astype(dtype).view(np.int64).tolist()
+    else:
+        try:
+            dtype, data = values.dtype.str, _to_json(values)
+        except ValueError as e:
+            raise ValueError(f'Cannot store coordinate "{coord.name}" in a '
+                             f'manifest: {e}')
+    return OrderedDict((
+        ('dims', list(coord.dims)),
+        ('dtype', dtype),
+        ('data', data),
+        ('attrs', _to_json(coord.attrs)),
+    ))
+
+
+def _decode_coord(coord, data):
+    dtype = np.dtype(coord['dtype'])
+    if dtype.kind in 'mM':
+        return np.asarray(data, dtype=np.int64).view(dtype)
+    return np.asarray(data, dtype=dtype)
+
+
+def _encoding(encoding):
+    encoding = dict(encoding)
+    if encoding.get('chunksizes'):
+        encoding['chunksizes'] = tuple(encoding['chunksizes'])
+    return encoding
+
+
+def _to_json(value):
+    if isinstance(value, dict):
+        return OrderedDict((str(k), _to_json(v)) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    elif isinstance(value, np.ndarray):
+        return _to_json(value.tolist())
+    elif isinstance(value, np.dtype):
+        return value.str
+    elif isinstance(value, np.generic):
+        return value.item()
+    elif isinstance(value, (dt.datetime, dt.date)):
+        return value.isoformat()
+    elif value is None or isinstance(value, (str, bool, int, float, )):
+        return value
+    type_ = type(value)
+    raise ValueError('Cannot store values of type '
+                     f'"{type_.__module__}.{type_.__name__}" as JSON')
@@ -1,9 +1,15 @@
 """ Rasterio IO helpers
 """
 import logging
+import os
 from pathlib import Path
 
+import dask.array as da
+import numpy as np
 import rasterio
+from rasterio.enums import Resampling
+import rasterio.shutil
+from rasterio.windows import Window
 import xarray as xr
 
 from .. import xarray_accessor
@@ -16,13 +22,27 @@ logger = logging.getLogger(__name__)
 DEFAULT_RASTERIO_DRIVER = 'GTiff'
 #: Attributes to keep from output of ``xarray.open_rasterio``
 RASTERIO_ATTR_WHITELIST = ('nodatavals', )
+#: dict: Default creation options for Cloud-Optimized GeoTIFFs
+COG_DEFAULTS = {
+    'compress': 'deflate',
+    'predictor': 'yes',  # chooses predictor based on data type
+    'blocksize': 512,
+}
 
 
 def xarray_to_rasterio(xarr, path, driver=DEFAULT_RASTERIO_DRIVER,
                        crs=None, transform=None,
-                       nodata=None,
+                       nodata=None, lock=None,
+                       cog=False, overview_resampling='average',
+                       overview_factors=None,
                        **meta):
     """ Save a DataArray to a rasterio/GDAL dataset
+
+    If ``xarr`` is backed by a Dask array, blocks are computed and written
+    one window at a time instead of loading the entire array. Dask chunks are
+    first aligned to the internal tiling (or strips) of the output so that
+    each block of the output is written by only one chunk.
+
     Parameters
     ----------
     xarr : xarray.DataArray
@@ -41,6 +61,25 @@ def xarray_to_rasterio(xarr, path, driver=DEFAULT_RASTERIO_DRIVER,
         try to read from ``xarr`` if not provided
     nodata : int or float, optional
         No data value to set
+    lock : bool or Lock, optional
+        Lock used to serialize writes of Dask chunks computed in parallel.
+        By default (or if ``True``), uses a lock suited to the current Dask
+        scheduler (see :py:func:`write_lock`). Passing ``False`` disables
+        locking, which is only safe with a single thread
+    cog : bool, optional
+        Save as a Cloud-Optimized GeoTIFF (COG), with internal tiling
+        matched to the chunks of ``xarr`` (if chunked and ``blocksize`` is
+        not given in ``meta``), compression and a predictor (see
+        :py:data:`COG_DEFAULTS`), and overviews. The output is validated
+        with :py:func:`validate_cog`.
+        ``driver`` is ignored and ``meta`` may contain COG driver
+        creation options (e.g., ``compress``, ``predictor``, or ``level``)
+    overview_resampling : str, optional
+        Resampling method used to build overviews when ``cog=True``
+    overview_factors : Sequence[int], optional
+        Decimation factors of overviews when ``cog=True``. By default,
+        overviews are built by factors of 2 until the overview fits within
+        one tile
     **meta
         Additional keyword arguments to :py:func:`rasterio.open`. Useful for
         specifying block sizes, color interpretation, and other metadata.
@@ -53,20 +92,28 @@ def xarray_to_rasterio(xarr, path, driver=DEFAULT_RASTERIO_DRIVER,
     Raises
     ------
     ValueError
-        Raised if ``xarr`` is not 2D or 3D
+        Raised if ``xarr`` is not 2D or 3D, or if ``cog=True`` and the
+        output is not a valid COG
     """
     if not isinstance(xarr, xr.DataArray):
         raise TypeError('Can only save 2D or 3D ``xarray.DataArray``s to '
                         'rasterio/GDAL datasets')
 
+    if cog:
+        return _xarray_to_cog(xarr, path, crs=crs, transform=transform,
+                              nodata=nodata, lock=lock,
+                              resampling=overview_resampling,
+                              factors=overview_factors, **meta)
+
     xarr, meta_ = _prepare_xarray_for_rasterio(xarr, crs, transform,
                                                driver=driver, **meta)
     dim_band = xarr.dims[0]
 
-    # TODO: support some kind of block writing if chunked (dask array)
     with rasterio.open(str(path), 'w', **meta_) as dst:
-        # Write data
-        dst.write(xarr.values)
+        # Write data, unless writing by window afterward
+        if xarr.chunks is None:
+            dst.write(xarr.values)
+        block_shape = dst.block_shapes[0]
 
         # Write 1st dim ("band") coordinate names as band descriptions
         dst.descriptions = xarr.coords[dim_band].values
@@ -81,9 +128,259 @@ def xarray_to_rasterio(xarr, path, driver=DEFAULT_RASTERIO_DRIVER,
         if nodata is not None:
             dst.nodata = nodata
 
+    if xarr.chunks is not None:
+        data = align_chunks(xarr.data, block_shape)
+        logger.debug(f'Writing {data.npartitions} chunks to "{path}"')
+        if lock is None or lock is True:
+            lock = write_lock(path)
+        da.store(data, RasterioWindowWriter(path), lock=lock)
+
+    return Path(path)
+
+
+def _xarray_to_cog(xarr, path, resampling='average', factors=None,
+                   **kwds):
+    # Options that are for COG driver
+    opts_user = {k: kwds.pop(k) for k in list(kwds)
+                 if k not in ('crs', 'transform', 'nodata', 'lock')}
+    opts = dict(COG_DEFAULTS, **opts_user)
+    if xarr.chunks and 'blocksize' not in opts_user:
+        opts['blocksize'] = cog_blocksize(xarr.chunks[-2:])
+    blocksize = opts['blocksize']
+
+    # Write data to tiled GeoTIFF, build overviews, then copy to COG layout
+    tmp = f'{path}.tmp.tif'
+    try:
+        xarray_to_rasterio(xarr, tmp, driver='GTiff', tiled=True,
+                           blockxsize=blocksize, blockysize=blocksize,
+                           **kwds)
+        with rasterio.open(tmp, 'r+') as dst:
+            if factors is None:
+                factors = overview_factors(dst.shape, blocksize)
+            if factors:
+                dst.build_overviews(list(factors), Resampling[resampling])
+                dst.update_tags(ns='rio_overview', resampling=resampling)
+        rasterio.shutil.copy(tmp, str(path), driver='COG',
+                             overviews='FORCE_USE_EXISTING',
+                             resampling=resampling, **opts)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    errors = validate_cog(path)
+    if errors:
+        raise ValueError(f'Output "{path}" is not a valid COG: '
+                         f'{"; ".join(errors)}')
     return Path(path)
 
 
+def cog_blocksize(chunks, minimum=64, maximum=2048):
+    """ Return a COG tile size matching chunks
+
+    Parameters
+    ----------
+    chunks : tuple[tuple[int]]
+        Chunks along the y and x dimensions
+    minimum : int, optional
+        Smallest tile size
+    maximum : int, optional
+        Largest tile size
+
+    Returns
+    -------
+    int
+        Largest power of 2 tile size that fits within the chunk sizes
+        (within ``minimum`` and ``maximum``)
+    """
+    size = min(c[0] for c in chunks)
+    blocksize = 2 ** int(np.floor(np.log2(max(size, 1))))
+    return int(min(max(blocksize, minimum), maximum))
+
+
+def overview_factors(shape, blocksize):
+    """ Return overview factors by 2 until the overview fits in one tile
+
+    Parameters
+    ----------
+    shape : tuple[int, int]
+        Shape of raster
+    blocksize : int
+        Tile size
+
+    Returns
+    -------
+    list[int]
+        Overview decimation factors (e.g., ``[2, 4, 8]``)
+    """
+    factors = []
+    factor = 2
+    while max(shape) / (factor // 2) > blocksize:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+def validate_cog(path):
+    """ Check if a file is a Cloud-Optimized GeoTIFF
+
+    Parameters
+    ----------
+    path : str or Path
+        Raster file
+
+    Returns
+    -------
+    list[str]
+        Descriptions of problems found (empty if valid)
+    """
+    errors = []
+    with rasterio.open(str(path), 'r') as src:
+        if src.driver != 'GTiff':
+            errors.append(f'Driver is "{src.driver}", not "GTiff"')
+        layout = src.tags(ns='IMAGE_STRUCTURE').get('LAYOUT')
+        if layout != 'COG':
+            errors.append(f'Layout is "{layout}", not "COG"')
+        block_shape = src.block_shapes[0]
+        if max(src.shape) > 512 and block_shape[1] == src.width:
+            errors.append('Not internally tiled')
+        if (max(src.shape) > min(block_shape) and
+                not src.overviews(1)):
+            errors.append('Missing overviews')
+    return errors
+
+
+def write_lock(path):
+    """ Return a lock to serialize writes to a raster for the Dask scheduler
+
+    Writers (:py:class:`RasterioWindowWriter`) open the raster for each
+    write, so concurrent writes must be serialized across every thread and
+    process writing to the raster.
+
+    Parameters
+    ----------
+    path : str or Path
+        Raster being written to
+
+    Returns
+    -------
+    Lock
+        A :py:class:`distributed.Lock`, named for the raster, if using the
+        distributed scheduler. Otherwise, a
+        :py:class:`dask.utils.SerializableLock`
+
+    Raises
+    ------
+    ValueError
+        Raised if using the "processes" scheduler, which cannot share a lock
+        across processes
+    """
+    import dask
+    from dask.utils import SerializableLock
+
+    scheduler = dask.config.get('scheduler', None)
+    if scheduler in ('dask.distributed', 'distributed', ):
+        import distributed
+        name = f'stems-rasterio-{Path(path).absolute()}'
+        return distributed.Lock(name)
+    elif scheduler in ('processes', 'multiprocessing', ):
+        raise ValueError('Cannot serialize writes to a raster across '
+                         'processes with the "processes" scheduler. Use '
+                         'the "threads" or distributed scheduler, or pass '
+                         'a lock shared across processes')
+    return SerializableLock()
+
+
+class RasterioWindowWriter(object):
+    """ Write array blocks to windows of an existing raster
+
+    Can be used as a target for :py:func:`dask.array.store`. The raster is
+    opened for each write, so writers can be sent to other processes, but
+    writes must be serialized using a lock shared by all writers (see
+    :py:func:`write_lock`).
+
+    Parameters
+    ----------
+    path : str or Path
+        Existing raster, opened in "r+" mode for each write
+    """
+    def __init__(self, path):
+        self.path = str(path)
+
+    def __setitem__(self, key, value):
+        # Dask gives slices with explicit start and stop
+        band, row, col = key
+        window = Window.from_slices((row.start, row.stop),
+                                    (col.start, col.stop))
+        indexes = list(range(band.start + 1, band.stop + 1))
+        with rasterio.open(self.path, 'r+') as dst:
+            dst.write(value, indexes=indexes, window=window)
+
+
+class RasterioWindowReader(object):
+    """ Read array blocks from windows of an existing raster
+
+    Can be used as a source for :py:func:`dask.array.from_array`. The raster
+    is opened for each read, so readers can be sent to other processes.
+
+    Parameters
+    ----------
+    path : str or Path
+        Existing raster, opened in "r" mode for each read
+    """
+    def __init__(self, path):
+        self.path = str(path)
+        with rasterio.open(self.path, 'r') as src:
+            self.shape = (src.count, src.height, src.width)
+            self.dtype = np.dtype(src.dtypes[0])
+        self.ndim = len(self.shape)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key, )
+        key = key + (slice(None), ) * (self.ndim - len(key))
+        if not all(isinstance(k, slice) and k.step in (None, 1)
+                   for k in key):
+            raise IndexError('Can only read contiguous slices of a raster')
+        band, row, col = [range(*k.indices(n))
+                          for k, n in zip(key, self.shape)]
+        window = Window(col.start, row.start, len(col), len(row))
+        indexes = [i + 1 for i in band]
+        if not indexes or not len(row) or not len(col):
+            return np.empty((len(band), len(row), len(col)), dtype=self.dtype)
+        with rasterio.open(self.path, 'r') as src:
+            return src.read(indexes=indexes, window=window)
+
+
+def align_chunks(data, block_shape):
+    """ Rechunk an array so chunks are multiples of raster blocks
+
+    Parameters
+    ----------
+    data : dask.array.Array
+        3D ``(band, y, x)`` array
+    block_shape : tuple[int, int]
+        Block (tile or strip) shape of the raster as ``(rows, columns)``
+
+    Returns
+    -------
+    dask.array.Array
+        Rechunked array (or ``data`` if already aligned)
+    """
+    chunks = [data.chunks[0]]
+    for dim_chunks, block, size in zip(data.chunks[1:], block_shape,
+                                       data.shape[1:]):
+        if all(c % block == 0 for c in dim_chunks[:-1]):
+            chunks.append(dim_chunks)
+        else:
+            csize = max(block, dim_chunks[0] // block * block)
+            chunks.append(min(csize, size))
+    chunks = tuple(chunks)
+    if chunks != data.chunks:
+        logger.debug(f'Rechunking to align with raster blocks {block_shape}')
+        data = data.rechunk(chunks)
+    return data
+
+
 def _prepare_xarray_for_rasterio(xarr, crs=None, transform=None,
                                  dim_y=None, dim_x=None, dim_band=None,
                                  **meta):
@@ -73,6 +73,96 @@ def test_read_chunks_rasterio(tmpdir, chunks):
     assert test == {'y': chunks['y'], 'x': 49}
 
 
+# ----------------------------------------------------------------------------
+# read_chunks_zarr
+@pytest.mark.parametrize('zarr_format', (2, 3, ))
+@pytest.mark.parametrize('chunks', TEST_PARAMS_CHUNKS)
+def test_read_chunks_zarr(tmpdir, chunks, zarr_format):
+    pytest.importorskip('zarr')
+    data_vars = list('bgrn')
+    ds = build_data.create_test_dataset(data_vars=data_vars,
+                                        chunk_x=chunks['x'],
+                                        chunk_y=chunks['y'],
+                                        chunk_time=chunks['time'])
+    dst = str(tmpdir.join('test.zarr'))
+    ds.to_zarr(dst, zarr_format=zarr_format)
+
+    test = chunk.read_chunks(dst)
+    for dv in data_vars:
+        assert dict(test[dv]) == chunks
+    assert chunk.auto_determine_chunks(dst) == chunks
+
+
+# ----------------------------------------------------------------------------
+# read_chunks_h5py
+@pytest.mark.parametrize('chunks', TEST_PARAMS_CHUNKS)
+def test_read_chunks_h5py(tmpdir, chunks):
+    pytest.importorskip('h5py')
+    data_vars = list('bgrn')
+    dst = str(tmpdir.join('test.h5'))
+    dst_ = build_data.create_test_netcdf4(dst=dst,
+                                          data_vars=data_vars,
+                                          chunk_x=chunks['x'],
+                                          chunk_y=chunks['y'],
+                                          chunk_time=chunks['time'])
+    test = chunk.read_chunks(dst_, variables=data_vars)
+    assert list(test) == data_vars
+    for dv in data_vars:
+        assert test[dv] == chunks
+
+
+# ----------------------------------------------------------------------------
+# Chunk reader registry
+def test_read_chunks_rasterio_bands(tmpdir):
+    dst = str(tmpdir.join('test.tif'))
+    dst_, meta, info = build_data.create_test_raster(dst, height=99,
+                                                     width=49, blockysize=10,
+                                                     blockxsize=49)
+    # Multi-band GeoTIFFs are pixel interleaved by default
+    test = chunk.read_chunks(dst_)
+    assert test == {'band_data': {'band': 4, 'y': 10, 'x': 49}}
+    assert chunk.auto_determine_chunks(dst_) == {'band': 4, 'y': 10, 'x': 49}
+
+    import rasterio
+    dst = str(tmpdir.join('test_band.tif'))
+    meta.update(interleave='band')
+    with rasterio.open(dst, 'w', **meta) as riods:
+        riods.write(info['dat'])
+    test = chunk.read_chunks(dst)
+    assert test == {'band_data': {'band': 1, 'y': 10, 'x': 49}}
+
+
+@pytest.mark.parametrize(('filename', 'first', ), [
+    ('test.nc', 'netcdf4', ),
+    ('test.TIF', 'rasterio', ),
+    ('test.zarr/', 'zarr', ),
+    ('test.h5', 'h5py', ),
+    ('test.unknown', 'netcdf4', ),
+])
+def test_guess_chunk_readers(filename, first):
+    test = chunk.guess_chunk_readers(filename)
+    assert test[0] == first
+    assert set(test) == set(chunk.CHUNK_READERS)
+
+
+def test_register_chunk_reader(monkeypatch, tmpdir):
+    monkeypatch.setattr(chunk, 'CHUNK_READERS',
+                        OrderedDict(chunk.CHUNK_READERS))
+    monkeypatch.setattr(chunk, 'CHUNK_READER_EXTENSIONS',
+                        dict(chunk.CHUNK_READER_EXTENSIONS))
+
+    def read_chunks_test(filename, variables=None):
+        return {'test': {'x': 5}}
+
+    chunk.register_chunk_reader('test', read_chunks_test, ('.test', ))
+    dst = str(tmpdir.join('data.test'))
+    assert chunk.guess_chunk_readers(dst)[0] == 'test'
+    assert chunk.read_chunks(dst) == {'test': {'x': 5}}
+    assert chunk.read_chunks(dst, reader='test') == {'test': {'x': 5}}
+    with pytest.raises(ValueError, match=r'Could not determine chunks'):
+        chunk.read_chunks(dst, reader='netcdf4')
+
+
 # ----------------------------------------------------------------------------
 # best_chunksizes
 def test_best_chunksizes_1():
@@ -109,6 +199,43 @@ def test_best_chunksizes_3():
     assert best == {'x': 10, 'y': 10, 'time': 10}
 
 
+# ----------------------------------------------------------------------------
+# budget_chunksizes
+SIZES = OrderedDict((('time', 1000), ('y', 5000), ('x', 5000)))
+DISK = {'time': 1, 'y': 250, 'x': 250}
+
+
+@pytest.mark.parametrize(('dtype', 'budget', 'pattern', 'ans', ), [
+    ('int16', '64MB', 'time-series', (512, 250, 250), ),
+    ('int16', '1GB', 'time-series', (1000, 1000, 500), ),
+    ('int16', '64MB', 'spatial-map', (1, 5000, 5000), ),
+    ('float64', '64MB', 'spatial-map', (1, 2750, 2750), ),
+    ('int16', 1, 'time-series', (1, 250, 250), ),
+    ('int16', '1TB', 'spatial-map', (1000, 5000, 5000), ),
+])
+def test_budget_chunksizes(dtype, budget, pattern, ans):
+    test = chunk.budget_chunksizes(SIZES, dtype, DISK, budget=budget,
+                                   pattern=pattern)
+    assert tuple(test.values()) == ans
+    for dim, size in test.items():
+        assert size % DISK[dim] == 0 or size == SIZES[dim]
+
+
+def test_budget_chunksizes_error():
+    with pytest.raises(ValueError, match=r'Unknown access pattern'):
+        chunk.budget_chunksizes(SIZES, 'int16', DISK, pattern='random')
+
+
+def test_auto_determine_chunks_budget(tmpdir):
+    dst = build_data.create_test_netcdf4(dst=str(tmpdir.join('test.nc')),
+                                         chunk_y=3, chunk_x=5, chunk_time=25)
+    test = chunk.auto_determine_chunks(dst, budget=25 * 3 * 5 * 2 * 3,
+                                       pattern='time-series')
+    assert test == {'time': 75, 'y': 3, 'x': 5}
+    test = chunk.auto_determine_chunks(dst, budget='1GB')
+    assert test == {'time': 100, 'y': 7, 'x': 11}
+
+
 # ----------------------------------------------------------------------------
 # get_chunksizes
 @pytest.mark.parametrize('chunks', (
@@ -203,3 +330,14 @@ def test_chunks_to_chunksizes_none():
 def test_chunks_to_chunksizes_TypeError(test):
     with pytest.raises(TypeError, match=r'Unknown type.*'):
         chunk.chunks_to_chunksizes(test)
+
+
+# ----------------------------------------------------------------------------
+# chunk_indices
+def test_chunk_indices():
+    chunks, index = chunk.chunk_indices((3, 3, 3, 1), [0, 2, 3, 8, 9])
+    np.testing.assert_equal(chunks, [0, 0, 1, 2, 3])
+    np.testing.assert_equal(index, [0, 2, 0, 2, 0])
+
+    with pytest.raises(IndexError, match=r'outside of dimension'):
+        chunk.chunk_indices((3, 3, 3, 1), [10])
@@ -161,3 +161,188 @@ def test_guard_dtype():
     xarr = xr.DataArray(np.ones(5, ).astype(dtype))
     ans = encoding.guard_dtype(xarr, {'dtype': xarr.dtype})
     assert ans == {}
+
+
+# ----------------------------------------------------------------------------
+# plan_chunksizes / read_amplification
+def _xarr_time_yx(nt=1000, ny=5000, nx=5000, dtype='int16'):
+    data = da.zeros((nt, ny, nx), dtype=dtype, chunks=(nt, 1000, 1000))
+    return xr.DataArray(data, dims=('time', 'y', 'x'), name='test')
+
+
+@pytest.mark.parametrize(('pattern', 'ans', ), [
+    ('time-series', (1000, 92, 91), ),
+    ('spatial-map', (1, 2896, 2896), ),
+])
+def test_plan_chunksizes(pattern, ans):
+    xarr = _xarr_time_yx()
+    test = encoding.plan_chunksizes(xarr, pattern=pattern)
+    assert test == ans
+    nbytes = np.prod(test) * xarr.dtype.itemsize
+    assert nbytes <= encoding.DEFAULT_CHUNK_CACHE_SIZE
+
+
+def test_read_amplification():
+    xarr = _xarr_time_yx(nt=100, ny=10, nx=10)
+    # Perfect
+    assert encoding.read_amplification(xarr, (100, 1, 1)) == 1
+    assert encoding.read_amplification(xarr, (1, 10, 10),
+                                       pattern='spatial-map') == 1
+    # Chunk cache holds the chunk read, so it's reused for neighbors
+    assert encoding.read_amplification(xarr, (100, 5, 5)) == 1
+    # ... unless it doesn't fit
+    test = encoding.read_amplification(xarr, (100, 5, 5), chunk_cache=0)
+    assert test == 25
+    test = encoding.read_amplification(xarr, (100, 5, 5),
+                                       pattern='spatial-map', chunk_cache=0)
+    assert test == 100
+    # Padding from chunks that don't divide evenly
+    test = encoding.read_amplification(xarr, (30, 1, 1))
+    assert test == 1.2
+
+
+def test_netcdf_encoding_pattern(tmpdir):
+    xarr = _xarr_time_yx(nt=100, ny=10, nx=10)
+    enc = encoding.netcdf_encoding(xarr, chunks='time-series')
+    assert enc['test']['chunksizes'] == (100, 10, 10)
+    enc = encoding.netcdf_encoding(xarr, chunks=(10, 5, 5))
+    assert enc['test']['chunksizes'] == (10, 5, 5)
+
+    with pytest.raises(ValueError, match=r'Unknown access pattern'):
+        encoding.read_amplification(xarr, (1, 1, 1), pattern='random')
+
+
+# ----------------------------------------------------------------------------
+# Compression benchmarking
+def _xarr_compressible():
+    data = np.tile(np.arange(100, dtype='float32'), (10, 10, 1))
+    data = da.from_array(data, chunks=(5, 5, 50))
+    return xr.DataArray(data, dims=('time', 'y', 'x'), name='test')
+
+
+def test_benchmark_compression():
+    xarr = _xarr_compressible()
+    test = encoding.benchmark_compression(xarr, n_chunks=2)
+    assert len(test) == len(encoding.COMPRESSION_CANDIDATES)
+    for result in test:
+        assert result['encode_speed'] > 0 and result['decode_speed'] > 0
+        if result['encoding']['zlib']:
+            assert result['ratio'] < 1
+        else:
+            assert result['ratio'] == 1
+
+    packed = encoding.benchmark_compression(xarr, n_chunks=2, pack=True)
+    assert len(packed) == 2 * len(encoding.COMPRESSION_CANDIDATES)
+    assert packed[-1]['encoding']['dtype'] == np.dtype('int8')
+    assert packed[-1]['ratio'] == 0.25
+
+
+def test_select_compression():
+    xarr = _xarr_compressible()
+    # Smallest
+    enc, results = encoding.select_compression(xarr)
+    assert enc['zlib'] is True
+    assert enc['shuffle'] is True
+    # Anything is fast enough for uncompressed
+    enc, results = encoding.select_compression(xarr, max_ratio=1.)
+    assert enc['zlib'] is False
+    # Impossible
+    enc, results = encoding.select_compression(xarr, max_ratio=0.)
+    assert enc == min(results, key=lambda r: r['ratio'])['encoding']
+
+
+@pytest.mark.parametrize(('data', 'ans', ), [
+    (np.array([0., 1., 255.]), {'dtype': np.dtype('uint8')}),
+    (np.array([-1., 1., 255.]), {'dtype': np.dtype('int16')}),
+    (np.array([0., np.nan, 100.]), {'dtype': np.dtype('int8'),
+                                    '_FillValue': -128}),
+    (np.array([0, 70000], dtype='int64'), {'dtype': np.dtype('int32')}),
+    (np.array([0., 0.5]), None),
+    (np.array([0., np.inf]), None),
+    (np.array(['a']), None),
+])
+def test_lossless_dtype(data, ans):
+    assert encoding.lossless_dtype(data) == ans
+    xarr = xr.DataArray(da.from_array(data, chunks=1))
+    assert encoding.lossless_dtype(xarr) == ans
+
+
+def test_benchmark_compression_pack_unsampled():
+    # Values outside of the sampled chunks must still fit
+    xarr = _xarr_compressible()
+    xarr[5, 5, 75] = 1000.
+    packed = encoding.benchmark_compression(xarr, n_chunks=2, pack=True)
+    assert packed[-1]['encoding']['dtype'] == np.dtype('int16')
+
+    xarr[5, 5, 75] = 0.5
+    packed = encoding.benchmark_compression(xarr, n_chunks=2, pack=True)
+    assert len(packed) == len(encoding.COMPRESSION_CANDIDATES)
+
+
+def test_netcdf_encoding_auto(tmpdir):
+    xarr = _xarr_compressible()
+    enc = encoding.netcdf_encoding(xarr, zlib='auto', max_ratio=1.)
+    assert enc['test']['zlib'] is False
+    enc = encoding.netcdf_encoding(xarr.to_dataset(), zlib='auto')
+    assert enc['test']['zlib'] is True
+    assert enc['test']['dtype'] == np.dtype('int8')
+    xarr.to_netcdf(str(tmpdir.join('test.nc')), encoding=enc)
+    with xr.open_dataarray(str(tmpdir.join('test.nc'))) as test:
+        xr.testing.assert_equal(test, xarr)
+
+    # Don't pack if user gives a NoDataValue
+    enc = encoding.netcdf_encoding(xarr, nodata=-9999., zlib='auto')
+    assert enc['test']['dtype'] == np.dtype('float32')
+    assert enc['test']['_FillValue'] == -9999.
+
+
+# ----------------------------------------------------------------------------
+# packing_encoding
+def test_packing_encoding_dataarray(tmpdir):
+    data = np.linspace(0, 1, 1001, dtype='float32')
+    data[5] = np.nan
+    xarr = xr.DataArray(da.from_array(data, chunks=100), dims=('x', ),
+                        name='red')
+
+    enc = encoding.packing_encoding(xarr, precision=1e-4)
+    assert enc['red']['dtype'] == np.dtype('int16')
+    assert enc['red']['add_offset'] == 0
+    assert enc['red']['_FillValue'] == -32768
+    assert enc['red']['scale_factor'].dtype == np.dtype('float32')
+
+    dst = str(tmpdir.join('test.nc'))
+    xarr.to_netcdf(dst, encoding=enc)
+    with xr.open_dataarray(dst) as test:
+        np.testing.assert_allclose(test.values, data, atol=1e-4)
+        assert np.isnan(test.values[5])
+
+
+@pytest.mark.parametrize(('kwds', 'ans', ), [
+    ({'precision': 1}, ('int8', 1, 0, ), ),
+    ({'precision': 0.1}, ('int16', 0.1, 0, ), ),
+    ({'precision': 1e-3}, ('int32', 1e-3, 0, ), ),
+    ({'precision': 1, 'value_range': (1000, 1200)}, ('int8', 1, 1127, ), ),
+    ({'significant_digits': 2}, ('int8', 10, 0, ), ),
+    ({'significant_digits': 4}, ('int16', 0.1, 0, ), ),
+])
+def test_packing_encoding_dataset(kwds, ans):
+    ds = xr.Dataset({
+        'a': ('x', np.array([-100., 0., 100.])),
+        'qa': ('x', np.array([1, 2, 3])),
+    })
+    enc = encoding.packing_encoding(ds, **kwds)
+    assert list(enc) == ['a']
+    dtype, scale, offset = ans
+    assert enc['a']['dtype'] == np.dtype(dtype)
+    np.testing.assert_allclose(enc['a']['scale_factor'], scale)
+    np.testing.assert_allclose(enc['a']['add_offset'], offset)
+
+
+def test_packing_encoding_error():
+    xarr = xr.DataArray(np.array([0., 1e6]), dims=('x', ), name='big')
+    with pytest.raises(ValueError, match=r'Must provide either'):
+        encoding.packing_encoding(xarr)
+    with pytest.raises(ValueError, match=r'Cannot pack'):
+        encoding.packing_encoding(xarr, precision=1e-6)
+    with pytest.raises(ValueError, match=r'Cannot pack'):
+        encoding.packing_encoding(xarr, precision=1, dtype='int16')
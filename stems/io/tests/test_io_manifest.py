@@ -0,0 +1,130 @@
+""" Tests for :py:mod:`stems.io.manifest`
+"""
+import os
+
+import pytest
+import xarray as xr
+
+from stems.io import manifest, xarray_
+from stems.tests import build_data
+
+
+@pytest.fixture
+def netcdf_stack(tmpdir):
+    ds = build_data.create_test_dataset()
+    n = ds.sizes['time'] // 2
+    dsts = [str(tmpdir.join('ds_1.nc')), str(tmpdir.join('ds_2.nc'))]
+    ds.isel(time=slice(None, n)).to_netcdf(dsts[0])
+    ds.isel(time=slice(n, None)).to_netcdf(dsts[1])
+    return ds, dsts
+
+
+def test_build_open_manifest(tmpdir, netcdf_stack):
+    ds, dsts = netcdf_stack
+    dst = str(tmpdir.join('manifest.json'))
+    info = manifest.build_manifest(dsts, 'time', dst=dst)
+    assert os.path.exists(dst)
+    assert [f['path'] for f in info['files']] == dsts
+    assert set(info['variables']) == set(ds.data_vars)
+
+    test = manifest.open_manifest(dst, chunks={'time': 10})
+    assert test.chunks['time'][0] == 10
+    xr.testing.assert_identical(test.load(), ds)
+
+
+def test_build_manifest_cftime(tmpdir):
+    pytest.importorskip('cftime')
+    time = xr.date_range('2000-01-01', periods=3, calendar='noleap',
+                         use_cftime=True)
+    ds = xr.Dataset({'a': ('time', [1, 2, 3])}, coords={'time': time})
+    dst = str(tmpdir.join('ds.nc'))
+    ds.to_netcdf(dst)
+    with pytest.raises(ValueError, match=r'coordinate "time".*cftime'):
+        manifest.build_manifest([dst], 'time')
+
+
+def test_read_manifest_stale(tmpdir, netcdf_stack):
+    ds, dsts = netcdf_stack
+    dst = str(tmpdir.join('manifest.json'))
+    manifest.build_manifest(dsts, 'time', dst=dst)
+    manifest.read_manifest(dst)
+
+    stat = os.stat(dsts[1])
+    os.utime(dsts[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    with pytest.raises(manifest.StaleManifestError, match=r'modified'):
+        manifest.read_manifest(dst)
+    manifest.read_manifest(dst, check=False)
+
+    os.remove(dsts[1])
+    with pytest.raises(manifest.StaleManifestError, match=r'missing'):
+        manifest.read_manifest(dst)
+
+
+def test_read_manifest_paths(tmpdir, netcdf_stack):
+    ds, dsts = netcdf_stack
+    dst = str(tmpdir.join('manifest.json'))
+    manifest.build_manifest(dsts, 'time', dst=dst)
+    manifest.read_manifest(dst, paths=dsts)
+    with pytest.raises(manifest.StaleManifestError, match=r'requested'):
+        manifest.read_manifest(dst, paths=dsts[:1])
+
+
+def test_open_manifest_chunks(tmpdir, netcdf_stack):
+    ds, dsts = netcdf_stack
+    info = manifest.build_manifest(dsts, 'time')
+    test_1 = manifest.open_manifest(info, chunks={'time': 2})
+    test_2 = manifest.open_manifest(info, chunks={'time': 3})
+    name = list(ds.data_vars)[0]
+    keys_1 = set(test_1[name].data.__dask_graph__())
+    keys_2 = set(test_2[name].data.__dask_graph__())
+    assert not keys_1 & keys_2
+    assert test_1[name].data.name == \
+        manifest.open_manifest(info, chunks={'time': 2})[name].data.name
+
+
+def test_open_manifest_file_cache(monkeypatch, netcdf_stack):
+    ds, dsts = netcdf_stack
+    calls = []
+    open_dataset = xr.open_dataset
+
+    def _open_dataset(path, **kwds):
+        calls.append(path)
+        return open_dataset(path, **kwds)
+
+    info = manifest.build_manifest(dsts, 'time')
+    manifest._open_file.cache_clear()
+    monkeypatch.setattr(manifest.xr, 'open_dataset', _open_dataset)
+    test = manifest.open_manifest(info, chunks={'time': 1})
+    xr.testing.assert_equal(test.load(), ds)
+    assert sorted(calls) == sorted(str(os.path.abspath(d)) for d in dsts)
+    manifest._open_file.cache_clear()
+
+
+def test_open_dataset_manifest(tmpdir, netcdf_stack):
+    ds, dsts = netcdf_stack
+    dst = str(tmpdir.join('manifest.json'))
+    pattern = str(tmpdir.join('ds_*.nc'))
+
+    # Build
+    test = xarray_.open_dataset(pattern, concat_dim='time', manifest=dst)
+    xr.testing.assert_equal(test.load(), ds)
+    mtime = os.stat(dst).st_mtime_ns
+
+    # Reuse
+    test = xarray_.open_dataset(pattern, concat_dim='time', manifest=dst)
+    xr.testing.assert_equal(test.load(), ds)
+    assert os.stat(dst).st_mtime_ns == mtime
+
+    # Rebuild
+    ds2 = ds.isel(time=slice(ds.sizes['time'] // 2, None)) + 1
+    ds2.attrs = ds.attrs
+    os.remove(dsts[1])
+    ds2.to_netcdf(dsts[1])
+    test = xarray_.open_dataset(pattern, concat_dim='time', manifest=dst)
+    xr.testing.assert_equal(test.isel(time=slice(-1, None)).load(),
+                            ds2.isel(time=slice(-1, None)))
+
+    # Rebuild if files requested differ
+    test = xarray_.open_dataset(dsts[:1], concat_dim='time', manifest=dst)
+    xr.testing.assert_equal(test.load(),
+                            ds.isel(time=slice(None, ds.sizes['time'] // 2)))
@@ -66,3 +66,121 @@ def _test_rasterio_xarray(xarr, crs, transform, filename):
         # Test data (prefer 2D if shape[0]=1
         data = src.read().squeeze()
         np.testing.assert_equal(data, xarr.values)
+
+
+@pytest.mark.parametrize(('chunks', 'meta', ), [
+    ((1, 3, 5), {}),
+    ((2, 20, 20), {'tiled': True, 'blockxsize': 16, 'blockysize': 16}),
+    ((4, 50, 7), {'tiled': True, 'blockxsize': 32, 'blockysize': 16}),
+])
+def test_xarray_to_rasterio_dask(tmpdir, chunks, meta):
+    transform = EXAMPLE_TRANSFORM[0]
+    crs = CRS.from_epsg(32619)
+    ds = build_data.create_test_dataset(crs=crs, transform=transform,
+                                        ntime=1, ny=50, nx=70)
+    img = ds.squeeze().to_array(dim='band').chunk(dict(zip(
+        ('band', 'y', 'x'), chunks)))
+
+    dest = str(tmpdir.join('test.gtif'))
+    dest_ = rasterio_.xarray_to_rasterio(img, dest, **meta)
+    _test_rasterio_xarray(img, crs, transform, dest_)
+
+
+def test_xarray_to_rasterio_distributed(tmpdir):
+    distributed = pytest.importorskip('distributed')
+    transform = EXAMPLE_TRANSFORM[0]
+    crs = CRS.from_epsg(32619)
+    ds = build_data.create_test_dataset(crs=crs, transform=transform,
+                                        ntime=1, ny=50, nx=70)
+    img = ds.squeeze().to_array(dim='band').chunk({'y': 16, 'x': 16})
+
+    dest = str(tmpdir.join('test.gtif'))
+    with distributed.Client(n_workers=2, threads_per_worker=2,
+                            processes=False):
+        assert isinstance(rasterio_.write_lock(dest), distributed.Lock)
+        dest_ = rasterio_.xarray_to_rasterio(img, dest, tiled=True,
+                                             blockxsize=16, blockysize=16)
+    _test_rasterio_xarray(img, crs, transform, dest_)
+
+
+def test_write_lock(tmpdir):
+    import dask
+    from dask.utils import SerializableLock
+    dest = str(tmpdir.join('test.gtif'))
+    with dask.config.set(scheduler='threads'):
+        assert isinstance(rasterio_.write_lock(dest), SerializableLock)
+    with dask.config.set(scheduler='processes'):
+        with pytest.raises(ValueError, match=r'"processes" scheduler'):
+            rasterio_.write_lock(dest)
+
+
+@pytest.mark.parametrize(('chunks', 'block_shape', 'ans', ), [
+    (((1, 1), (16, 16, 2), (20, 14)), (16, 16),
+     ((1, 1), (16, 16, 2), (16, 16, 2)), ),
+    (((2, ), (10, 10, 10, 4), (34, )), (1, 34),
+     ((2, ), (10, 10, 10, 4), (34, )), ),
+    (((2, ), (5, 5, 5, 5), (34, )), (8, 34),
+     ((2, ), (8, 8, 4), (34, )), ),
+])
+def test_align_chunks(chunks, block_shape, ans):
+    import dask.array as da
+    shape = tuple(sum(c) for c in chunks)
+    data = da.zeros(shape, chunks=chunks)
+    test = rasterio_.align_chunks(data, block_shape)
+    assert test.chunks == ans
+
+
+# =============================================================================
+# Cloud-Optimized GeoTIFF
+@pytest.mark.parametrize(('chunks', 'meta', 'blocksize', ), [
+    (None, {}, 512, ),
+    (None, {'blocksize': 64}, 64, ),
+    ((1, 64, 64), {}, 64, ),
+    ((1, 64, 64), {'blocksize': 128}, 128, ),
+])
+def test_xarray_to_rasterio_cog(tmpdir, chunks, meta, blocksize):
+    transform = EXAMPLE_TRANSFORM[0]
+    crs = CRS.from_epsg(32619)
+    ds = build_data.create_test_dataset(crs=crs, transform=transform,
+                                        ntime=1, ny=150, nx=200,
+                                        chunk_y=150, chunk_x=200,
+                                        dtype='float32')
+    img = ds.squeeze().to_array(dim='band')
+    if chunks:
+        img = img.chunk(dict(zip(('band', 'y', 'x'), chunks)))
+    else:
+        img = img.load()
+
+    dest = str(tmpdir.join('test.tif'))
+    dest_ = rasterio_.xarray_to_rasterio(img, dest, cog=True,
+                                         overview_resampling='nearest',
+                                         **meta)
+    _test_rasterio_xarray(img, crs, transform, dest_)
+    assert rasterio_.validate_cog(dest_) == []
+    assert not tmpdir.join('test.tif.tmp.tif').exists()
+
+    with rasterio.open(str(dest_)) as src:
+        assert src.block_shapes[0] == (blocksize, blocksize)
+        assert src.overviews(1) == rasterio_.overview_factors(src.shape,
+                                                              blocksize)
+        assert src.compression.name.lower() == 'deflate'
+
+
+def test_validate_cog(tmpdir):
+    dest = str(tmpdir.join('test.tif'))
+    dest_, meta, info = build_data.create_test_raster(dest, height=1000,
+                                                      width=1000)
+    errors = rasterio_.validate_cog(dest_)
+    assert any('Layout' in e for e in errors)
+    assert 'Missing overviews' in errors
+
+
+@pytest.mark.parametrize(('chunks', 'ans', ), [
+    (((256, 256), (256, 256)), 256, ),
+    (((300, 300), (256, 256)), 256, ),
+    (((1000, 24), (1000, )), 512, ),
+    (((10, ), (10, )), 64, ),
+    (((8192, ), (8192, )), 2048, ),
+])
+def test_cog_blocksize(chunks, ans):
+    assert rasterio_.cog_blocksize(chunks) == ans
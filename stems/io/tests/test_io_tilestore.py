@@ -0,0 +1,152 @@
+""" Tests for :py:mod:`stems.io.tilestore`
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from stems.gis import conventions, grids
+from stems.io import tilestore
+
+pytest.importorskip('zarr')
+
+
+@pytest.fixture
+def grid():
+    return grids.TileGrid(ul=(300000., 4500000.), crs='epsg:32619',
+                          res=(30., 30.), size=(20, 10),
+                          limits=((0, 20), (0, 20)))
+
+
+def tile_data(tile, ntime=4, start='2000-01-01'):
+    y, x = tile.coords()
+    time = pd.date_range(start, periods=ntime, freq='D')
+    shape = (ntime, tile.height, tile.width)
+    data = np.random.randint(0, 1000, size=shape).astype(np.int16)
+    ds = xr.Dataset(
+        {'blue': (('time', 'y', 'x'), data),
+         'red': (('time', 'y', 'x'), data + 1)},
+        coords={'time': time, 'y': y, 'x': x}
+    )
+    return conventions.georeference(ds, tile.crs, tile.transform,
+                                    lightweight=True)
+
+
+@pytest.mark.parametrize(('index', 'key'), [
+    ((9, 3), 'h003v009'),
+    ((0, 12), 'h012v000'),
+])
+def test_tile_key(grid, index, key):
+    assert tilestore.tile_key(grid[index]) == key
+    assert tilestore.tile_key(index) == key
+    assert tilestore.tile_key(key) == key
+
+
+def test_tile_chunksizes(grid):
+    tile = grid[0, 0]
+    assert tilestore.tile_chunksizes(tile) == {'y': 10, 'x': 20}
+    assert tilestore.tile_chunksizes(tile, {'time': 5, 'y': 4, 'x': 7}) == \
+        {'time': 5, 'y': 2, 'x': 5}
+
+
+def test_write_open_tile(tmpdir, grid):
+    store = str(tmpdir.join('tiles.zarr'))
+    tiles = [grid[0, 0], grid[1, 2]]
+    data = [tile_data(tile) for tile in tiles]
+    for tile, ds in zip(tiles, data):
+        tilestore.write_tile(ds, store, tile, chunks={'time': 2, 'x': 10},
+                             grid=grid)
+
+    assert tilestore.list_tiles(store) == ['h000v000', 'h002v001']
+    assert tilestore.read_tile_grid(store).to_dict() == grid.to_dict()
+
+    test = tilestore.open_tile(store, (1, 2))
+    xr.testing.assert_equal(test, data[1])
+    assert test['blue'].data.chunks == ((2, 2), (10, ), (10, 10))
+    assert test.stems.transform == tiles[1].transform
+
+    test = tilestore.open_tiles(store, tiles)
+    assert list(test) == ['h000v000', 'h002v001']
+
+    with pytest.raises(KeyError, match=r'Tile "h004v004" is not in store'):
+        tilestore.open_tile(store, (4, 4))
+
+    # Already exists
+    with pytest.raises(Exception):
+        tilestore.write_tile(data[0], store, tiles[0])
+
+
+def test_write_tile_mismatch(tmpdir, grid):
+    store = str(tmpdir.join('tiles.zarr'))
+    ds = tile_data(grid[0, 0])
+    with pytest.raises(ValueError, match=r'transform.*does not match'):
+        tilestore.write_tile(ds, store, grid[0, 1])
+    with pytest.raises(ValueError, match=r'shape.*does not match'):
+        tilestore.write_tile(ds.isel(x=slice(0, 10)), store, grid[0, 0])
+
+
+# ----------------------------------------------------------------------------
+# Append
+def test_append_tile(tmpdir, grid):
+    store = str(tmpdir.join('tiles.zarr'))
+    tile = grid[1, 1]
+    ds = tile_data(tile, ntime=5)
+    ds['blue'].encoding.update({'scale_factor': 0.5, 'dtype': 'int32'})
+    tilestore.write_tile(ds, store, tile, chunks={'time': 2})
+
+    new = tile_data(tile, ntime=4, start='2000-01-06')
+    tilestore.append_tile(new, store, tile)
+    tilestore.append_tile(tile_data(tile, ntime=1, start='2000-01-10'),
+                          store, tile)
+
+    test = tilestore.open_tile(store, tile)
+    assert test.sizes['time'] == 10
+    assert test['blue'].data.chunks[0] == (2, 2, 2, 2, 2)
+    assert test['blue'].encoding['scale_factor'] == 0.5
+    xr.testing.assert_equal(test.isel(time=slice(5, 9)), new)
+
+
+def test_append_tile_errors(tmpdir, grid):
+    store = str(tmpdir.join('tiles.zarr'))
+    tile = grid[1, 1]
+    tilestore.write_tile(tile_data(tile), store, tile)
+
+    # Before existing data
+    with pytest.raises(ValueError, match=r'"time" must be after'):
+        tilestore.append_tile(tile_data(tile), store, tile)
+    # Wrong tile
+    with pytest.raises(ValueError, match=r'transform.*do not match'):
+        tilestore.append_tile(tile_data(grid[1, 2], start='2001-01-01'),
+                              store, tile)
+    # Different variables
+    with pytest.raises(ValueError, match=r"Missing: \['red'\]"):
+        tilestore.append_tile(tile_data(tile, start='2001-01-01')[['blue']],
+                              store, tile)
+
+
+def test_append_netcdf(tmpdir, grid):
+    tile = grid[1, 1]
+    filename = str(tmpdir.join('tile.nc'))
+    ds = tile_data(tile, ntime=3)
+    ds['blue'] = ds['blue'].astype(np.float32) * 2
+    encoding = {
+        'blue': {'chunksizes': (2, 10, 20), 'zlib': True,
+                 'scale_factor': 2., 'dtype': 'int16', '_FillValue': -1},
+        'time': {'units': 'days since 1990-01-01'}
+    }
+    ds.to_netcdf(filename, encoding=encoding, unlimited_dims=['time'])
+
+    new = tile_data(tile, ntime=5, start='2000-02-01')
+    new['blue'] = new['blue'].astype(np.float32) * 2
+    tilestore.append_netcdf(new, filename)
+
+    with xr.open_dataset(filename) as test:
+        assert test.sizes['time'] == 8
+        assert test['blue'].encoding['scale_factor'] == 2.
+        assert test['time'].encoding['units'] == 'days since 1990-01-01'
+        xr.testing.assert_equal(test.isel(time=slice(3, None)).load(), new)
+
+    # Not unlimited
+    ds.to_netcdf(filename, mode='w')
+    with pytest.raises(ValueError, match=r'not an unlimited dimension'):
+        tilestore.append_netcdf(tile_data(tile, start='2001-01-01'), filename)
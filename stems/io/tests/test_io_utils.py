@@ -1,5 +1,7 @@
 """ Tests for :py:mod:`stems.io.utils`
 """
+from pathlib import Path
+
 import pytest
 
 from stems.io import utils
@@ -10,6 +12,18 @@ from stems.io import utils
 def test_parse_paths_1(tmpdir):
     pass
 
+
+def test_parse_paths_glob_sorted(tmpdir):
+    names = ['c.nc', 'a.nc', 'b.nc', 'd.tif']
+    for name in names:
+        tmpdir.join(name).ensure()
+    test = utils.parse_paths(str(tmpdir.join('*.nc')))
+    assert test == [Path(str(tmpdir.join(n))) for n in sorted(names[:3])]
+
+    test = utils.parse_paths([str(tmpdir.join('*.tif')),
+                              str(tmpdir.join('a.nc'))], parallel=True)
+    assert test == [Path(str(tmpdir.join(n))) for n in ('d.tif', 'a.nc')]
+
 # ------------------------------------------------------------------------------
 # parse_filename_attrs
 def test_parse_filename_attrs():
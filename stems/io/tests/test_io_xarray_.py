@@ -1,3 +1,124 @@
 """ Tests for :py:mod:`stems.io.xarray_`
 """
+from affine import Affine
+import dask.array as da
+import netCDF4
+import numpy as np
+import pytest
+import rasterio
+from rasterio.crs import CRS
+import xarray as xr
+
 from stems.io import xarray_
+from stems.io.rasterio_ import RasterioWindowWriter
+from stems.tests import build_data
+
+
+# =============================================================================
+# open_dataset
+@pytest.mark.parametrize(('parallel', 'aligned', ), [
+    (False, False, ),
+    (True, False, ),
+    (True, True, ),
+])
+def test_open_dataset_parallel_aligned(tmpdir, parallel, aligned):
+    ds = build_data.create_test_dataset()
+    n = ds.dims['time'] // 2
+    ds.isel(time=slice(None, n)).to_netcdf(str(tmpdir.join('ds_1.nc')))
+    ds.isel(time=slice(n, None)).to_netcdf(str(tmpdir.join('ds_2.nc')))
+
+    test = xarray_.open_dataset(str(tmpdir.join('ds_*.nc')),
+                                chunks=None,
+                                concat_dim='time',
+                                combine='nested',
+                                parallel=parallel,
+                                aligned=aligned)
+    xr.testing.assert_equal(test.load(), ds)
+    test.close()
+
+
+def test_open_dataset_missing(tmpdir):
+    with pytest.raises(IOError, match=r'Could not find a file'):
+        xarray_.open_dataset(str(tmpdir.join('*.nc')))
+
+
+# =============================================================================
+# xarray_map
+@pytest.fixture
+def map_kwds():
+    y = np.arange(40)[::-1] * 30. + 4500015.
+    x = np.arange(50) * 30. + 300015.
+    return {'y': y, 'x': x, 'count': 3, 'dtype': np.int16,
+            'crs': 'epsg:32619', 'nodata': -9999}
+
+
+@pytest.mark.parametrize('storage', xarray_.MAP_STORAGE)
+def test_xarray_map_storage(tmpdir, map_kwds, storage):
+    filename = str(tmpdir.join(f'map.{storage}'))
+    test = xarray_.xarray_map(storage=storage, filename=filename,
+                              chunks={'y': 32, 'x': 16}, **map_kwds)
+    assert test.dims == ('band', 'y', 'x')
+    assert test.shape == (3, 40, 50)
+    assert test.dtype == np.int16
+    assert test.stems.crs == CRS.from_epsg(32619)
+    assert test.stems.transform == Affine(30., 0., 300000.,
+                                          0., -30., 4501200.)
+    if storage not in ('memory', 'memmap'):
+        assert isinstance(test.data, da.Array)
+        assert test.data.chunks == ((3, ), (32, 8), (16, 16, 16, 2))
+    assert (test.values == -9999).all()
+
+
+def test_xarray_map_geotiff_chunks(tmpdir, caplog, map_kwds):
+    # Chunks are aligned to GeoTIFF tiles, which must be multiples of 16
+    filename = str(tmpdir.join('map.tif'))
+    test = xarray_.xarray_map(storage='geotiff', filename=filename,
+                              chunks={'y': 20, 'x': 16}, **map_kwds)
+    assert test.data.chunks[1:] == ((16, 16, 8), (16, 16, 16, 2))
+    assert 'Aligned chunks of GeoTIFF map' in caplog.text
+
+
+def test_xarray_map_write_blocks(tmpdir, map_kwds):
+    data = np.arange(3 * 40 * 50, dtype=np.int16).reshape(3, 40, 50)
+
+    # Zarr, by region
+    filename = str(tmpdir.join('map.zarr'))
+    test = xarray_.xarray_map(storage='zarr', filename=filename, chunks=16,
+                              **map_kwds)
+    block = xr.Dataset({'map': (test.dims, data[:, 16:32, :16])})
+    block.to_zarr(filename, region={'y': slice(16, 32), 'x': slice(0, 16)})
+    test = xr.open_zarr(filename, mask_and_scale=False)['map'].values
+    np.testing.assert_equal(test[:, 16:32, :16], data[:, 16:32, :16])
+    assert (test[:, :16] == -9999).all()
+
+    # NetCDF, by window (the map must not hold the file open)
+    filename = str(tmpdir.join('map.nc'))
+    test = xarray_.xarray_map(storage='netcdf', filename=filename,
+                              chunks=16, **map_kwds)
+    assert isinstance(test.data, da.Array)
+    with netCDF4.Dataset(filename, mode='a') as nc:
+        nc['map'][:, 16:32, :16] = data[:, 16:32, :16]
+    with xr.open_dataarray(filename, mask_and_scale=False) as test:
+        test = test.values
+    np.testing.assert_equal(test[:, 16:32, :16], data[:, 16:32, :16])
+    assert (test[:, :16] == -9999).all()
+
+    # GeoTIFF, by window
+    filename = str(tmpdir.join('map.tif'))
+    test = xarray_.xarray_map(storage='geotiff', filename=filename,
+                              chunks=16, **map_kwds)
+    da.store(da.from_array(data, chunks=test.data.chunks)[:, :16],
+             RasterioWindowWriter(filename), regions=(slice(None),
+                                                      slice(0, 16),
+                                                      slice(None)))
+    with rasterio.open(filename) as src:
+        test = src.read()
+    np.testing.assert_equal(test[:, :16], data[:, :16])
+    assert (test[:, 16:] == -9999).all()
+
+
+def test_xarray_map_errors(map_kwds):
+    with pytest.raises(ValueError, match=r'Unknown map storage "hdf"'):
+        xarray_.xarray_map(storage='hdf', **map_kwds)
+    with pytest.raises(ValueError, match=r'Must provide `filename`'):
+        xarray_.xarray_map(storage='zarr', **map_kwds)
@@ -0,0 +1,472 @@
+""" Store stacks of data for tiles of a TileGrid in one Zarr hierarchy
+
+Each tile is written to a group named by its index in the grid (see
+:py:data:`TILE_KEY`), so any tile can be opened directly without listing or
+opening the others. Spatial chunks are aligned with the tile size. The
+:py:class:`stems.gis.grids.TileGrid` can be stored in the attributes of the
+root group.
+
+New acquisitions can be appended along the time dimension of a tile using
+:py:func:`append_tile`, or to a per-tile NetCDF file with an unlimited time
+dimension using :py:func:`append_netcdf`, reusing the stored encoding and
+chunks.
+
+Layout::
+
+    store.zarr/
+        h003v009/
+            time, y, x, crs, blue, green, ...
+        h004v009/
+            ...
+"""
+from collections import OrderedDict
+import logging
+
+import numpy as np
+import xarray as xr
+
+from .. import xarray_accessor  # register accessor
+from ..gis.grids import Tile, TileGrid
+from ..gis.projections import cf_xy_coord_names
+
+logger = logging.getLogger(__name__)
+
+#: str: Format of tile group names, given a tile's "horizontal" (column) and
+#: "vertical" (row) index
+TILE_KEY = 'h{horizontal:03d}v{vertical:03d}'
+
+#: str: Root group attribute storing the TileGrid
+TILE_GRID_ATTR = 'tile_grid'
+
+#: tuple: Encoding keys kept when writing to Zarr
+ZARR_ENCODING_KEYS = ('dtype', '_FillValue', 'scale_factor', 'add_offset',
+                      'units', 'calendar', )
+
+
+def tile_key(tile):
+    """ Return the name of the group storing a tile
+
+    Parameters
+    ----------
+    tile : stems.gis.grids.Tile, tuple[int, int], or str
+        A tile, a tile index (row/vertical, column/horizontal), or a key
+
+    Returns
+    -------
+    str
+        Tile key (see :py:data:`TILE_KEY`)
+    """
+    if isinstance(tile, str):
+        return tile
+    index = tile.index if isinstance(tile, Tile) else tuple(tile)
+    return TILE_KEY.format(vertical=int(index[0]), horizontal=int(index[1]))
+
+
+def tile_chunksizes(tile, chunks=None):
+    """ Return y/x chunk sizes that evenly divide a tile
+
+    Parameters
+    ----------
+    tile : stems.gis.grids.Tile
+        Tile
+    chunks : dict, optional
+        Requested chunk sizes for dimensions. Y/X chunk sizes are reduced to
+        the nearest size that divides the tile. Defaults to the tile size
+
+    Returns
+    -------
+    dict
+        Chunk sizes for each dimension
+    """
+    dim_x, dim_y = cf_xy_coord_names(tile.crs)
+    chunks = dict(chunks or {})
+    for dim, size in ((dim_y, tile.height), (dim_x, tile.width)):
+        n = min(int(chunks.get(dim) or size), size)
+        while size % n:
+            n -= 1
+        chunks[dim] = n
+    return chunks
+
+
+def write_tile(xarr, store, tile, chunks=None, encoding=None, grid=None,
+               mode='w-', consolidated=True):
+    """ Write data for a tile to its group in a Zarr store
+
+    Parameters
+    ----------
+    xarr : xarray.Dataset or xarray.DataArray
+        Georeferenced data covering the tile
+    store : str, Path, or MutableMapping
+        Zarr store
+    tile : stems.gis.grids.Tile
+        The tile
+    chunks : dict, optional
+        Chunk sizes. Y/X chunks are aligned to the tile size (see
+        :py:func:`tile_chunksizes`)
+    encoding : dict, optional
+        Zarr encoding for variables
+    grid : stems.gis.grids.TileGrid, optional
+        Store the tile grid in the attributes of the root group
+    mode : {'w-', 'w'}, optional
+        Write mode for the tile group ('w-' fails if it exists)
+    consolidated : bool, optional
+        Consolidate the tile group metadata
+
+    Returns
+    -------
+    str
+        Tile key
+
+    Raises
+    ------
+    ValueError
+        Raised if data doesn't match the tile's CRS, transform, and shape
+    """
+    check_tile_georeference(xarr, tile)
+    if isinstance(xarr, xr.DataArray):
+        xarr = xarr.to_dataset(name=xarr.name or 'data')
+
+    # Drop encoding from the source (e.g., NetCDF chunking and compression)
+    xarr = xarr.copy(deep=False)
+    for var in xarr.variables.values():
+        var.encoding = {k: v for k, v in var.encoding.items()
+                        if k in ZARR_ENCODING_KEYS}
+
+    chunks_ = tile_chunksizes(tile, chunks)
+    xarr = xarr.chunk({k: v for k, v in chunks_.items() if k in xarr.dims})
+
+    key = tile_key(tile)
+    logger.debug(f'Writing tile "{key}" with chunks {chunks_}')
+    xarr.to_zarr(store, group=key, mode=mode, encoding=encoding,
+                 consolidated=consolidated)
+
+    if grid is not None:
+        write_tile_grid(store, grid)
+
+    return key
+
+
+def open_tile(store, tile, chunks=None, consolidated=True):
+    """ Open the data for a tile from a Zarr store
+
+    Parameters
+    ----------
+    store : str, Path, or MutableMapping
+        Zarr store
+    tile : stems.gis.grids.Tile, tuple[int, int], or str
+        Tile, tile index, or tile key
+    chunks : dict, optional
+        Chunk sizes. Defaults to the stored chunks
+    consolidated : bool, optional
+        Read consolidated tile group metadata
+
+    Returns
+    -------
+    xarray.Dataset
+        Tile data
+
+    Raises
+    ------
+    KeyError
+        Raised if the tile is not in the store
+    """
+    key = tile_key(tile)
+    try:
+        return xr.open_zarr(store, group=key,
+                            chunks={} if chunks is None else chunks,
+                            consolidated=consolidated)
+    except (FileNotFoundError, KeyError) as e:
+        raise KeyError(f'Tile "{key}" is not in store "{store}"') from e
+
+
+def open_tiles(store, tiles, chunks=None, consolidated=True):
+    """ Open the data for some tiles from a Zarr store
+
+    Parameters
+    ----------
+    store : str, Path, or MutableMapping
+        Zarr store
+    tiles : Sequence[stems.gis.grids.Tile, tuple[int, int], or str]
+        Tiles, tile indexes, or tile keys
+    chunks : dict, optional
+        Chunk sizes. Defaults to the stored chunks
+    consolidated : bool, optional
+        Read consolidated tile group metadata
+
+    Returns
+    -------
+    dict[str, xarray.Dataset]
+        Tile data, by tile key
+    """
+    return OrderedDict(
+        (tile_key(tile), open_tile(store, tile, chunks=chunks,
+                                   consolidated=consolidated))
+        for tile in tiles
+    )
+
+
+def append_tile(xarr, store, tile, dim='time', consolidated=True):
+    """ Append data to a tile in a Zarr store along a dimension
+
+    Data are written using the stored encoding and are chunked to match the
+    stored chunks.
+
+    Parameters
+    ----------
+    xarr : xarray.Dataset or xarray.DataArray
+        Georeferenced data to append
+    store : str, Path, or MutableMapping
+        Zarr store
+    tile : stems.gis.grids.Tile, tuple[int, int], or str
+        Tile, tile index, or tile key
+    dim : str, optional
+        Dimension to append along
+    consolidated : bool, optional
+        Consolidate the tile group metadata
+
+    Returns
+    -------
+    str
+        Tile key
+
+    Raises
+    ------
+    KeyError
+        Raised if the tile is not in the store
+    ValueError
+        Raised if the data can't be appended (see :py:func:`check_append`)
+    """
+    key = tile_key(tile)
+    existing = open_tile(store, key, consolidated=consolidated)
+    xarr = check_append(existing, xarr, dim=dim)
+
+    n = existing.sizes[dim]
+    for name in xarr.data_vars:
+        var = existing[name]
+        chunks = {d: c[0] for d, c in zip(var.dims, var.chunks or ())}
+        if dim in chunks:
+            chunks[dim] = _append_chunks(n, xarr.sizes[dim], chunks[dim])
+        xarr[name] = xarr[name].chunk(chunks)
+
+    logger.debug(f'Appending {xarr.sizes[dim]} "{dim}" to tile "{key}"')
+    xarr.to_zarr(store, group=key, append_dim=dim,
+                 consolidated=consolidated)
+    return key
+
+
+def append_netcdf(xarr, filename, dim='time'):
+    """ Append data to a NetCDF file along an unlimited dimension
+
+    Data are encoded using the encoding (``dtype``, ``_FillValue``,
+    ``scale_factor``, etc) of the variables in the file, and are written
+    one chunk (along ``dim``) at a time.
+
+    Parameters
+    ----------
+    xarr : xarray.Dataset or xarray.DataArray
+        Georeferenced data to append
+    filename : str or Path
+        NetCDF4 file
+    dim : str, optional
+        Unlimited dimension to append along
+
+    Raises
+    ------
+    ValueError
+        Raised if the data can't be appended (see :py:func:`check_append`),
+        or if ``dim`` is not unlimited
+    """
+    # Keep this import inside incase user doesn't have library
+    import netCDF4
+
+    with xr.open_dataset(str(filename), chunks={}) as existing:
+        xarr = check_append(existing, xarr, dim=dim)
+        n = existing.sizes[dim]
+        xarr = xarr.copy(deep=False)
+        for name, var in xarr.variables.items():
+            var.encoding = {
+                k: v for k, v in existing.variables[name].encoding.items()
+                if k in ZARR_ENCODING_KEYS
+            }
+    variables, _ = xr.conventions.cf_encoder(dict(xarr.variables), {})
+
+    with netCDF4.Dataset(str(filename), 'a') as nc:
+        if not nc.dimensions[dim].isunlimited():
+            raise ValueError(f'Cannot append along "{dim}" because it is '
+                             'not an unlimited dimension')
+        nc.set_auto_maskandscale(False)
+
+        for name, var in variables.items():
+            ncvar = nc.variables[name]
+            var = var.transpose(*ncvar.dimensions)
+            axis = var.dims.index(dim)
+            chunking = ncvar.chunking()
+            step = (var.shape[axis] if chunking == 'contiguous'
+                    else chunking[axis])
+            for start in range(0, var.shape[axis], step):
+                stop = min(start + step, var.shape[axis])
+                src = [slice(None)] * var.ndim
+                dst = [slice(None)] * var.ndim
+                src[axis] = slice(start, stop)
+                dst[axis] = slice(n + start, n + stop)
+                ncvar[tuple(dst)] = np.asarray(var[tuple(src)].values)
+    logger.debug(f'Appended {xarr.sizes[dim]} "{dim}" to "{filename}"')
+
+
+def check_append(existing, xarr, dim='time'):
+    """ Check and prepare data to append to existing data
+
+    Parameters
+    ----------
+    existing : xarray.Dataset
+        Existing, georeferenced data
+    xarr : xarray.Dataset or xarray.DataArray
+        Georeferenced data to append
+    dim : str, optional
+        Dimension to append along
+
+    Returns
+    -------
+    xarray.Dataset
+        Variables of ``xarr`` along ``dim``
+
+    Raises
+    ------
+    ValueError
+        Raised if ``xarr`` isn't georeferenced the same as ``existing``
+        (according to the grid mapping variable), if the variables along
+        ``dim`` differ, or if ``dim`` coordinates aren't after the existing
+        coordinates
+    """
+    if isinstance(xarr, xr.DataArray):
+        xarr = xarr.to_dataset(name=xarr.name or 'data')
+
+    try:
+        crs, transform, shape = (existing.stems.crs, existing.stems.transform,
+                                 existing.stems.shape)
+        crs_, transform_, shape_ = (xarr.stems.crs, xarr.stems.transform,
+                                    xarr.stems.shape)
+    except KeyError as ke:
+        raise ValueError(f'Both existing and appended data must be '
+                         f'georeferenced: {ke}')
+    if crs != crs_:
+        raise ValueError('Appended data CRS does not match')
+    if shape != shape_ or not np.allclose(transform[:6], transform_[:6]):
+        raise ValueError(f'Appended data transform {transform_[:6]} and '
+                         f'shape {shape_} do not match {transform[:6]} '
+                         f'and {shape}')
+
+    names = set(name for name, dv in existing.data_vars.items()
+                if dim in dv.dims)
+    names_ = set(name for name, dv in xarr.data_vars.items()
+                 if dim in dv.dims)
+    if names != names_:
+        raise ValueError('Appended data variables do not match. Missing: '
+                         f'{sorted(names - names_)}. '
+                         f'Extra: {sorted(names_ - names)}')
+
+    if existing.sizes[dim] and (xarr[dim].values <= existing[dim].values[-1]
+                                ).any():
+        raise ValueError(f'Appended data "{dim}" must be after '
+                         f'{existing[dim].values[-1]}')
+
+    return xarr.drop_vars([name for name, var in xarr.variables.items()
+                           if dim not in var.dims])
+
+
+def _append_chunks(n, size, chunksize):
+    # Chunks of ``size`` to append to ``n`` that align with stored chunks
+    first = min((chunksize - n % chunksize) % chunksize or chunksize, size)
+    chunks = [first] if first else []
+    remaining = size - first
+    chunks.extend([chunksize] * (remaining // chunksize))
+    if remaining % chunksize:
+        chunks.append(remaining % chunksize)
+    return tuple(chunks)
+
+
+def list_tiles(store):
+    """ Return the keys of all tiles in a Zarr store
+
+    Parameters
+    ----------
+    store : str, Path, or MutableMapping
+        Zarr store
+
+    Returns
+    -------
+    list[str]
+        Tile keys
+    """
+    import zarr
+    root = zarr.open_group(store, mode='r')
+    return sorted(name for name, _ in root.groups())
+
+
+def write_tile_grid(store, grid):
+    """ Store a TileGrid in the root group attributes of a Zarr store
+
+    Parameters
+    ----------
+    store : str, Path, or MutableMapping
+        Zarr store
+    grid : stems.gis.grids.TileGrid
+        Tile grid
+    """
+    import zarr
+    root = zarr.open_group(store, mode='a')
+    root.attrs[TILE_GRID_ATTR] = grid.to_dict()
+
+
+def read_tile_grid(store):
+    """ Return the TileGrid stored in a Zarr store
+
+    Parameters
+    ----------
+    store : str, Path, or MutableMapping
+        Zarr store
+
+    Returns
+    -------
+    stems.gis.grids.TileGrid
+        Tile grid
+
+    Raises
+    ------
+    KeyError
+        Raised if the store does not have a TileGrid
+    """
+    import zarr
+    root = zarr.open_group(store, mode='r')
+    grid = dict(root.attrs[TILE_GRID_ATTR])
+    # JSON doesn't have tuples
+    if grid.get('limits') is not None:
+        grid['limits'] = tuple(tuple(lim) for lim in grid['limits'])
+    return TileGrid.from_dict(grid)
+
+
+def check_tile_georeference(xarr, tile):
+    """ Check that data has the same CRS, transform, and shape as a tile
+
+    Parameters
+    ----------
+    xarr : xarray.Dataset or xarray.DataArray
+        Georeferenced data
+    tile : stems.gis.grids.Tile
+        Tile
+
+    Raises
+    ------
+    ValueError
+        Raised if data doesn't match the tile
+    """
+    if xarr.stems.crs != tile.crs:
+        raise ValueError(f'Data CRS does not match tile "{tile_key(tile)}"')
+    if not np.allclose(xarr.stems.transform[:6], tile.transform[:6]):
+        raise ValueError(f'Data transform {xarr.stems.transform[:6]} does '
+                         f'not match tile "{tile_key(tile)}" '
+                         f'{tile.transform[:6]}')
+    if xarr.stems.shape != (tile.height, tile.width):
+        raise ValueError(f'Data shape {xarr.stems.shape} does not match '
+                         f'tile "{tile_key(tile)}" '
+                         f'{(tile.height, tile.width)}')
@@ -1,23 +1,26 @@
 """ IO utilities
 """
 import datetime as dt
-import glob
 import os.path
 from pathlib import Path
 
 import numpy as np
 
 from ..compat import toolz
+from ..utils import glob_files
 
 
-def parse_paths(paths):
+def parse_paths(paths, parallel=False):
     """ Return a list of path(s)
 
     Parameters
     ----------
     paths : str or Sequence
         Either a string glob in the form "path/to/my/files/*.nc" or an explicit
-        list of files to open.
+        list of files to open. Files found using a glob are sorted.
+    parallel : bool or int, optional
+        List directories matched by a glob in parallel using threads (see
+        :py:func:`stems.utils.glob_files`)
 
     Returns
     -------
@@ -28,11 +31,12 @@ def parse_paths(paths):
         paths = os.path.expandvars(str(paths))
         # Filename or glob, either way turn into list
         if '*' in str(paths):
-            paths = glob.glob(paths)
+            paths = glob_files(paths, parallel=parallel)
         else:
             paths = [paths]
     elif isinstance(paths, (list, tuple)):
-        paths = toolz.concat([parse_paths(p) for p in paths])
+        paths = toolz.concat([parse_paths(p, parallel=parallel)
+                              for p in paths])
     else:
         raise TypeError('`paths` must be a str, Path, or list/tuple')
 
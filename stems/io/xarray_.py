@@ -2,19 +2,41 @@
 """
 import logging
 
+import dask.array as da
+from dask.base import tokenize
 import numpy as np
+import rasterio
 import xarray as xr
 
 from ..gis import convert
-from ..gis.conventions import is_georeferenced, georeference
+from ..gis.coords import coords_to_transform
+from ..gis.conventions import CF_NC_ATTRS, is_georeferenced, georeference
 from ..gis.projections import cf_xy_coord_names
 from .chunk import auto_determine_chunks
+from .manifest import StaleManifestError, build_manifest, open_manifest
+from .rasterio_ import RasterioWindowReader, align_chunks
 from .utils import parse_paths
 
 logger = logging.getLogger(__name__)
 
+#: dict: Options for :py:func:`xarray.open_mfdataset` used when files are
+#        known to be aligned. Coordinates are taken from the first file
+#        instead of being read and compared across all files.
+OPEN_ALIGNED_KWDS = {
+    'data_vars': 'minimal',
+    'coords': 'minimal',
+    'compat': 'override',
+    'join': 'override'
+}
 
-def open_dataset(paths, chunks='auto', concat_dim=None, crs=None, **kwds):
+#: tuple[str]: Types of storage for :py:func:`xarray_map`
+MAP_STORAGE = ('memory', 'dask', 'memmap', 'netcdf', 'zarr', 'geotiff', )
+#: tuple[str]: Types of :py:data:`MAP_STORAGE` that require a filename
+MAP_STORAGE_FILE = ('memmap', 'netcdf', 'zarr', 'geotiff', )
+
+
+def open_dataset(paths, chunks='auto', concat_dim=None, crs=None,
+                 parallel=False, aligned=False, manifest=None, **kwds):
     """ Open an xarray dataset (somewhat) intelligently
 
     Parameters
@@ -41,6 +63,22 @@ def open_dataset(paths, chunks='auto', concat_dim=None, crs=None, **kwds):
         Coordinate reference system to assign, if not already georeferenced.
         If type is not ``CRS``, will be converted using
         :py:func:`plants.gis.convert.to_crs`.
+    parallel : bool, optional
+        Open and decode files concurrently using :py:func:`dask.delayed`
+        (and list directories matched by a glob using threads)
+    aligned : bool, optional
+        Set to True if all files share the same coordinates along
+        dimensions other than ``concat_dim`` (e.g., a time stack of a
+        single tile). Coordinates are read from the first file and not
+        compared across files (see :py:data:`OPEN_ALIGNED_KWDS`). Options
+        given in ``kwds`` take precedence.
+    manifest : str or Path, optional
+        Open the files using a manifest saved to this file (see
+        :py:mod:`stems.io.manifest`), avoiding the need to find, open,
+        and combine the files. The manifest is (re)built if it is missing,
+        if any file it describes has been modified, or if it doesn't
+        describe the files in ``paths``.
+        Requires ``concat_dim``, and ``kwds`` are ignored when given.
     kwds : optional
         Options passed to :py:func:`xarray.open_mfdataset`
 
@@ -54,9 +92,14 @@ def open_dataset(paths, chunks='auto', concat_dim=None, crs=None, **kwds):
     IOError
         Raise if ``paths`` does not parse into any filenames (e.g., a bad glob)
     """
+    if manifest is not None:
+        ds = _open_dataset_manifest(paths, manifest, chunks, concat_dim,
+                                    parallel=parallel)
+        return _georeference_crs(ds, crs)
+
     # Parse path from input
-    paths_ = parse_paths(paths)
-    if not paths:
+    paths_ = parse_paths(paths, parallel=parallel)
+    if not paths_:
         raise IOError('Could not find a file to read using input "{paths}"'
                       .format(paths=paths))
 
@@ -64,19 +107,45 @@ def open_dataset(paths, chunks='auto', concat_dim=None, crs=None, **kwds):
     if chunks == 'auto':
         chunks = auto_determine_chunks(paths_[0])
 
+    if aligned:
+        for key, value in OPEN_ALIGNED_KWDS.items():
+            kwds.setdefault(key, value)
+
     # The xarray call we're wrapping
     ds = xr.open_mfdataset(paths_,
                            chunks=chunks,
                            concat_dim=concat_dim,
+                           parallel=parallel,
                            **kwds)
 
+    return _georeference_crs(ds, crs)
+
+
+def _open_dataset_manifest(paths, manifest, chunks, concat_dim,
+                           parallel=False):
+    if not isinstance(concat_dim, str):
+        raise ValueError('Must provide `concat_dim` as a dimension name '
+                         'when opening using a manifest')
+    paths_ = parse_paths(paths, parallel=parallel)
+    if not paths_:
+        raise IOError(f'Could not find a file to read using input "{paths}"')
+    try:
+        return open_manifest(manifest, chunks=chunks, paths=paths_)
+    except StaleManifestError as e:
+        logger.info(f'Rebuilding manifest "{manifest}": {e}')
+        build_manifest(paths_, concat_dim, dst=manifest, parallel=parallel)
+        return open_manifest(manifest, chunks=chunks, check=False)
+
+
+def _georeference_crs(ds, crs):
     # TODO: what to do if no geocoding (?)
     if not is_georeferenced(ds):
         if crs is not None:
             logger.debug('Adding CRS information provided')
             crs_ = convert.to_crs(crs)
             transform_ = convert.to_transform(ds)
-            ds = georeference(ds, crs_, transform_, inplace=True)
+            ds = georeference(ds, crs_, transform_, inplace=True,
+                              lightweight=True)
         else:
             logger.debug('No georeference information found on file.')
 
@@ -85,8 +154,17 @@ def open_dataset(paths, chunks='auto', concat_dim=None, crs=None, **kwds):
     return ds
 
 
-def xarray_map(y, x, count, dtype, crs=None, nodata=-9999, dim_band='band'):
+def xarray_map(y, x, count, dtype, crs=None, nodata=-9999, dim_band='band',
+               storage='memory', filename=None, chunks=None, name='map'):
     """ A raster map with ``count`` bands
+
+    By default the map is allocated in memory. Large maps can instead be
+    backed by a lazy Dask array of ``nodata``, a memory-mapped array, or an
+    on-disk NetCDF, Zarr, or GeoTIFF store. Creating a Dask, NetCDF, Zarr, or
+    (sparse) GeoTIFF backed map only writes metadata. A memory-mapped map is
+    only sparse if ``nodata`` is 0; otherwise, creating it writes ``nodata``
+    to the entire file.
+
     Parameters
     ----------
     y : array-like
@@ -101,20 +179,63 @@ def xarray_map(y, x, count, dtype, crs=None, nodata=-9999, dim_band='band'):
         Optionally, give the raster a CRS
     nodata : float or int
         No Data Value to initialize data with
+    dim_band : str, optional
+        Name of band dimension
+    storage : {'memory', 'dask', 'memmap', 'netcdf', 'zarr', 'geotiff'}
+        How to store the map (see :py:data:`MAP_STORAGE`)
+    filename : str or Path, optional
+        File to create for "memmap", "netcdf", "zarr", and "geotiff" storage
+    chunks : int, tuple, or dict, optional
+        Chunk sizes of the Dask array and the chunking (or tiling) of the
+        store. Defaults to "auto" chunks along y/x, with all bands together.
+        For "geotiff" storage, y/x chunks are rounded down to multiples of
+        16 (the GeoTIFF tile size) and aligned to the tiles, so the chunks
+        may differ from those requested (e.g., ``y=50`` with 100 rows
+        becomes ``(48, 48, 4)``)
+    name : str, optional
+        Name of the map (used as the variable name in NetCDF and Zarr stores)
 
     Returns
     -------
     xr.DataArray
         3D (band, y, x,) "map" to write data into
+
+    Raises
+    ------
+    ValueError
+        Raised if ``storage`` is unknown or a ``filename`` is required but
+        not given
+
+    Notes
+    -----
+    Maps backed by a Dask array or a store are read-only views. Write results
+    into the store block by block, e.g., using
+    :py:meth:`xarray.Dataset.to_zarr` with ``region=`` for Zarr,
+    :py:class:`netCDF4.Dataset` in "a" mode for NetCDF, or
+    :py:class:`stems.io.rasterio_.RasterioWindowWriter` for GeoTIFF.
+    Memory-mapped maps can be assigned to directly.
+
+    NetCDF maps don't hold the file open (so it can be written to), and
+    are a lazy template of ``nodata`` matching the file's chunks rather
+    than a view of the file. Reopen the file (e.g., with
+    :py:func:`xarray.open_dataarray`) to read results after writing.
     """
+    if storage not in MAP_STORAGE:
+        raise ValueError(f'Unknown map storage "{storage}". Choose from: '
+                         f'{", ".join(MAP_STORAGE)}')
+    if storage in MAP_STORAGE_FILE and filename is None:
+        raise ValueError(f'Must provide `filename` for "{storage}" storage')
+
     if crs is not None:
         crs_ = convert.to_crs(crs)
         dim_yx = cf_xy_coord_names(crs_)[::-1]
     else:
+        crs_ = None
         dim_yx = ('y', 'x', )
 
     shape = (count, len(y), len(x), )
     dims = (dim_band, ) + dim_yx
+    dtype = np.dtype(dtype)
 
     coords = {
         dim_yx[0]: y,
@@ -123,10 +244,115 @@ def xarray_map(y, x, count, dtype, crs=None, nodata=-9999, dim_band='band'):
                    for i in range(count)]
     }
 
-    arr = np.full(shape, nodata, dtype=dtype)
-    xarr = xr.DataArray(arr, dims=dims, coords=coords)
+    if storage == 'memory':
+        arr = np.full(shape, nodata, dtype=dtype)
+    else:
+        chunks = _map_chunks(chunks, dims, shape, dtype)
+        arr = da.full(shape, nodata, dtype=dtype, chunks=chunks)
+
+    if storage == 'memmap':
+        arr = _map_memmap(filename, shape, dtype, nodata)
+    elif storage == 'geotiff':
+        arr = _map_geotiff(filename, shape, dtype, nodata, crs_,
+                           coords_to_transform(np.asarray(y), np.asarray(x)),
+                           arr.chunks)
 
-    if crs is not None:
-        xarr = georeference(xarr, crs, inplace=True)
+    xarr = xr.DataArray(arr, dims=dims, coords=coords, name=name)
+    if crs_ is not None:
+        xarr = georeference(xarr, crs_, inplace=True, lightweight=True)
 
+    if storage == 'netcdf':
+        xarr = _map_netcdf(xarr, filename, nodata)
+    elif storage == 'zarr':
+        xarr = _map_zarr(xarr, filename, nodata)
+
+    return xarr
+
+
+def _map_chunks(chunks, dims, shape, dtype):
+    if chunks is None:
+        chunks = {dims[0]: -1}
+    if isinstance(chunks, dict):
+        chunks = tuple(chunks.get(d, 'auto') for d in dims)
+    return da.core.normalize_chunks(chunks, shape, dtype=dtype)
+
+
+def _map_memmap(filename, shape, dtype, nodata):
+    arr = np.lib.format.open_memmap(str(filename), mode='w+',
+                                    dtype=dtype, shape=shape)
+    # New files are zero filled (and sparse), so only fill if needed. Any
+    # other nodata writes the entire file
+    if nodata != 0:
+        for band in arr:
+            band[:] = nodata
+        arr.flush()
+    return arr
+
+
+def _map_geotiff(filename, shape, dtype, nodata, crs, transform, chunks):
+    count, height, width = shape
+    # GeoTIFF tiles must be multiples of 16
+    block_shape = tuple(max(16, c[0] // 16 * 16) for c in chunks[1:])
+    meta = {
+        'driver': 'GTiff',
+        'count': count,
+        'height': height,
+        'width': width,
+        'dtype': dtype,
+        'nodata': nodata,
+        'crs': crs,
+        'transform': transform,
+        'tiled': True,
+        'blockysize': block_shape[0],
+        'blockxsize': block_shape[1],
+        'sparse_ok': True
+    }
+    # Sparse GeoTIFF only writes tiles that are written to
+    with rasterio.open(str(filename), 'w', **meta):
+        pass
+
+    arr = da.from_array(RasterioWindowReader(filename), chunks=chunks,
+                        name=f'geotiff-{tokenize(str(filename))}')
+    arr_ = align_chunks(arr, block_shape)
+    if arr_.chunks != arr.chunks:
+        logger.warning(f'Aligned chunks of GeoTIFF map "{filename}" to its '
+                       f'{block_shape} tiles. Chunks are now {arr_.chunks}')
+    return arr_
+
+
+def _map_netcdf(xarr, filename, nodata):
+    # Keep this import inside incase user doesn't have library
+    import netCDF4
+
+    # Write coordinates & grid mapping, and then create the (empty) map
+    attrs = {k: v for k, v in xarr.attrs.items() if k not in CF_NC_ATTRS}
+    ds = xarr.to_dataset().drop_vars(xarr.name)
+    ds.attrs = {k: v for k, v in xarr.attrs.items() if k in CF_NC_ATTRS}
+    ds.to_netcdf(str(filename), mode='w')
+
+    chunksizes = tuple(c[0] for c in xarr.data.chunks)
+    with netCDF4.Dataset(str(filename), mode='a') as nc:
+        var = nc.createVariable(xarr.name, xarr.dtype, xarr.dims,
+                                fill_value=nodata, chunksizes=chunksizes)
+        var.setncatts(attrs)
+        other = [c for c in xarr.coords if c not in xarr.dims]
+        if other:
+            var.setncattr('coordinates', ' '.join(other))
+
+    # Return the (lazy) template rather than opening the file, which would
+    # keep it open and prevent writing to it
+    xarr.encoding['source'] = str(filename)
     return xarr
+
+
+def _map_zarr(xarr, filename, nodata):
+    import zarr
+
+    # Chunks with only fill values aren't written to the store
+    encoding = {xarr.name: {'_FillValue': nodata}}
+    if int(zarr.__version__.split('.')[0]) >= 3:
+        # Zarr v3 stores its fill value separately from "_FillValue"
+        encoding[xarr.name]['fill_value'] = nodata
+    xarr.to_dataset().to_zarr(str(filename), mode='w', compute=False,
+                              encoding=encoding)
+    return xr.open_zarr(str(filename), mask_and_scale=False)[xarr.name]
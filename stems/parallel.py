@@ -7,10 +7,15 @@ References
 """
 from collections import defaultdict
 import functools
+import hashlib
 from itertools import product
 import logging
+import queue
+import threading
+import weakref
 
 import numpy as np
+import pandas as pd
 import six
 import xarray as xr
 
@@ -94,8 +99,102 @@ def iter_noncore_chunks(data, core_dims, chunk_sizes=None):
         yield i
 
 
+def iter_noncore_chunks_prefetch(data, core_dims, chunk_sizes=None,
+                                 prefetch=2, timeout=None):
+    """ Yield data in chunks, loading upcoming chunks in a background thread
+
+    Works like :py:func:`iter_noncore_chunks`, but instead of only yielding
+    the ``isel`` selection statement this function also yields the selected
+    data after loading it into memory. Up to ``prefetch`` windows are read
+    ahead of the window being processed (so at most ``prefetch + 1``
+    windows are in memory), allowing disk reads (e.g., from NetCDF or
+    rasterio backed data) to overlap with computation.
+
+    Parameters
+    ----------
+    data : xr.DataArray or xr.Dataset
+        Data
+    core_dims : str or list[str]
+        One or more dimensions to exclude from selection. These dimensions
+        will be the only dimensions on the data returned
+    chunk_sizes : int, dict[str, int], or None
+        Chunk/block/window size when iterating over noncore dimensions. If
+        ``None``, will return a slice for each element in each dimension.
+    prefetch : int, optional
+        Maximum number of windows loaded, or being loaded, ahead of the
+        window being processed. Bounds the amount of memory used for data
+        read ahead of time
+    timeout : float, optional
+        Seconds to wait for the next window before raising
+        :py:class:`queue.Empty`. By default, wait forever
+
+    Yields
+    ------
+    dict[str, slice]
+        ``isel`` select statements used to retrieve data
+    xr.DataArray or xr.Dataset
+        Data for this window, loaded into memory
+
+    Raises
+    ------
+    ValueError
+        Raised if ``prefetch`` is less than 1
+    """
+    if prefetch < 1:
+        raise ValueError('Must prefetch at least 1 window (``prefetch>=1``)')
+
+    windows = iter_noncore_chunks(data, core_dims, chunk_sizes=chunk_sizes)
+    q = queue.Queue()
+    # Windows loaded (or being loaded) but not yet taken by the consumer.
+    # Slots are taken before loading, so the window held by the worker
+    # counts towards ``prefetch``
+    slots = threading.BoundedSemaphore(prefetch)
+    stop = threading.Event()
+
+    def _acquire():
+        # Keep trying unless consumer has gone away
+        while not stop.is_set():
+            if slots.acquire(timeout=0.1):
+                return True
+        return False
+
+    def _worker():
+        try:
+            for window in windows:
+                if not _acquire():
+                    return
+                q.put((window, data.isel(**window).load(), None))
+        except Exception as e:
+            logger.debug('Exception raised while prefetching data',
+                         exc_info=True)
+            q.put((None, None, e))
+        else:
+            q.put(_PREFETCH_DONE)
+
+    thread = threading.Thread(target=_worker, name='stems-prefetch',
+                              daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get(timeout=timeout)
+            if item is _PREFETCH_DONE:
+                break
+            window, data_, err = item
+            if err is not None:
+                raise err
+            slots.release()
+            yield window, data_
+    finally:
+        stop.set()
+        thread.join()
+
+
+#: Sentinel marking the end of prefetched windows
+_PREFETCH_DONE = object()
+
+
 def map_collect_1d(core_dims, arg_idx=0, concat_axis=0,
-                   concat_func=np.concatenate):
+                   concat_func=np.concatenate, check_dims=True):
     """ Decorator that maps a function across pixels and concatenates the result
 
     Parameters
@@ -110,6 +209,10 @@ def map_collect_1d(core_dims, arg_idx=0, concat_axis=0,
         Axis along which the arrays will be joined (passed to ``concat_func``)
     concat_func : callable, optional
         Function used to concatenate the data. Should take the ``axis`` keyword
+    check_dims : bool, optional
+        Check that the coordinates of each dimension match across all data
+        in ``arg_idx``. Set to ``False`` to skip this check if data are
+        known to be aligned
 
     Returns
     -------
@@ -128,7 +231,7 @@ def map_collect_1d(core_dims, arg_idx=0, concat_axis=0,
                        for d in data)
 
             # Find noncore dim names and sizes to iterate over
-            dim_sizes = _check_data_dims(data)
+            dim_sizes = _check_data_dims(data, check=check_dims)
             noncore_dims = tuple(d for dat in data for d in dat.dims
                                  if d not in core_dims)
             noncore_dims_sizes = {k: dim_sizes[k] for k in noncore_dims}
@@ -172,24 +275,82 @@ def _zip_iter_seq_window(d, spacing):
     return zip(_iter_seq(d, 0, spacing), _iter_seq(d, 1, spacing))
 
 
-def _check_data_dims(data):
+def _check_data_dims(data, check=True):
     # Populate all dimensions organized by name
     dims_ = defaultdict(list)
     for dat in data:
         for key in dat.dims:
-            dims_[key].append(dat[key])
+            dims_[key].append(dat.indexes[key] if key in dat.indexes
+                              else dat[key])
 
     # Ensure all dimensions match
-    for key, dim in dims_.items():
-        eq = [np.array_equal(a, b) for a, b in zip(dim, dim[1:])]
-        if not all(eq):
-            raise ValueError(f'Data dimensions for "{key}" do not all match')
+    if check:
+        for key, dim in dims_.items():
+            fps = [_coord_fingerprint(d) for d in dim]
+            if not all(a == b for a, b in zip(fps, fps[1:])):
+                raise ValueError(f'Data dimensions for "{key}" do not all '
+                                 'match')
+    else:
+        for key, dim in dims_.items():
+            if len(set(d.size for d in dim)) != 1:
+                raise ValueError(f'Data dimensions for "{key}" do not all '
+                                 'have the same size')
 
     # Finally just return the sizes for each dimension
     dim_sizes = {k: vals[0].size for k, vals in dims_.items()}
     return dim_sizes
 
 
+#: Cache of coordinate fingerprints, keyed on ``id`` of (immutable) indexes
+_FINGERPRINTS = {}
+_FINGERPRINTS_LOCK = threading.Lock()
+
+
+def _coord_fingerprint(coord):
+    """ Return a summary of a coordinate that is cheap to compare
+
+    Fingerprints for :py:class:`pandas.Index` are cached since indexes are
+    immutable and shared between xarray objects selected from the same data.
+    """
+    if not isinstance(coord, pd.Index):
+        return _calc_fingerprint(np.asarray(coord))
+
+    key = id(coord)
+    with _FINGERPRINTS_LOCK:
+        ref, fp = _FINGERPRINTS.get(key, (None, None))
+    if ref is None or ref() is not coord:
+        fp = _calc_fingerprint(np.asarray(coord))
+        # pandas indexes aren't hashable, so remove entry ourselves
+        ref = weakref.ref(coord, functools.partial(_drop_fingerprint, key))
+        with _FINGERPRINTS_LOCK:
+            _FINGERPRINTS[key] = (ref, fp)
+    return fp
+
+
+def _drop_fingerprint(key, ref):
+    with _FINGERPRINTS_LOCK:
+        if _FINGERPRINTS.get(key, (None, ))[0] is ref:
+            del _FINGERPRINTS[key]
+
+
+def _calc_fingerprint(values):
+    # size, dtype, first/last values, spacing, and a hash of all values
+    n = values.size
+    if n == 0:
+        return (0, values.dtype.str, None, None, None, None)
+
+    first, last = values[0], values[-1]
+    if values.dtype.kind in 'biufcmM':
+        spacing = values[1] - values[0] if n > 1 else None
+        digest = hashlib.blake2b(np.ascontiguousarray(values).tobytes(),
+                                 digest_size=16).hexdigest()
+    else:
+        spacing = None
+        digest = hash(tuple(values.tolist()))
+
+    return (n, values.dtype.str, first, last, spacing, digest)
+
+
 def _isel_n_squeeze(xarr, noncore_dims, **isel):
     isel_ = {k: i for k, i in isel.items() if k in xarr.dims}
     item = xarr.isel(**isel_)
@@ -1,5 +1,11 @@
 """Tests for :py:mod:`plants.executor`
 """
+import contextlib
+import copy
+import json
+import os
+import threading
+
 import distributed
 import pytest
 
@@ -35,6 +41,46 @@ def test_setup_executor_distributed(n_workers=1, threads_per_worker=2):
     client.close()
 
 
+@pytest.mark.parametrize('profile', ('io-heavy', 'cpu-heavy', ))
+def test_setup_executor_profile(profile):
+    client = executor.setup_executor(n_workers=1, profile=profile,
+                                     processes=False)
+    ncores = client.ncores()
+    threads = executor.CLUSTER_PROFILES[profile]['threads_per_worker']
+    assert len(ncores) == 1
+    assert sum(ncores.values()) == threads
+    client.close()
+
+
+def test_setup_executor_profile_override():
+    client = executor.setup_executor(n_workers=2, profile='io-heavy',
+                                     threads_per_worker=2, processes=False)
+    ncores = client.ncores()
+    assert len(ncores) == 2
+    assert sum(ncores.values()) == 4
+    client.close()
+
+
+def test_setup_executor_adapt():
+    client = executor.setup_executor(adapt=(1, 2), processes=False)
+    assert len(client.ncores()) == 1
+    assert client.cluster._adaptive is not None
+    client.close()
+
+
+def test_setup_executor_adapt_address():
+    with pytest.raises(ValueError, match=r'Can only adaptively scale.*'):
+        executor.setup_executor('127.0.0.1:8786', adapt=(1, 2))
+
+
+def test_cluster_profile():
+    profile = executor.cluster_profile('io-heavy')
+    assert profile == executor.CLUSTER_PROFILES['io-heavy']
+    assert profile is not executor.CLUSTER_PROFILES['io-heavy']
+    with pytest.raises(KeyError, match=r'Unknown cluster profile.*'):
+        executor.cluster_profile('asdf')
+
+
 # =============================================================================
 # executor_info
 def test_executor_info(n_workers=2, threads_per_worker=4):
@@ -56,3 +102,177 @@ def test_executor_info(n_workers=2, threads_per_worker=4):
     assert 'Workers' in infos[0]
 
     client.close()
+
+
+# =============================================================================
+# ExecutorMetrics
+def test_executor_metrics(tmpdir):
+    import dask.array as da
+    client = executor.setup_executor(n_workers=2, threads_per_worker=1,
+                                     processes=False)
+    report = str(tmpdir.join('metrics.json'))
+
+    with executor.ExecutorMetrics(client, interval=0.1,
+                                  report=report) as metrics:
+        assert metrics.running
+        x = da.ones((100, 100), chunks=10)
+        (x + x.T).sum().compute()
+    assert not metrics.running
+
+    test = metrics.snapshot()
+    assert sum(t['count'] for t in test['tasks'].values()) > 100
+    assert len(test['slowest']) == metrics.n_slowest
+    assert set(test['workers']) == set(client.ncores())
+    assert all(w['memory_max'] > 0 for w in test['workers'].values())
+    assert test['transfer']['count'] >= 0
+    assert 'nbytes' in test['spill']
+
+    with open(report) as src:
+        saved = json.load(src)
+    assert saved['workers'].keys() == test['workers'].keys()
+
+    with pytest.raises(RuntimeError, match=r'Not recording.*'):
+        metrics.stop()
+
+    client.close()
+
+
+def test_executor_metrics_sample_snapshot():
+    # Sampling memory (from another thread) while taking a snapshot
+    class Client(object):
+        def __init__(self):
+            self.calls = 0
+
+        def scheduler_info(self):
+            self.calls += 1
+            return {'workers': {
+                f'worker-{self.calls}-{i}': {'memory': i,
+                                             'memory_limit': 100}
+                for i in range(100)
+            }}
+
+    metrics = executor.ExecutorMetrics(Client())
+    sampler = threading.Thread(
+        target=lambda: [metrics._sample_memory() for _ in range(200)])
+    sampler.start()
+    while sampler.is_alive():
+        metrics.snapshot()
+    sampler.join()
+
+    test = metrics.snapshot()
+    assert len(test['workers']) == 200 * 100
+    assert all(w['memory_limit'] == 100 for w in test['workers'].values())
+
+
+# =============================================================================
+# setup_backend
+@pytest.fixture
+def auto_backend(monkeypatch):
+    # Restores Dask config, thread limits, and pools changed by "auto"
+    import dask
+    monkeypatch.setattr(executor, 'available_resources',
+                        lambda: {'cpu': 2, 'memory': 2 ** 30})
+    monkeypatch.setattr(executor, 'AUTO_MEMORY_FRACTIONS', {'spill': 0.5})
+    for var in executor.THREAD_LIMIT_ENV_VARS:
+        monkeypatch.setenv(var, '8')
+
+    # ``dask.config.set`` updates the global config in place
+    config = copy.deepcopy(dask.config.config)
+    with contextlib.ExitStack() as stack:
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            pass
+        else:
+            stack.enter_context(threadpool_limits(limits=None))
+        yield
+        pool = dask.config.get('pool', None)
+        if pool is not None:
+            pool.terminate()
+        dask.config.config.clear()
+        dask.config.config.update(config)
+
+
+def test_setup_backend_auto(auto_backend):
+    import dask
+    executor.setup_backend('threads', executor.AUTO)
+    assert dask.config.get('scheduler') == 'threads'
+    assert dask.config.get('pool')._processes == 2
+    assert os.environ['OMP_NUM_THREADS'] == '1'
+    # Worker memory fractions only apply to ``distributed`` workers
+    assert dask.config.get('distributed.worker.memory.spill') != 0.5
+
+
+@pytest.mark.parametrize('processes', (False, True, ))
+def test_setup_executor_auto(auto_backend, processes):
+    import dask
+    client = executor.setup_executor(n_workers=executor.AUTO,
+                                     processes=processes)
+    try:
+        assert len(client.ncores()) == 2
+        spill = client.run(
+            lambda dask_worker: dask_worker.memory_manager.memory_spill_fraction
+        )
+        assert set(spill.values()) == {0.5}
+        assert os.environ['OMP_NUM_THREADS'] == '1'
+        # Only the cluster's workers use the memory fractions
+        assert dask.config.get('distributed.worker.memory.spill') != 0.5
+    finally:
+        client.close()
+
+
+def test_setup_executor_auto_address(auto_backend):
+    # Connecting to a remote cluster doesn't change this process
+    import dask
+    with distributed.LocalCluster(n_workers=1, processes=False) as cluster:
+        client = executor.setup_executor(address=cluster.scheduler_address,
+                                         n_workers=executor.AUTO)
+        client.close()
+    assert os.environ['OMP_NUM_THREADS'] == '8'
+    assert dask.config.get('distributed.worker.memory.spill') != 0.5
+
+
+def test_setup_backend_KeyError():
+    with pytest.raises(KeyError, match=r'Unsupported scheduler.*'):
+        executor.setup_backend('asdf')
+
+
+# =============================================================================
+# Resources
+def test_available_resources():
+    resources = executor.available_resources()
+    assert resources['cpu'] >= 1
+    assert resources['memory'] is None or resources['memory'] > 0
+
+
+@pytest.mark.parametrize(('files', 'ans'), (
+    ({'cpu.max': '200000 100000'}, 2.),
+    ({'cpu.max': 'max 100000'}, None),
+    ({'cpu/cpu.cfs_quota_us': '150000',
+      'cpu/cpu.cfs_period_us': '100000'}, 1.5),
+    ({'cpu/cpu.cfs_quota_us': '-1',
+      'cpu/cpu.cfs_period_us': '100000'}, None),
+    ({}, None)
+))
+def test_cgroup_cpu_limit(tmpdir, files, ans):
+    _write_files(tmpdir, files)
+    assert executor.cgroup_cpu_limit(str(tmpdir)) == ans
+
+
+@pytest.mark.parametrize(('files', 'ans'), (
+    ({'memory.max': '1073741824'}, 2 ** 30),
+    ({'memory.max': 'max'}, None),
+    ({'memory/memory.limit_in_bytes': '536870912'}, 2 ** 29),
+    ({'memory/memory.limit_in_bytes': '9223372036854771712'}, None),
+    ({}, None)
+))
+def test_cgroup_memory_limit(tmpdir, files, ans):
+    _write_files(tmpdir, files)
+    assert executor.cgroup_memory_limit(str(tmpdir)) == ans
+
+
+def _write_files(tmpdir, files):
+    for name, text in files.items():
+        path = tmpdir.join(name)
+        path.dirpath().ensure(dir=True)
+        path.write(text)
@@ -1,5 +1,7 @@
 """ Tests for :py:mod:`stems.parallel`
 """
+import time
+
 import numpy as np
 import pytest
 import xarray as xr
@@ -72,6 +74,99 @@ def test_iter_noncore_chunks_size_dict(ex_da):
     xr.testing.assert_equal(ans_all_concat, ex_da)
 
 
+# =============================================================================
+# iter_noncore_chunks_prefetch
+@pytest.mark.parametrize('prefetch', (1, 3, ))
+def test_iter_noncore_chunks_prefetch_1(ex_da, prefetch):
+    core_dims = ('y', 'x', 'band', )
+    ans = list(parallel.iter_noncore_chunks(ex_da, core_dims, 3))
+    test = list(parallel.iter_noncore_chunks_prefetch(ex_da, core_dims, 3,
+                                                      prefetch=prefetch))
+    assert [t[0] for t in test] == ans
+    for window, data in test:
+        xr.testing.assert_equal(data, ex_da.isel(**window))
+    ans_concat = xr.concat([t[1] for t in test], dim='time')
+    xr.testing.assert_equal(ex_da, ans_concat)
+
+
+def test_iter_noncore_chunks_prefetch_dask(ex_da):
+    ex_da = ex_da.chunk({'time': 5})
+    test = list(parallel.iter_noncore_chunks_prefetch(ex_da, 'time', 2))
+    assert len(test) == 9
+    assert all(data.chunks is None for _, data in test)
+
+
+@pytest.mark.parametrize('prefetch', (1, 2, ))
+def test_iter_noncore_chunks_prefetch_memory(monkeypatch, ex_da, prefetch):
+    # Windows loaded ahead of the one being processed <= ``prefetch``
+    loaded = []
+    load = xr.DataArray.load
+
+    def _load(self, **kwds):
+        loaded.append(True)
+        return load(self, **kwds)
+    monkeypatch.setattr(xr.DataArray, 'load', _load)
+
+    ahead = []
+    iter_ = parallel.iter_noncore_chunks_prefetch(ex_da, 'time', 1,
+                                                  prefetch=prefetch)
+    for i, (window, data) in enumerate(iter_, 1):
+        time.sleep(0.05)  # let the background thread read ahead
+        ahead.append(len(loaded) - i)
+    assert max(ahead) == prefetch
+
+
+def test_iter_noncore_chunks_prefetch_close(ex_da):
+    # Stopping early shouldn't hang the background thread
+    iter_ = parallel.iter_noncore_chunks_prefetch(ex_da, 'time', prefetch=1)
+    window, data = next(iter_)
+    iter_.close()
+    xr.testing.assert_equal(data, ex_da.isel(**window))
+
+
+def test_iter_noncore_chunks_prefetch_error(ex_da):
+    with pytest.raises(ValueError, match=r'Must prefetch.*'):
+        list(parallel.iter_noncore_chunks_prefetch(ex_da, 'time', prefetch=0))
+
+
+# =============================================================================
+# map_collect_1d
+def _sum_time(xarr):
+    return np.atleast_1d(xarr.sum().values)
+
+
+def test_map_collect_1d_1(ex_da):
+    func = parallel.map_collect_1d(('time', ), arg_idx=(0, 1))(
+        lambda a, b: _sum_time(a + b))
+    test = func(ex_da, ex_da)
+    assert test.shape == (ex_da['band'].size * ex_da['y'].size *
+                          ex_da['x'].size, )
+    np.testing.assert_equal(test, ex_da['time'].size * 2)
+
+
+def test_map_collect_1d_mismatch(ex_da):
+    other = ex_da.assign_coords(time=ex_da['time'] + 1)
+    func = parallel.map_collect_1d(('time', ), arg_idx=(0, 1))(
+        lambda a, b: _sum_time(a))
+    with pytest.raises(ValueError, match=r'.*"time" do not all match'):
+        func(ex_da, other)
+
+    # Skip the check if we trust the data are aligned
+    func = parallel.map_collect_1d(('time', ), arg_idx=(0, 1),
+                                   check_dims=False)(
+        lambda a, b: _sum_time(a))
+    test = func(ex_da, other)
+    np.testing.assert_equal(test, ex_da['time'].size)
+
+
+def test_check_data_dims_cached(ex_da):
+    index = ex_da.indexes['time']
+    sizes = parallel._check_data_dims([ex_da, ex_da + 1])
+    assert sizes['time'] == ex_da['time'].size
+    assert sizes['x'] == ex_da['x'].size
+    assert parallel._FINGERPRINTS[id(index)][0]() is index
+
+
 # =============================================================================
 # FIXTURES
 @pytest.fixture
@@ -269,6 +269,68 @@ def test_find(tmpdir):
     assert len(ans) == 2
 
 
+def test_find_parallel_manifest(tmpdir):
+    for name in ('a/1.txt', 'a/b/2.txt', 'c/3.txt', '4.yaml'):
+        tmpdir.join(name).ensure()
+    manifest = tmpdir.join('manifest.json')
+
+    ans = utils.find(str(tmpdir), '*.txt')
+    test = utils.find(str(tmpdir), '*.txt', parallel=2, manifest=manifest)
+    assert test == ans
+    assert manifest.exists()
+    assert str(manifest) not in utils.list_files(str(tmpdir),
+                                                 manifest=manifest)
+
+    # Uses manifest if nothing changed
+    cached = utils._read_manifest(str(manifest), str(tmpdir))
+    assert cached == [f for f in utils.list_files(str(tmpdir))
+                      if f != str(manifest)]
+
+    # Manifest is stale if a directory changes
+    tmpdir.join('a', 'b', '5.txt').ensure()
+    assert utils._read_manifest(str(manifest), str(tmpdir)) is None
+    test = utils.find(str(tmpdir), '*.txt', manifest=manifest)
+    assert test == sorted(ans + [str(tmpdir.join('a', 'b', '5.txt'))])
+
+
+def test_list_files_manifest_stale(tmpdir):
+    # Rebuilding a stale manifest lists the same files as reading it
+    for name in ('a/1.txt', '2.json'):
+        tmpdir.join(name).ensure()
+    manifest = tmpdir.join('files.json')
+    utils.list_files(str(tmpdir), manifest=manifest)
+
+    tmpdir.join('a', '3.txt').ensure()
+    rebuilt = utils.list_files(str(tmpdir), manifest=manifest)
+    cached = utils.list_files(str(tmpdir), manifest=manifest)
+    assert utils._read_manifest(str(manifest), str(tmpdir)) == cached
+    assert rebuilt == cached
+    assert str(manifest) not in rebuilt
+    assert utils.find(str(tmpdir), '*.json', manifest=manifest) == \
+        [str(tmpdir.join('2.json'))]
+
+
+# ------------------------------------------------------------------------------
+# glob_files
+@pytest.mark.parametrize('pattern', (
+    '*.txt',
+    '*/*.txt',
+    '[ab]/*',
+    '*/b/*.txt',
+    'a/1.txt',
+    'nope/*',
+    '*',
+))
+@pytest.mark.parametrize('parallel', (False, 2, ))
+def test_glob_files(tmpdir, pattern, parallel):
+    import glob
+    for name in ('a/1.txt', 'a/b/2.txt', 'b/3.txt', '4.txt', '.5.txt'):
+        tmpdir.join(name).ensure()
+    pattern = str(tmpdir.join(pattern))
+    test = utils.glob_files(pattern, parallel=parallel)
+    assert test == sorted(glob.glob(pattern))
+
+
 # ------------------------------------------------------------------------------
 # relative_to
 def test_relative_to():
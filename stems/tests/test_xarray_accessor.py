@@ -1,6 +1,7 @@
 """ Tests for :py:mod:`stems.xarray_accessor`
 """
 from affine import Affine
+import numpy as np
 from rasterio.coords import BoundingBox
 from rasterio.crs import CRS
 import pytest
@@ -58,3 +59,106 @@ def test_xarray_accessor_2(ds):
     assert ds_.stems.bounds == bounds_
     bbox_ = ds_.stems.bbox
     assert bbox_.area == (bounds_[2] - bounds_[0]) * (bounds_[3] - bounds_[1])
+
+
+def test_xarray_accessor_cached(landsat_ard_subset_file, monkeypatch):
+    ds = xr.open_dataset(str(landsat_ard_subset_file))
+    xform_ = Affine(30.0, 0.0, -2106255.0, 0.0, -30.0, 1858905.0)
+    assert ds.stems.transform == xform_
+    assert ds.stems.shape == (3, 5)
+
+    # Cached, so shouldn't compute from coordinates again
+    def fail(*args, **kwds):
+        raise AssertionError('Should not calculate from coordinates')
+    monkeypatch.setattr(xarray_accessor.coords, 'coords_to_transform', fail)
+    assert ds.stems.transform == xform_
+
+    # Changing coordinates invalidates the cache
+    monkeypatch.undo()
+    ds.coords['x'] = ds.coords['x'] + 30.
+    assert ds.stems.transform == xform_ * Affine.translation(1, 0)
+    assert ds.stems.bounds.left == xform_.c + 30.
+
+
+def test_xarray_accessor_geotransform(landsat_ard_subset_file, monkeypatch):
+    # Stale "GeoTransform" in test data is ignored, but not if correct
+    ds = xr.open_dataset(str(landsat_ard_subset_file))
+    xform_ = Affine(30.0, 0.0, -2106255.0, 0.0, -30.0, 1858905.0)
+    ds.coords['crs'].attrs['GeoTransform'] = xform_.to_gdal()
+
+    def fail(*args, **kwds):
+        raise AssertionError('Should not calculate from coordinates')
+    monkeypatch.setattr(xarray_accessor.coords, 'coords_to_transform', fail)
+    assert ds.stems.transform == xform_
+    assert ds['blue'].stems.transform == xform_
+
+    # GDAL style string
+    ds.coords['crs'].attrs['GeoTransform'] = ' '.join(
+        str(v) for v in xform_.to_gdal())
+    assert ds.stems.transform == xform_
+
+
+def test_xarray_accessor_clip(landsat_ard_subset_file):
+    ds = xr.open_dataset(str(landsat_ard_subset_file), chunks={'time': 25})
+    xform_ = Affine(30.0, 0.0, -2106255.0, 0.0, -30.0, 1858905.0)
+
+    # Slightly off pixel edges
+    bounds = BoundingBox(-2106255.0 + 30.001, 1858815.0 + 29.999,
+                         -2106105.0 - 59.999, 1858905.0)
+    window = ds.stems.window(bounds)
+    assert window.toranges() == ((0, 2), (1, 3))
+
+    test = ds.stems.clip(bounds)
+    xr.testing.assert_equal(test['blue'].drop_vars('crs'),
+                            ds['blue'].isel(y=slice(0, 2), x=slice(1, 3))
+                            .drop_vars('crs'))
+    # No rechunking
+    assert test['blue'].data.chunks == \
+        ds['blue'].data[:, 0:2, 1:3].chunks
+    assert test.stems.transform == xform_ * Affine.translation(1, 0)
+    assert test.stems.shape == (2, 2)
+
+    # Extends outside of data
+    test = ds['blue'].stems.clip(BoundingBox(-2106255.0 - 300, 1858815.0,
+                                             -2106225.0, 1858905.0 + 300))
+    assert test.shape == (ds.sizes['time'], 3, 1)
+
+
+def test_xarray_accessor_clip_error(landsat_ard_subset_file):
+    ds = xr.open_dataset(str(landsat_ard_subset_file))
+    with pytest.raises(ValueError, match=r'do not intersect'):
+        ds.stems.window(BoundingBox(0, 0, 30, 30))
+
+
+@pytest.mark.parametrize('chunks', [None, {'time': 100, 'y': 2, 'x': 2}])
+def test_xarray_accessor_sample(landsat_ard_subset_file, chunks):
+    ds = xr.open_dataset(str(landsat_ard_subset_file), chunks=chunks)
+    # Pixel centers, edges, and repeats in random order
+    y = [1858890., 1858905., 1858830., 1858890., 1858816.]
+    x = [-2106240., -2106255., -2106106., -2106240., -2106200.]
+    rows, cols = [0, 0, 2, 0, 2], [0, 0, 4, 0, 1]
+
+    test = ds.stems.sample(y, x)
+    assert test.dims == ('point', 'time', 'band')
+    assert list(test['band'].values) == list(ds.data_vars)
+    for i, (row, col) in enumerate(zip(rows, cols)):
+        ans = ds.isel(y=row, x=col).to_array('band').transpose()
+        np.testing.assert_equal(test[i].values, ans.values)
+    np.testing.assert_equal(test['x'].values, ds['x'].values[cols])
+
+    test = ds['blue'].stems.sample(y, x)
+    assert test.dims == ('point', 'time')
+    np.testing.assert_equal(test.values,
+                            ds['blue'].values[:, rows, cols].T)
+
+
+def test_xarray_accessor_sample_crs(landsat_ard_subset_file):
+    from rasterio.warp import transform as warp_transform
+    ds = xr.open_dataset(str(landsat_ard_subset_file))
+    lon, lat = warp_transform(ds.stems.crs, CRS.from_epsg(4326),
+                              [-2106195.], [1858860.])
+    test = ds['blue'].stems.sample(lat, lon, crs=CRS.from_epsg(4326))
+    np.testing.assert_equal(test.values[0], ds['blue'].values[:, 1, 2])
+
+    with pytest.raises(ValueError, match=r'1 of 1 points are outside'):
+        ds.stems.sample([0.], [0.])
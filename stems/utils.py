@@ -6,6 +6,8 @@ import errno
 import fnmatch
 import functools
 import importlib
+import itertools
+import json
 import logging
 import os
 from pathlib import Path
@@ -323,7 +325,7 @@ def dtype_info(arr):
 # ============================================================================
 # FILE HELPERS
 # ============================================================================
-def find(location, pattern, regex=False):
+def find(location, pattern, regex=False, parallel=False, manifest=None):
     """ Return a sorted list of files matching pattern
 
     Parameters
@@ -334,6 +336,11 @@ def find(location, pattern, regex=False):
         Search pattern for files
     regex : bool
         True if ``pattern`` is a regular expression
+    parallel : bool or int, optional
+        List subdirectories in parallel using threads. If ``int``, specifies
+        the number of threads to use
+    manifest : str or pathlib.Path, optional
+        Cache the directory listing in this file (see :py:func:`list_files`)
 
     Returns
     --------
@@ -345,13 +352,220 @@ def find(location, pattern, regex=False):
         pattern = fnmatch.translate(pattern)
     regex = re.compile(pattern)
 
-    files = []
-    for root, dirnames, filenames in os.walk(str(location)):
-        for filename in filenames:
-            if regex.search(filename):
-                files.append(os.path.join(root, filename))
+    files = list_files(location, parallel=parallel, manifest=manifest)
+    return [f for f in files if regex.search(os.path.basename(f))]
 
-    return sorted(files)
+
+def list_files(location, parallel=False, manifest=None):
+    """ Return a sorted list of all files within a directory (recursively)
+
+    Parameters
+    ----------
+    location : str or pathlib.Path
+        Directory location to search
+    parallel : bool or int, optional
+        List subdirectories in parallel using threads. If ``int``, specifies
+        the number of threads to use
+    manifest : str or pathlib.Path, optional
+        Cache the directory listing in this file. If the manifest exists and
+        no directory has been modified since it was written, the files are
+        read from the manifest instead of listing all directories. Otherwise
+        the directory is listed and the manifest is (re)written.
+
+    Returns
+    -------
+    list[str]
+        Sorted file paths
+    """
+    location = str(location)
+    if manifest is not None:
+        files = _read_manifest(manifest, location)
+        if files is not None:
+            logger.debug(f'Using cached directory listing from "{manifest}"')
+            return files
+
+    dirs, files = _scandir_tree(location, parallel=parallel)
+    files = sorted(files)
+
+    if manifest is not None:
+        # Don't list the manifest, which isn't listed when read from it
+        manifest_ = os.path.abspath(str(manifest))
+        files = [f for f in files if os.path.abspath(f) != manifest_]
+        _write_manifest(manifest, location, dirs, files)
+    return files
+
+
+def glob_files(pattern, parallel=False):
+    """ Return a sorted list of paths matching a shell-style pattern
+
+    Works like :py:func:`glob.glob`, but lists each directory only once
+    using :py:func:`os.scandir`.
+
+    Parameters
+    ----------
+    pattern : str or pathlib.Path
+        Shell-style search pattern (e.g., "path/to/my/files/*.nc")
+    parallel : bool or int, optional
+        List directories matched by wildcards in parallel using threads. If
+        ``int``, specifies the number of threads to use
+
+    Returns
+    -------
+    list[str]
+        Sorted paths matching ``pattern``
+    """
+    pattern = str(pattern)
+    drive, rest = os.path.splitdrive(pattern)
+    parts = rest.split(os.sep)
+    if parts[0] == '':  # absolute
+        roots, parts = [drive + os.sep], parts[1:]
+    else:
+        roots = [drive] if drive else ['']
+
+    parts = [p for p in parts if p]
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if not _has_magic(part):
+            roots = [os.path.join(root, part) for root in roots]
+            if last:
+                roots = [r for r in roots if os.path.lexists(r)]
+            continue
+
+        def _match(root, part=part, last=last):
+            try:
+                entries = list(os.scandir(root or os.curdir))
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                return []
+            hidden = part.startswith('.')
+            return [os.path.join(root, e.name) for e in entries
+                    if (hidden or not e.name.startswith('.')) and
+                    fnmatch.fnmatchcase(e.name, part) and
+                    (last or e.is_dir())]
+
+        roots = list(itertools.chain.from_iterable(
+            map_threads(_match, roots, parallel)))
+
+    return sorted(roots)
+
+
+# Directory listing helpers
+_GLOB_MAGIC = re.compile('[*?[]')
+
+
+def _has_magic(s):
+    return _GLOB_MAGIC.search(s) is not None
+
+
+def map_threads(func, items, parallel=False):
+    """ Map a function over items, optionally using a pool of threads
+
+    Parameters
+    ----------
+    func : callable
+        Function to call on each item
+    items : Sequence
+        Items to map ``func`` over
+    parallel : bool or int, optional
+        Map using a pool of threads. If ``int``, specifies the number of
+        threads to use
+
+    Returns
+    -------
+    list
+        Results of ``func`` for each item, in order
+    """
+    if parallel and len(items) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        workers = None if parallel is True else int(parallel)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(func, items))
+    return [func(item) for item in items]
+
+
+def _scandir(path):
+    # Return (mtime, subdirectories, files) for a single directory
+    dirs, files = [], []
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    # Like `os.walk`, don't follow symlinks to directories
+                    if not entry.is_symlink():
+                        dirs.append(entry.path)
+                else:
+                    files.append(entry.path)
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        logger.debug(f'Could not list directory "{path}"')
+        mtime = None
+    return mtime, dirs, files
+
+
+def _scandir_tree(location, parallel=False):
+    # Return ({directory: mtime}, [files]), listing one level at a time
+    dirs, files = {}, []
+    level = [location]
+    while level:
+        results = map_threads(_scandir, level, parallel)
+        next_level = []
+        for path, (mtime, subdirs, subfiles) in zip(level, results):
+            if mtime is not None:
+                dirs[path] = mtime
+            next_level.extend(subdirs)
+            files.extend(subfiles)
+        level = next_level
+    return dirs, files
+
+
+_MANIFEST_VERSION = 1
+
+
+def _read_manifest(manifest, location):
+    # Return files in manifest, or None if it's missing or stale
+    try:
+        with open(str(manifest)) as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if (data.get('version') != _MANIFEST_VERSION or
+            data.get('location') != location):
+        return None
+
+    for path, mtime in data['directories'].items():
+        try:
+            if os.stat(path).st_mtime_ns != mtime:
+                return None
+        except OSError:
+            return None
+    return data['files']
+
+
+def _write_manifest(manifest, location, dirs, files):
+    manifest = os.path.abspath(str(manifest))
+
+    def _write():
+        data = {
+            'version': _MANIFEST_VERSION,
+            'location': location,
+            'directories': dirs,
+            'files': files
+        }
+        with open(manifest, 'w') as f:
+            json.dump(data, f)
+
+    try:
+        _write()
+        # Creating the manifest modifies its directory, so update and
+        # rewrite (in place, which doesn't modify the directory) if needed
+        parent = os.path.dirname(manifest)
+        for path in dirs:
+            if os.path.abspath(path) == parent:
+                dirs[path] = os.stat(path).st_mtime_ns
+                _write()
+                break
+    except (IOError, OSError):
+        logger.warning(f'Could not write directory manifest "{manifest}"')
 
 
 def relative_to(one, two):
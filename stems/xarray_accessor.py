@@ -9,22 +9,37 @@ References
 """
 import logging
 
+from affine import Affine
+import dask.array as da
+import numpy as np
+from rasterio.errors import WindowError
+from rasterio.warp import transform as warp_transform
+from rasterio.windows import Window
 import xarray as xr
 
-from .gis import convert, conventions, coords, projections
+from .gis import convert, conventions, coords, geom, projections, warp
+from .io.chunk import chunk_indices
 
 logger = logging.getLogger(__name__)
 
 
 class _STEMSAccessor(object):
     """ Base class for xarray.DataArray and xarray.Dataset accessors
+
+    Georeferencing information (CRS, transform, bounds, and shape) is cached
+    on the accessor and recomputed only if the coordinate variables or the
+    grid mapping attributes change. Modifying coordinate values in place
+    is not detected.
     """
 
     def __init__(self, xarray_obj):
         self._obj = xarray_obj
         self._grid_mapping = 'crs'
+        self._cache_key = None
+        self._cache = {}
 
-    def georeference(self, crs, transform, grid_mapping='crs'):
+    def georeference(self, crs, transform, grid_mapping='crs',
+                     lightweight=False):
         """ Apply georeferencing to XArray data
 
         Parameters
@@ -35,6 +50,9 @@ class _STEMSAccessor(object):
             Affine transform of the data
         grid_mapping : str, optional
             Name to use for grid mapping variable
+        lightweight : bool, optional
+            Only attach georeferencing metadata, sharing existing data and
+            coordinates (see :py:func:`stems.gis.conventions.georeference`)
 
         Returns
         -------
@@ -44,9 +62,192 @@ class _STEMSAccessor(object):
         self._grid_mapping = grid_mapping
         obj = conventions.georeference(self._obj, crs, transform,
                                        grid_mapping=grid_mapping,
-                                       inplace=False)
+                                       inplace=False,
+                                       lightweight=lightweight)
+        return obj
+
+    def window(self, bounds):
+        """ Return the (rounded) window of the data within some bounds
+
+        Parameters
+        ----------
+        bounds : BoundingBox, Polygon, or stems.gis.grids.Tile
+            Bounds (or geometry) in the same CRS as the data. If a ``Tile``,
+            its CRS must match the data
+
+        Returns
+        -------
+        rasterio.windows.Window
+            Window of data within ``bounds``
+
+        Raises
+        ------
+        ValueError
+            Raised if the CRS of a ``Tile`` doesn't match or if ``bounds``
+            don't intersect the data
+        """
+        crs = getattr(bounds, 'crs', None)
+        if crs is not None and crs != self.crs:
+            raise ValueError('Bounds must be in the same CRS as the data')
+        bounds = convert.to_bounds(getattr(bounds, 'bounds', bounds))
+
+        try:
+            window, _ = geom.calculate_src_window(self.bounds, self.transform,
+                                                  bounds)
+        except WindowError:
+            window = None
+        if window is None or window.width <= 0 or window.height <= 0:
+            raise ValueError(f'Bounds {bounds} do not intersect data '
+                             f'bounds {self.bounds}')
+        # Rounding shouldn't take us outside of the data
+        return window.intersection(Window(0, 0, *self.shape[::-1]))
+
+    def isel_window(self, window):
+        """ Select a window of the data by position
+
+        Data are sliced, not copied or rechunked. The "GeoTransform" of the
+        grid mapping variable, if any, is updated to match.
+
+        Parameters
+        ----------
+        window : rasterio.windows.Window
+            Window of data to select
+
+        Returns
+        -------
+        xarray.Dataset or xarray.DataArray
+            Subset of data
+        """
+        (row_start, row_stop), (col_start, col_stop) = window.toranges()
+        dim_y, dim_x = self.coord_y.dims[0], self.coord_x.dims[0]
+        transform = self.transform * Affine.translation(col_start, row_start)
+
+        obj = self._obj.isel({dim_y: slice(row_start, row_stop),
+                              dim_x: slice(col_start, col_stop)})
+
+        var_gm = obj.coords.get(self._grid_mapping)
+        if var_gm is not None and 'GeoTransform' in var_gm.attrs:
+            var_gm = var_gm.copy(deep=False)
+            var_gm.attrs['GeoTransform'] = np.asarray(transform.to_gdal())
+            obj = obj.assign_coords({self._grid_mapping: var_gm})
         return obj
 
+    def clip(self, bounds):
+        """ Subset the data to some bounds using positional indexing
+
+        Parameters
+        ----------
+        bounds : BoundingBox, Polygon, or stems.gis.grids.Tile
+            Bounds (or geometry) in the same CRS as the data
+
+        Returns
+        -------
+        xarray.Dataset or xarray.DataArray
+            Subset of data
+
+        See Also
+        --------
+        window
+        isel_window
+        """
+        return self.isel_window(self.window(bounds))
+
+    def reproject(self, tile, resampling='nearest', nodata=None,
+                  dst_nodata=None, chunks=None):
+        """ Lazily reproject data onto the grid of a ``Tile``
+
+        Parameters
+        ----------
+        tile : stems.gis.grids.Tile
+            Destination tile (or any object with ``crs``, ``transform``,
+            ``height``, and ``width`` attributes)
+        resampling : str or rasterio.enums.Resampling, optional
+            Resampling method
+        nodata : int or float, optional
+            NoData value of the source data
+        dst_nodata : int or float, optional
+            Value to fill destination pixels without data
+        chunks : int or tuple[int, int], optional
+            Destination chunk sizes for the y/x dimensions
+
+        Returns
+        -------
+        xarray.DataArray or xarray.Dataset
+            Reprojected data
+
+        See Also
+        --------
+        stems.gis.warp.reproject_xarray
+        """
+        return warp.reproject_xarray(
+            self._obj, tile.crs, tile.transform, (tile.height, tile.width),
+            resampling=resampling, nodata=nodata, dst_nodata=dst_nodata,
+            chunks=chunks
+        )
+
+    def sample(self, y, x, crs=None, dim='point', dim_band='band'):
+        """ Sample data at many points
+
+        Points are converted to rows/columns using the transform and grouped
+        by the (Dask) chunk they fall in, so each chunk is read once.
+
+        Parameters
+        ----------
+        y : array-like
+            Y coordinates of points
+        x : array-like
+            X coordinates of points
+        crs : rasterio.crs.CRS, optional
+            CRS of ``y`` and ``x``, if different from the data
+        dim : str, optional
+            Name of the points dimension
+        dim_band : str, optional
+            Name of the dimension for the variables of a Dataset
+
+        Returns
+        -------
+        xarray.DataArray
+            Point data, with dimensions ``dim``, any non y/x dimensions of
+            the data, and (for Datasets) ``dim_band``
+
+        Raises
+        ------
+        ValueError
+            Raised if any points are outside of the data
+        """
+        y_, x_ = np.atleast_1d(y), np.atleast_1d(x)
+        if crs is not None and convert.to_crs(crs) != self.crs:
+            x_, y_ = warp_transform(convert.to_crs(crs), self.crs, x_, y_)
+
+        rows, cols = coords.coords_to_indices(self.transform, y_, x_)
+        ny, nx = self.shape
+        outside = (rows < 0) | (rows >= ny) | (cols < 0) | (cols >= nx)
+        if outside.any():
+            raise ValueError(f'{outside.sum()} of {outside.size} points are '
+                             'outside of the data')
+
+        dim_y, dim_x = self.coord_y.dims[0], self.coord_x.dims[0]
+        xarr = self._obj
+        if isinstance(xarr, xr.Dataset):
+            names = [name for name, dv in xarr.data_vars.items()
+                     if dim_y in dv.dims and dim_x in dv.dims]
+            xarr = xarr[names].to_array(dim=dim_band)
+            xarr = xarr.transpose(*[d for d in xarr.dims if d != dim_band],
+                                  dim_band)
+        other_dims = tuple(d for d in xarr.dims if d not in (dim_y, dim_x))
+        xarr = xarr.transpose(*other_dims, dim_y, dim_x)
+
+        data = _sample_points(xarr.data, rows, cols)
+        data = (da.moveaxis if isinstance(data, da.Array)
+                else np.moveaxis)(data, -1, 0)
+
+        x_name, y_name = projections.cf_xy_coord_names(self.crs)
+        coords_ = {d: xarr.coords[d] for d in other_dims if d in xarr.coords}
+        coords_[y_name] = ((dim, ), xarr.coords[dim_y].values[rows])
+        coords_[x_name] = ((dim, ), xarr.coords[dim_x].values[cols])
+        return xr.DataArray(data, dims=(dim, ) + other_dims, coords=coords_,
+                            attrs=xarr.attrs, name=xarr.name)
+
     def is_georeferenced(self):
         """ Check if data is georeferenced
 
@@ -75,36 +276,47 @@ class _STEMSAccessor(object):
     def crs(self):
         """ rasterio.crs.CRS: Coordinate reference system
         """
-        # TODO: parse based on CF information, not just GDAL
-        var_gm = self.grid_mapping
-        return convert.to_crs(var_gm.attrs['spatial_ref'])
+        cache = self._georef_cache()
+        if 'crs' not in cache:
+            # TODO: parse based on CF information, not just GDAL
+            var_gm = self.grid_mapping
+            cache['crs'] = convert.to_crs(var_gm.attrs['spatial_ref'])
+        return cache['crs']
 
     @property
     def transform(self):
         """ affine.Affine: Affine transform
-        """
-        # TODO: assume unique -> yes if 2D, otherwise no
-        x, y = projections.cf_xy_coord_names(self.crs)
-
-        if 'x' in self._obj.dims and 'y' in self._obj.dims:
-            assume_unique = True
-        else:
-            logger.debug('Could not find y/x coordinates as dimensions. '
-                         'Assuming coordinates are NOT unique')
-            assume_unique = False
 
-        xform = coords.coords_to_transform(self.coord_y, self.coord_x,
-                                           assume_unique=assume_unique)
-        return xform
+        Read from the grid mapping "GeoTransform" attribute if it agrees
+        with the first coordinates, otherwise calculated from coordinates
+        """
+        cache = self._georef_cache()
+        if 'transform' not in cache:
+            cache['transform'] = self._transform()
+        return cache['transform']
 
     @property
     def bounds(self):
         """ BoundingBox: Bounding box of data
         """
-        assume_unique = True
-        bounds = coords.coords_to_bounds(self.coord_y, self.coord_x,
-                                         assume_unique=assume_unique)
-        return bounds
+        cache = self._georef_cache()
+        if 'bounds' not in cache:
+            if self._xy_are_dims():
+                cache['bounds'] = coords.transform_to_bounds(self.transform,
+                                                             *self.shape)
+            else:
+                cache['bounds'] = coords.coords_to_bounds(
+                    self.coord_y, self.coord_x, assume_unique=True)
+        return cache['bounds']
+
+    @property
+    def shape(self):
+        """ tuple[int, int]: Number of rows and columns
+        """
+        cache = self._georef_cache()
+        if 'shape' not in cache:
+            cache['shape'] = (self.coord_y.size, self.coord_x.size)
+        return cache['shape']
 
     @property
     def bbox(self):
@@ -125,6 +337,121 @@ class _STEMSAccessor(object):
         else:
             return var_grid_mapping
 
+    def _georef_cache(self):
+        # Reset cache if coordinates or grid mapping attributes have changed
+        variables = self._obj.coords.variables
+        var_gm = variables.get(self._grid_mapping)
+        attrs_gm = var_gm.attrs if var_gm is not None else {}
+        key = (
+            tuple(variables.items()),
+            attrs_gm.get('spatial_ref'),
+            _geotransform(attrs_gm)
+        )
+        if not self._same_cache_key(key):
+            self._cache_key = key
+            self._cache = {}
+        return self._cache
+
+    def _same_cache_key(self, key):
+        if self._cache_key is None:
+            return False
+        vars_, *attrs = key
+        vars_cache, *attrs_cache = self._cache_key
+        return (
+            len(vars_) == len(vars_cache) and
+            all(name == name_ and var is var_
+                for (name, var), (name_, var_) in zip(vars_, vars_cache)) and
+            attrs == attrs_cache
+        )
+
+    def _xy_are_dims(self):
+        x, y = projections.cf_xy_coord_names(self.crs)
+        return x in self._obj.dims and y in self._obj.dims
+
+    def _transform(self):
+        gt = _geotransform(self.grid_mapping.attrs)
+        if gt is not None:
+            xform = Affine.from_gdal(*gt)
+            if _transform_matches(xform, self.coord_y.variable,
+                                  self.coord_x.variable):
+                return xform
+            logger.debug('"GeoTransform" attribute does not match '
+                         'coordinates. Calculating transform from '
+                         'coordinates')
+
+        # TODO: assume unique -> yes if 2D, otherwise no
+        if self._xy_are_dims():
+            assume_unique = True
+        else:
+            logger.debug('Could not find y/x coordinates as dimensions. '
+                         'Assuming coordinates are NOT unique')
+            assume_unique = False
+
+        return coords.coords_to_transform(self.coord_y, self.coord_x,
+                                          assume_unique=assume_unique)
+
+
+def _sample_points(data, rows, cols):
+    # Index the last 2 dims of ``data`` at points, returning (..., point)
+    if not isinstance(data, da.Array):
+        return np.asarray(data)[..., rows, cols]
+
+    chunk_y, index_y = chunk_indices(data.chunks[-2], rows)
+    chunk_x, index_x = chunk_indices(data.chunks[-1], cols)
+
+    # Group points by chunk, sampling each chunk in one task
+    order = np.lexsort((chunk_x, chunk_y))
+    key = chunk_y[order] * len(data.chunks[-1]) + chunk_x[order]
+    starts = np.flatnonzero(np.diff(key, prepend=-1))
+    stops = np.append(starts[1:], key.size)
+
+    leading = (slice(None), ) * (data.ndim - 2)
+    samples = []
+    for start, stop in zip(starts, stops):
+        idx = order[start:stop]
+        block = data.blocks[leading + (chunk_y[idx[0]], chunk_x[idx[0]])]
+        samples.append(block.map_blocks(
+            _take_points, rows=index_y[idx], cols=index_x[idx],
+            drop_axis=data.ndim - 1,
+            chunks=block.chunks[:-2] + ((idx.size, ), ),
+            dtype=data.dtype
+        ))
+
+    # Back to the original order of points
+    sampled = da.concatenate(samples, axis=-1)
+    return sampled[..., np.argsort(order)]
+
+
+def _take_points(block, rows, cols):
+    return block[..., rows, cols]
+
+
+def _geotransform(attrs):
+    # GDAL writes "GeoTransform" as a string, we write it as an array
+    gt = attrs.get('GeoTransform')
+    if gt is None:
+        return None
+    if isinstance(gt, str):
+        gt = gt.split()
+    try:
+        gt = tuple(float(v) for v in np.ravel(gt))
+    except ValueError:
+        return None
+    return gt if len(gt) == 6 else None
+
+
+def _transform_matches(transform, y, x):
+    # Check transform using first 2 pixel centers, not the entire coordinate
+    if transform.b or transform.d or y.ndim != 1 or x.ndim != 1:
+        return False
+    for coord, res, origin in ((x, transform.a, transform.c),
+                               (y, transform.e, transform.f)):
+        values = np.asarray(coord[:2])
+        test = origin + res * (np.arange(values.size) + 0.5)
+        if not np.allclose(values, test, rtol=0, atol=abs(res) * 1e-3):
+            return False
+    return True
+
 
 @xr.register_dataarray_accessor('stems')
 class DataArrayAccessor(_STEMSAccessor):